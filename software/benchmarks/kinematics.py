@@ -0,0 +1,213 @@
+"""Kinematics benchmark suite.
+
+Time the kinematics hot paths (forward kinematics, inverse kinematics, pose distances and Orbita model solves) offline,
+the Luos IO being mocked as in the tests (see tests/mockup.py). No robot needs to be connected.
+
+Results are written as JSON (median and best time per call of each benchmark, along with the versions of the main dependencies).
+They can be compared against a stored baseline to catch slowdowns, e.g. after updating scipy or orbita::
+
+    python benchmarks/kinematics.py --save-baseline baseline.json
+    python benchmarks/kinematics.py --baseline baseline.json --threshold 0.2
+
+The comparison exits with a non-zero status if a benchmark is slower than its baseline by more than the threshold.
+"""
+
+import sys
+import json
+import time
+import pathlib
+import argparse
+import platform
+import numpy as np
+import pkg_resources
+
+from collections import OrderedDict
+
+# Run from a source checkout: use the reachy package and the IO mockup of the tests next to this script
+root = pathlib.Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(root), str(root / 'tests')]
+
+from mockup import mock_luos_io  # noqa: E402
+
+mock_luos_io()
+
+from reachy import parts  # noqa: E402
+from reachy.io.luos import SharedLuosIO  # noqa: E402
+from reachy.parts.head import Head  # noqa: E402
+from reachy.parts.kinematic import pose_dist  # noqa: E402
+from reachy.parts.motor import OrbitaActuator  # noqa: E402
+
+FORWARD_BATCH_SIZES = (1, 10, 100, 1000, 10000)
+DEPENDENCIES = ('numpy', 'scipy', 'orbita', 'pyquaternion', 'pyluos')
+
+
+def benchmarks():
+    """Create the benchmarks.
+
+    Returns:
+        OrderedDict: {name: (function to time, number of calls per run)}
+    """
+    rng = np.random.default_rng(0)
+    cases = OrderedDict()
+
+    arm = parts.RightArm(io='', hand='force_gripper')
+    chain = arm.kin_chain
+    lb, ub = np.array(chain.bounds, dtype=float).T
+
+    for n in FORWARD_BATCH_SIZES:
+        q = lb + rng.random((n, len(lb))) * (ub - lb)
+        out = np.empty((n, 4, 4))
+        cases[f'forward[{n}]'] = (lambda q=q, out=out: chain.forward(q, out=out), max(1, 1000 // n))
+
+    # Reachable targets, always solved from the rest position (so the cached solutions are not used as seeds)
+    q0 = np.zeros(len(chain.links))
+    q = lb + rng.random((100, len(lb))) * (ub - lb)
+    targets = chain.forward(q)
+
+    cases['inverse_kinematics[1]'] = (lambda: arm.inverse_kinematics(targets[0], q0=np.rad2deg(q0)), 1)
+    cases['inverse_kinematics[100]'] = (lambda: arm.inverse_kinematics(targets, q0=np.rad2deg(q0)), 1)
+
+    poses = chain.forward(lb + rng.random((10000, len(lb))) * (ub - lb))
+    cases['pose_dist[1]'] = (lambda: pose_dist(poses[0], poses[1]), 1000)
+    cases['pose_dist[10000]'] = (lambda: pose_dist(poses, poses[::-1]), 10)
+
+    luos_io = SharedLuosIO.with_gate('gate', '')
+    config = {k: v for k, v in Head.orbita_config.items() if k != 'hardware_zero'}
+    orbita = OrbitaActuator('', 'neck', luos_io.find_orbita_disks(), hardware_zero=np.zeros(3), **config)
+    model, cached_model = orbita.model, orbita.cached_model
+
+    vectors = np.column_stack((np.ones(1000), rng.uniform(-0.5, 0.5, (1000, 2))))
+    Q = cached_model.quaternions_transform([1, 0, 0], vectors)
+
+    cases['orbita.model[1]'] = (lambda: model.get_angles_from_quaternion(*Q[0]), 100)
+    cases['orbita.cached_model[1]'] = (lambda: cached_model.angles_from_quaternions(Q[0]), 100)
+
+    def uncached(Q):
+        cached_model.clear_cache()
+        return cached_model.angles_from_quaternions(Q)
+    cases['orbita.cached_model[1000]'] = (lambda: uncached(Q), 1)
+    cases['orbita.quaternions_transform[1000]'] = (lambda: cached_model.quaternions_transform([1, 0, 0], vectors), 10)
+
+    # Pointing directions around the platform axis
+    up = np.column_stack((rng.uniform(-0.3, 0.3, (1000, 2)), np.ones(1000)))
+    cases['orbita.angles_from_vectors[1000]'] = (lambda: cached_model.angles_from_vectors(up), 1)
+
+    return cases
+
+
+def run(names=None, repeat=20):
+    """Run the benchmarks.
+
+    Args:
+        names (list): substrings of the benchmarks to run (all of them if None)
+        repeat (int): number of timed runs of each benchmark
+
+    Returns:
+        dict: results, with the median and best time per call (in seconds) of each benchmark
+    """
+    results = OrderedDict()
+
+    for name, (func, number) in benchmarks().items():
+        if names and not any(n in name for n in names):
+            continue
+
+        func()  # warm up (caches, lazy imports, etc)
+
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            times.append((time.perf_counter() - start) / number)
+
+        results[name] = {
+            'median': float(np.median(times)),
+            'min': float(np.min(times)),
+            'repeat': repeat,
+            'number': number,
+        }
+
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'versions': {dep: _version(dep) for dep in DEPENDENCIES},
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """Compare results with a baseline.
+
+    Args:
+        results (dict): results returned by :py:func:`run`
+        baseline (dict): baseline results (as returned by :py:func:`run`)
+        threshold (float): maximum relative slowdown of the median time allowed (0.2 means 20% slower)
+
+    Returns:
+        dict: {name: ratio of the median time to the baseline one} of the benchmarks slower than the threshold
+    """
+    regressions = OrderedDict()
+
+    for name, res in results['results'].items():
+        ref = baseline['results'].get(name)
+        if ref is None:
+            continue
+
+        ratio = res['median'] / ref['median']
+        if ratio > 1 + threshold:
+            regressions[name] = ratio
+
+    return regressions
+
+
+def main():
+    """Run the benchmarks and compare them with a baseline."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-k', '--filter', nargs='*', help='only run the benchmarks containing one of these substrings')
+    parser.add_argument('--repeat', type=int, default=20, help='number of timed runs of each benchmark (default: %(default)s)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare the results with this baseline JSON file')
+    parser.add_argument('--save-baseline', help='write the results as a new baseline to this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown reported as a regression (default: %(default)s)')
+    args = parser.parse_args()
+
+    results = run(args.filter, repeat=args.repeat)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    for name, res in results['results'].items():
+        line = f'{name:<40} {res["median"] * 1e6:12.1f} us (best {res["min"] * 1e6:.1f} us)'
+        if baseline is not None and name in baseline['results']:
+            line += f'  x{res["median"] / baseline["results"][name]["median"]:.2f} vs baseline'
+        print(line)
+
+    for filename in (args.output, args.save_baseline):
+        if filename:
+            with open(filename, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if baseline is not None:
+        if baseline.get('versions') != results['versions']:
+            print(f'Dependencies changed: {baseline.get("versions")} -> {results["versions"]}')
+
+        regressions = compare(results, baseline, args.threshold)
+        for name, ratio in regressions.items():
+            print(f'REGRESSION {name}: {ratio:.2f}x slower than the baseline')
+
+        if regressions:
+            sys.exit(1)
+
+
+def _version(dep):
+    try:
+        return pkg_resources.get_distribution(dep).version
+    except pkg_resources.DistributionNotFound:
+        return None
+
+
+if __name__ == '__main__':
+    main()
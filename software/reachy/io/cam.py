@@ -6,7 +6,6 @@ See https://github.com/ArduCAM/RaspberryPi/tree/master/Multi_Camera_Adapter/Mult
 
 """
 
-import time
 import cv2 as cv
 
 from threading import Thread, Event, Lock
@@ -20,6 +19,8 @@ class BackgroundVideoCapture(object):
     Args:
         camera_index (int): index of the used camera (see OpenCV doc for details)
         resolution (int, int): desired resolution for the grabbed frame (the resolution must be compatible with the driver)
+        lazy_setup (bool): whether to wait for the first read to open the camera
+        timeout (float): maximum time to wait for the first frame when opening the camera (in seconds)
 
     Instantiating this object will automatically start the polling of image in background.
 
@@ -27,10 +28,11 @@ class BackgroundVideoCapture(object):
     This ensures that we can always access the most recent image.
     """
 
-    def __init__(self, camera_index, resolution=(600, 800), lazy_setup=True):
+    def __init__(self, camera_index, resolution=(600, 800), lazy_setup=True, timeout=5):
         """Open video capture on the specified camera."""
         self.camera_index = camera_index
         self.resolution = resolution
+        self.timeout = timeout
 
         if not lazy_setup:
             self._setup()
@@ -52,15 +54,13 @@ class BackgroundVideoCapture(object):
         self.running = Event()
 
         self._img = None
+        self._first_frame = Event()
 
         self._t = Thread(target=self._read_loop)
         self._t.daemon = True
         self._t.start()
 
-        for _ in range(50):
-            time.sleep(0.1)
-            if self._img is not None:
-                break
+        self._first_frame.wait(timeout=self.timeout)
 
     def close(self):
         """Stop polling image and release the Video Capture."""
@@ -81,6 +81,7 @@ class BackgroundVideoCapture(object):
             if b:
                 with self._lock:
                     self._img = img.copy()
+                self._first_frame.set()
 
     def read(self):
         """Retrieve the last grabbed image."""
@@ -1,8 +1,13 @@
 """Wrapper module on top of pyluos Robot object."""
+import os
+import json
 import time
 import logging
 
 from glob import glob
+from collections import defaultdict
+from threading import Condition, Lock
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from pyluos import Device as LuosDevice
 from pyluos.modules import DynamixelMotor
@@ -28,6 +33,83 @@ def attempt_luos_connection(port, trials=5):
     return io
 
 
+def serial_device_id(port):
+    """Get a stable identifier of the serial device behind a port.
+
+    The /dev/serial/by-id link (based on the USB serial number) is used when available, so the identifier does not change when the device is plugged in another order.
+    Otherwise, the resolved path of the port is used.
+    """
+    path = os.path.realpath(port)
+
+    for link in glob('/dev/serial/by-id/*'):
+        if os.path.realpath(link) == path:
+            return link
+
+    return path
+
+
+class LuosUpdateMonitor(object):
+    """Keep track of the register updates received from the modules of a Luos device.
+
+    Args:
+        device (:py:class:`pyluos.Device`): device to monitor
+
+    pyluos does not expose any update hook, so the update method of the device (called by its polling thread for each new state) is wrapped.
+    Each update received is counted per module and per register, and the threads waiting for them are woken up.
+    """
+
+    def __init__(self, device):
+        """Start monitoring the device updates."""
+        self._cond = Condition()
+        self._counts = defaultdict(int)
+
+        update = device._update
+
+        def _update(new_state):
+            update(new_state)
+            self._received(new_state)
+
+        device._update = _update
+
+    def counts(self):
+        """Get the number of updates received so far ({(module, register): count}, with a None register for any update of the module)."""
+        with self._cond:
+            return dict(self._counts)
+
+    def wait(self, modules, registers=None, since=None, timeout=None):
+        """Wait for updates of modules registers.
+
+        Args:
+            modules (list): aliases of the modules to wait for
+            registers (list): registers of each module to wait for (any update of the modules if None)
+            since (dict): only consider updates received after these counts (see :py:meth:`counts`), by default any update already received counts
+            timeout (float): maximum time to wait (in seconds)
+
+        Returns:
+            bool: whether all the updates were received before the timeout
+        """
+        since = since or {}
+        keys = [(m, r) for m in modules for r in (registers or [None])]
+
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: all(self._counts.get(k, 0) > since.get(k, 0) for k in keys),
+                timeout=timeout,
+            )
+
+    def _received(self, new_state):
+        modules = new_state.get('modules') if isinstance(new_state, dict) else None
+        if not modules:
+            return
+
+        with self._cond:
+            for alias, registers in modules.items():
+                self._counts[(alias, None)] += 1
+                for r in registers:
+                    self._counts[(alias, r)] += 1
+            self._cond.notify_all()
+
+
 class SharedLuosIO(IO):
     """
     Abstraction class for pyluos Robot object. Create a new connection with a Luos gate.
@@ -37,26 +119,52 @@ class SharedLuosIO(IO):
 
     .. note:: If a connection on the same port already exists, the same IO will be used.
 
+    The gate found on each serial device is stored in the :py:attr:`gate_cache` JSON file (set it to None to disable the cache).
+
     The class is reponsible for holding active connections with Luos gate. A same gate can be shared among multiple IOs.
     """
 
     opened_io = {}
+    update_monitors = {}
+    ready_timeout = 1.0
+    gate_cache = os.path.join(os.path.expanduser('~'), '.reachy', 'luos_gates.json')
+
+    _lock = Lock()
+    _port_locks = defaultdict(Lock)
 
     def __init__(self, luos_port):
         """Create a new connection with a Luos gate."""
-        if luos_port not in SharedLuosIO.opened_io:
-            io = attempt_luos_connection(luos_port)
-            SharedLuosIO.opened_io[luos_port] = io
-
-            logger.info('Connected to new Luos IO', extra={
-                'luos_port': luos_port,
-                'gate_name': io.modules[0].alias,
-                'modules': [mod.alias for mod in io.modules],
-            })
-            # FIXME: wait for a first sync of all modules
-            import time
-            time.sleep(1)
-        self.shared_io = SharedLuosIO.opened_io[luos_port]
+        with SharedLuosIO._lock:
+            port_lock = SharedLuosIO._port_locks[luos_port]
+
+        # Different ports can be opened concurrently, but a port is only opened once
+        with port_lock:
+            if luos_port not in SharedLuosIO.opened_io:
+                io = attempt_luos_connection(luos_port)
+                updates = LuosUpdateMonitor(io)
+
+                modules = [mod.alias for mod in io.modules]
+                logger.info('Connected to new Luos IO', extra={
+                    'luos_port': luos_port,
+                    'gate_name': io.modules[0].alias,
+                    'modules': modules,
+                })
+
+                # Wait for a first sync of all modules (the gate itself does not report any register)
+                if not updates.wait(modules[1:], timeout=SharedLuosIO.ready_timeout):
+                    counts = updates.counts()
+                    logger.warning('Luos IO modules not synced', extra={
+                        'luos_port': luos_port,
+                        'missing_modules': [m for m in modules[1:] if counts.get((m, None), 0) == 0],
+                    })
+
+                with SharedLuosIO._lock:
+                    SharedLuosIO.opened_io[luos_port] = io
+                    SharedLuosIO.update_monitors[luos_port] = updates
+
+        with SharedLuosIO._lock:
+            self.shared_io = SharedLuosIO.opened_io[luos_port]
+            self.updates = SharedLuosIO.update_monitors[luos_port]
         self.port = luos_port
 
     def __repr__(self):
@@ -72,6 +180,9 @@ class SharedLuosIO(IO):
             name (str): name (or alias) of the searched Luos gate.
             port_template (str): template name for the possible serial ports (e.g. '/dev/ttyUSB*')
 
+        The ports where the gate was last found (see :py:attr:`gate_cache`) are tried first.
+        Otherwise, all the other ports are probed concurrently.
+        The connections opened on the way are kept, so the next parts find their gate immediately.
         """
         logger.info(f'Looking for gate "{name}" on ports "{port_template}"')
 
@@ -80,21 +191,108 @@ class SharedLuosIO(IO):
         if len(available_ports) == 0:
             return cls(port_template)
 
-        for p in available_ports:
-            io = cls(p)
+        cache = cls._load_gate_cache()
+        device_ids = {p: serial_device_id(p) for p in available_ports}
+
+        candidates = cls._cached_ports(name, available_ports, cache, device_ids)
+        others = [p for p in available_ports if p not in candidates]
+
+        try:
+            io = cls._probe_cached(name, candidates)
+            if io is None and others:
+                io = cls._probe_concurrently(name, others)
+
+            if io is None:
+                raise LuosGateNotFoundError(f'Gate "{name}" not found on ports "{port_template}"')
+            return io
+
+        finally:
+            cls._save_gate_cache(cache, device_ids)
+
+    @classmethod
+    def _cached_ports(cls, name, ports, cache, device_ids):
+        # Ports already opened on the gate, or where it was last found
+        def is_candidate(p):
+            with cls._lock:
+                io = cls.opened_io.get(p)
+            if io is not None:
+                return io.modules[0].alias == name
+            return cache.get(device_ids[p]) == name
+
+        return [p for p in ports if is_candidate(p)]
 
-            if io.gate_name == name:
-                logger.info(f'Found gate "{io.gate_name}" on port "{p}"')
+    @classmethod
+    def _probe_cached(cls, name, ports):
+        for p in ports:
+            io = cls._probe(p)
+            if io is not None and io.gate_name == name:
+                logger.info(f'Found gate "{io.gate_name}" on port "{p}" (cached)')
                 return io
-        else:
-            raise LuosGateNotFoundError(f'Gate "{name}" not found on ports "{port_template}"')
+        return None
+
+    @classmethod
+    def _probe_concurrently(cls, name, ports):
+        # Do not wait for the other connections once the gate is found, they are kept open for the other parts
+        executor = ThreadPoolExecutor(max_workers=len(ports))
+        try:
+            for future in as_completed([executor.submit(cls._probe, p) for p in ports]):
+                io = future.result()
+                if io is not None and io.gate_name == name:
+                    logger.info(f'Found gate "{io.gate_name}" on port "{io.port}"')
+                    return io
+        finally:
+            executor.shutdown(wait=False)
+        return None
+
+    @classmethod
+    def _probe(cls, port):
+        try:
+            return cls(port)
+        except Exception:
+            logger.exception(f'Could not connect to a Luos gate on port "{port}"')
+            return None
+
+    @classmethod
+    def _load_gate_cache(cls):
+        if cls.gate_cache is None or not os.path.exists(cls.gate_cache):
+            return {}
+
+        try:
+            with open(cls.gate_cache) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f'Ignoring invalid Luos gate cache "{cls.gate_cache}"')
+            return {}
+
+    @classmethod
+    def _save_gate_cache(cls, cache, device_ids):
+        if cls.gate_cache is None:
+            return
+
+        with cls._lock:
+            opened = {device_ids[p]: io.modules[0].alias for p, io in cls.opened_io.items() if p in device_ids}
+
+        if all(cache.get(k) == v for k, v in opened.items()):
+            return
+        cache = dict(cache, **opened)
+
+        try:
+            os.makedirs(os.path.dirname(cls.gate_cache), exist_ok=True)
+            tmp = f'{cls.gate_cache}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(cache, f, indent=2)
+            os.replace(tmp, cls.gate_cache)
+        except OSError:
+            logger.warning(f'Could not write the Luos gate cache "{cls.gate_cache}"')
 
     @classmethod
     def close_all_cached_gates(cls):
         """Close all connections to the Luos gate."""
-        for io in SharedLuosIO.opened_io.values():
-            io.close()
-        SharedLuosIO.opened_io.clear()
+        with SharedLuosIO._lock:
+            for io in SharedLuosIO.opened_io.values():
+                io.close()
+            SharedLuosIO.opened_io.clear()
+            SharedLuosIO.update_monitors.clear()
 
     @property
     def gate_name(self):
@@ -148,7 +346,7 @@ class SharedLuosIO(IO):
     def find_orbita_disks(self):
         """Retrieve the three Luos modules controlling each Orbita disk."""
         return [
-            OrbitaDisk(name, self.find_module(name))
+            OrbitaDisk(name, self.find_module(name), updates=self.updates)
             for name in ['disk_bottom', 'disk_middle', 'disk_top']
         ]
 
@@ -163,18 +361,22 @@ class SharedLuosIO(IO):
 class OrbitaDisk(object):
     """Orbita Disk Wrapper around luos controlled motor module."""
 
-    def __init__(self, name, luos_disk) -> None:
+    def __init__(self, name, luos_disk, updates=None) -> None:
         """Create a new Orbita disk using the luos module.
 
         Args:
             name (str): name of the disk (e.g. "disk_bottom").
             luos_disk: controlled_motor luos module
+            updates (:py:class:`LuosUpdateMonitor`): updates monitor of the IO of the disk
 
         """
         self.name = name
         self.luos_disk = luos_disk
+        self.updates = updates
         self.offset = 0
 
+        self._setup_counts = {}
+
     def __repr__(self) -> str:
         """Get the OrbitaDisk string representation."""
         return f'<Orbita "{self.name}" pos="{self.rot_position}>'
@@ -183,11 +385,35 @@ class OrbitaDisk(object):
         """Prepare the luos disk before controlling it.
 
         Enable position control, retrieve position and temperature.
+        Use :py:meth:`wait_ready` to wait for the first values.
         """
+        if self.updates is not None:
+            self._setup_counts = self.updates.counts()
+
         self.luos_disk.rot_position_mode = True
         self.luos_disk.rot_position = True
         self.luos_disk.temperature = True
 
+    def wait_ready(self, timeout):
+        """Wait for the first position and temperature sent by the disk since its setup.
+
+        Args:
+            timeout (float): maximum time to wait (in seconds)
+
+        Returns:
+            bool: whether the values were received before the timeout
+
+        Without updates monitor, it simply waits for the timeout.
+        """
+        if self.updates is None:
+            time.sleep(timeout)
+            return True
+
+        return self.updates.wait(
+            [self.name], registers=['rot_position', 'temperature'],
+            since=self._setup_counts, timeout=timeout,
+        )
+
     @property
     def compliant(self):
         """Get the disk compliancy."""
@@ -127,6 +127,10 @@ class WsFakeOrbitaDisk(object):
         """Initialize the disk."""
         pass
 
+    def wait_ready(self, timeout):
+        """Wait for the first values of the disk (always ready)."""
+        return True
+
     @property
     def rot_position(self):
         """Get the current disk angle position (in deg.)."""
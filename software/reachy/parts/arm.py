@@ -12,6 +12,10 @@ from threading import Thread, Event
 
 from .hand import LeftEmptyHand, RightEmptyHand, LeftForceGripper, RightForceGripper, OrbitaWrist
 from .part import ReachyPart
+from .kinematic import IKCache, pose_dist
+from ..trajectory.cartesian import CartesianTrajectory
+from ..trajectory.scheduler import TrajectoryScheduler
+from ..utils.timing import LoopTimer
 
 
 hands = {
@@ -33,6 +37,10 @@ class Arm(ReachyPart):
     Provides high-level access to:
         * ordered list of motors
         * forward and inverse kinematics
+        * straight line motions of the end effector
+
+    The solutions found by the inverse kinematics are stored in :py:attr:`ik_cache` (see :py:class:`~reachy.parts.kinematic.IKCache`).
+    They are used to warm-start the next inverse kinematics when no initial configuration is given.
     """
 
     fans = {
@@ -40,6 +48,7 @@ class Arm(ReachyPart):
         'elbow_fan': 'elbow_pitch',
     }
     lower_temp_threshold, upper_temp_threshold = 40, 45
+    ik_cache_max_error = 1e-3
 
     def __init__(self, side, io, dxl_motors, hand):
         """Create a new Arm part."""
@@ -58,6 +67,7 @@ class Arm(ReachyPart):
 
             hand_part = hand_cls(root=self, io=io)
             self.motors += hand_part.motors
+            self.orbita_actuators += hand_part.orbita_actuators
             self.hand = hand_part
 
             for m, conf in hand_cls.dxl_motors.items():
@@ -67,6 +77,7 @@ class Arm(ReachyPart):
             self.hand = None
 
         self.attach_kinematic_chain(dxl_motors)
+        self.ik_cache = IKCache()
 
         self.fans = dict(Arm.fans)
         if hand is not None:
@@ -112,33 +123,31 @@ class Arm(ReachyPart):
             M = M[0]
         return M
 
-    def inverse_kinematics(self, target_pose, q0=None, use_rad=False, maxiter=10):
+    def inverse_kinematics(self, target_pose, q0=None, use_rad=False, maxiter=None, method='auto', time_budget=None):
         """Approximate the inverse kinematics of the Arm.
 
         Args:
-            target_pose (:py:class:`~numpy.ndarray`): 4x4 homogeneous pose of the target end effector pose
-            q0 (:py:class:`~numpy.ndarray`): joint initial angle configurations (used for bootstraping the optimization)
+            target_pose (:py:class:`~numpy.ndarray`): 4x4 homogeneous pose of the target end effector pose (or N*4*4 poses)
+            q0 (:py:class:`~numpy.ndarray`): joint initial angle configurations (used for bootstraping the optimization), by default the nearest cached solution or the current position
             use_rad (bool): whether or not to use radians for joints configuration
-            maxiter (int): maximum number of iteration to run on the optimizer
+            maxiter (int): maximum number of iteration to run on the optimizer (see :py:meth:`~reachy.parts.kinematic.Chain.inverse` for the default)
+            method (str): solver to use (see :py:meth:`~reachy.parts.kinematic.Chain.inverse`), by default batched targets are solved all at once, use 'multistart' for hard targets
+            time_budget (float): maximum duration (in seconds) of each 'multistart' solve
 
         .. note:: the end effector will be the end of the Hand if one is attached.
 
         """
-        if q0 is None:
-            q0 = [m.present_position for m in self.motors]
-
-        q0 = np.array(q0)
-
-        if len(q0.shape) == 1:
-            q0 = q0.reshape(1, -1)
-
+        target_pose = np.asarray(target_pose, dtype=float)
         if len(target_pose.shape) == 2:
             target_pose = target_pose.reshape(-1, 4, 4)
 
-        if not use_rad:
-            q0 = np.deg2rad(q0)
+        if q0 is None:
+            q0 = self._ik_seeds(target_pose)
+        else:
+            q0 = self._ik_initial_position(q0, target_pose.shape[0], use_rad)
 
-        J = self.kin_chain.inverse(target_pose, q0, maxiter=maxiter)
+        J = self.kin_chain.inverse(target_pose, q0, maxiter=maxiter, method=method, time_budget=time_budget)
+        self._ik_cache_solutions(target_pose, J)
 
         if J.shape[0] == 1:
             J = J[0]
@@ -148,6 +157,130 @@ class Arm(ReachyPart):
 
         return J
 
+    def goto_pose(self, target_pose, duration, wait=False, interpolation_mode='minjerk', maxiter=10):
+        """Move the end effector to a target pose along a straight line.
+
+        Args:
+            target_pose (:py:class:`~numpy.ndarray`): 4x4 homogeneous target pose of the end effector
+            duration (float): duration of the movement (in seconds)
+            wait (bool): whether or not to wait for the end of the motion
+            interpolation_mode (str): time scaling along the line ('linear' or 'minjerk')
+            maxiter (int): maximum number of inverse kinematics iterations per control tick
+
+        Returns:
+            reachy.trajectory.cartesian.CartesianTrajectory: trajectory driving the arm joints, that can be used to monitor the trajectory, stop it, etc
+
+        The position is linearly interpolated and the orientation slerped.
+        The joints are solved at each tick of the shared trajectory scheduler, starting from the solution of the previous tick.
+        As for the other gotos, it preempts the trajectories currently driving the arm motors and starts from their commanded position.
+        """
+        traj = self._cartesian_trajectory(target_pose, duration, interpolation_mode, maxiter)
+        traj.start([self.motors[i] for i in traj.joints])
+
+        if wait:
+            traj.wait()
+
+        return traj
+
+    def stream_pose(self, target_pose, duration, freq=100, interpolation_mode='minjerk', maxiter=10):
+        """Stream a straight line motion of the end effector to a target pose.
+
+        Args:
+            target_pose (:py:class:`~numpy.ndarray`): 4x4 homogeneous target pose of the end effector
+            duration (float): duration of the movement (in seconds)
+            freq (float): control frequency (in Hz)
+            interpolation_mode (str): time scaling along the line ('linear' or 'minjerk')
+            maxiter (int): maximum number of inverse kinematics iterations per control tick
+
+        Yields:
+            :py:class:`~numpy.ndarray`: joints configuration (in degrees) sent at each tick, for the motors moving the end effector
+
+        This generator variant of :py:meth:`goto_pose` runs the control loop in the calling thread.
+        Each iteration solves the next configuration, sends it to the motors and waits for the next tick, so the caller can monitor (or interrupt) the motion at the control rate::
+
+            for q in reachy.left_arm.stream_pose(target, duration=2):
+                if obstacle_detected():
+                    break
+
+        As a new goto, it starts from the commanded position and preempts the trajectories currently driving the arm motors.
+
+        .. warning:: do not start gotos on the same motors while streaming.
+        """
+        traj = self._cartesian_trajectory(target_pose, duration, interpolation_mode, maxiter)
+        motors = [self.motors[i] for i in traj.joints]
+        TrajectoryScheduler.shared().release(motors)
+
+        period = 1 / freq
+        timer = LoopTimer(freq)
+        timer.start()
+        t0 = time.monotonic()
+
+        while True:
+            # Each tick commands the position at the end of its period, from the measured time so overruns do not stretch the motion
+            t = time.monotonic() - t0 + period
+            if t > duration - period / 2:
+                t = duration
+
+            q = traj.interpolate(t)
+            for m, pos in zip(motors, q):
+                m.goal_position = pos
+
+            yield q
+
+            if t >= duration:
+                break
+            timer.sleep()
+
+    def _cartesian_trajectory(self, target_pose, duration, interpolation_mode, maxiter):
+        scheduler = TrajectoryScheduler.shared()
+        q0 = []
+        for m in self.motors:
+            state = scheduler.commanded_state(m)
+            q0.append(m.present_position if state is None else state[0])
+
+        return CartesianTrajectory(
+            self.kin_chain, q0, target_pose, duration,
+            interpolation_mode=interpolation_mode, maxiter=maxiter,
+        )
+
+    def _ik_seeds(self, target_pose):
+        # Start from the current position, unless a cached solution is closer to the target
+        q = np.deg2rad([m.present_position for m in self.motors])
+        q0 = np.tile(q, (target_pose.shape[0], 1))
+
+        if self.ik_cache is None or len(self.ik_cache) == 0:
+            return q0
+
+        M = self.kin_chain.forward(q.reshape(1, -1))[0]
+        for i, d in enumerate(pose_dist(target_pose, M)):
+            cached = self.ik_cache.nearest(target_pose[i])
+            if cached is not None and cached[1] < d:
+                q0[i] = cached[0]
+
+        return q0
+
+    def _ik_initial_position(self, q0, nb_targets, use_rad):
+        # One configuration (in radians) per target
+        q0 = np.array(q0)
+
+        if len(q0.shape) == 1:
+            q0 = q0.reshape(1, -1)
+
+        if q0.shape[0] == 1 and nb_targets > 1:
+            q0 = np.repeat(q0, nb_targets, axis=0)
+
+        return q0 if use_rad else np.deg2rad(q0)
+
+    def _ik_cache_solutions(self, target_pose, J):
+        # Only keep the solutions actually reaching their target
+        if self.ik_cache is None:
+            return
+
+        M = self.kin_chain.forward(J)
+        for pose, joints, err in zip(target_pose, J, pose_dist(M, target_pose)):
+            if err < self.ik_cache_max_error:
+                self.ik_cache.add(pose, joints)
+
     def enable_temperature_monitoring(self):
         """Enable the automatic motor cooling procedure.
 
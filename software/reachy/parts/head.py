@@ -4,10 +4,13 @@ import pathlib
 import numpy as np
 
 from collections import OrderedDict
+from threading import Lock
 
 import reachy
 
 from ..utils import rot
+from ..trajectory.interpolation import TrajectoryInterpolation
+from .orbita_model import slerp
 from .part import ReachyPart
 
 
@@ -50,6 +53,8 @@ class Head(ReachyPart):
         self.left_camera = self.io.find_camera(0)
         self.right_camera = self.io.find_camera(2)
 
+        self.tracker = None
+
     def __repr__(self):
         """Head representation."""
         return f'<Head "neck": {self.neck}>'
@@ -70,9 +75,40 @@ class Head(ReachyPart):
             duration (float): move duration (in seconds)
             wait (bool): whether or not to wait for the end of the motion
         """
-        q = self.neck.model.find_quaternion_transform([1, 0, 0], [x, y, z])
+        q = self.neck.cached_model.find_quaternion_transform([1, 0, 0], [x, y, z])
         return self.neck.orient(q, duration=duration, wait=wait)
 
+    def track(self, x, y, z, max_speed=None, smoothing=None):
+        """Continuously look at a (moving) 3D point in space.
+
+        Args:
+            x (float): x coordinates in space
+            y (float): y coordinates in space
+            z (float): z coordinates in space
+            max_speed (float): maximum angular speed of the head (in degrees per second)
+            smoothing (float): time constant (in seconds) of the low-pass filter applied to the target
+
+        Returns:
+            :py:class:`LookAtTracker`: the tracking trajectory, that can be used to monitor or stop it
+
+        The first call starts the tracking, the following ones only update the target (and the parameters if given).
+        So a vision loop can call it at each frame: the neck is driven by a single trajectory of the shared scheduler.
+        Use :py:meth:`stop_tracking` to stop it, any other neck motion also stops it.
+        """
+        if self.tracker is None or not self.tracker.is_playing:
+            params = {k: v for k, v in (('max_speed', max_speed), ('smoothing', smoothing)) if v is not None}
+            self.tracker = LookAtTracker(self.neck, (x, y, z), **params)
+            self.tracker.start(self.neck.disks)
+        else:
+            self.tracker.update(x, y, z, max_speed=max_speed, smoothing=smoothing)
+
+        return self.tracker
+
+    def stop_tracking(self, wait=True):
+        """Stop looking at the tracked point (the head stays where it is)."""
+        if self.tracker is not None:
+            self.tracker.stop(wait=wait)
+
     @property
     def compliant(self):
         """Check if the neck is compliant."""
@@ -90,3 +126,108 @@ class Head(ReachyPart):
     @moving_speed.setter
     def moving_speed(self, speed):
         self.neck.moving_speed = speed
+
+
+class LookAtTracker(TrajectoryInterpolation):
+    """Endless trajectory making an Orbita actuator look at a moving target.
+
+    Args:
+        actuator (:py:class:`~reachy.parts.motor.OrbitaActuator`): actuator to orient
+        target (float, float, float): 3D point to look at
+        max_speed (float): maximum angular speed (in degrees per second)
+        smoothing (float): time constant (in seconds) of the low-pass filter applied to the target
+
+    At each tick of the scheduler, the target is filtered, the orientation looking at it is computed and moved toward by at most max_speed.
+    The disks angles are then solved by the cached Orbita model.
+    Tracking starts from the last orientation commanded to the actuator, or else from the one reached by the current targets of the disks.
+    If neither is known (e.g. the disks targets are not a reachable orientation), it starts looking straight ahead.
+    """
+
+    def __init__(self, actuator, target, max_speed=180, smoothing=0.1):
+        """Create the tracker."""
+        TrajectoryInterpolation.__init__(self, np.zeros(3), np.zeros(3), np.inf)
+
+        self.actuator = actuator
+        self.max_speed = max_speed
+        self.smoothing = smoothing
+
+        self.target = np.array(target, dtype=float)
+        self._filtered = self.target.copy()
+
+        q = actuator.commanded_orientation
+        if q is None:
+            # Not commanded with orient: start from the orientation reached by the current targets of the disks
+            thetas = np.array([disk.target_rot_position for disk in actuator.disks], dtype=float)
+            q = actuator.cached_model.quaternion_from_angles(thetas)
+        self._orientation = np.array([1.0, 0, 0, 0]) if q is None else np.asarray(q, dtype=float)
+        self._thetas = actuator.cached_model.angles_from_quaternions(self._orientation)
+        self._last_t = None
+        self._lock = Lock()
+
+    def start(self, motor, update_freq=100):
+        """Start tracking.
+
+        Args:
+            motor (list): disks of the actuator [top, middle, bottom]
+            update_freq (float): Update sample frequency (in Hz) of the shared trajectory scheduler
+        """
+        if list(motor) != self.actuator.disks:
+            raise ValueError('The tracker can only drive the disks of its actuator')
+
+        TrajectoryInterpolation.start(self, motor, update_freq=update_freq)
+
+    def update(self, x, y, z, max_speed=None, smoothing=None):
+        """Set a new target (and optionally new tracking parameters)."""
+        self.target = np.array((x, y, z), dtype=float)
+        if max_speed is not None:
+            self.max_speed = max_speed
+        if smoothing is not None:
+            self.smoothing = smoothing
+
+    @property
+    def orientation(self):
+        """Get the orientation currently commanded (as a w, x, y, z quaternion)."""
+        with self._lock:
+            return self._orientation.copy()
+
+    def interpolate(self, t):
+        """Get the disks angles at time t.
+
+        The tracking state only moves forward: called with a time older than the last one (e.g. to monitor the trajectory), the last angles are returned.
+        """
+        with self._lock:
+            if self._last_t is None:
+                self._last_t = t
+            if t <= self._last_t:
+                return self._thetas
+
+            dt = t - self._last_t
+            self._last_t = t
+
+            alpha = 1 - np.exp(-dt / self.smoothing) if self.smoothing > 0 else 1
+            self._filtered += alpha * (self.target - self._filtered)
+
+            goal = self.actuator.cached_model.quaternions_transform([1, 0, 0], self._filtered)[0]
+
+            # Rotate toward the goal orientation, by at most max_speed * dt degrees
+            angle = np.rad2deg(2 * np.arccos(np.clip(abs(np.dot(goal, self._orientation)), 0, 1)))
+            step = self.max_speed * dt
+            if angle > step:
+                goal = slerp(self._orientation, goal, step / angle)[0]
+
+            self._orientation = goal
+            self._thetas = self.actuator.cached_model.angles_from_quaternions(goal)
+            return self._thetas
+
+    def state(self, t):
+        """Get the disks angles last commanded (with null velocity and acceleration), without moving the tracker."""
+        with self._lock:
+            return self._thetas.copy(), np.zeros(3), np.zeros(3)
+
+    def velocity(self, t):
+        """Velocity of the disks, not tracked (always null)."""
+        return np.zeros(3)
+
+    def acceleration(self, t):
+        """Acceleration of the disks, not tracked (always null)."""
+        return np.zeros(3)
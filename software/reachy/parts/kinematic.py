@@ -2,11 +2,21 @@
 
 * Allow the creation of kinematic chain (following a simplified DH notation)
 * Compute the forward kinematic
+* Compute the geometric jacobian of the end effector
 * Provide optimization via scipy for inverse approximation
+* Provide a batched damped least squares solver to approximate the inverse of many poses at once
+* Provide a multi-start solver for hard targets
+* Provide a cache of previously solved poses to warm-start the inverse
 """
 
+import os
+import time
 import numpy as np
 
+from collections import defaultdict
+from concurrent.futures import wait
+from threading import Lock
+
 from scipy.spatial.transform import Rotation
 from scipy.optimize import minimize
 
@@ -16,27 +26,66 @@ class Link(object):
 
     Args:
         translation (:py:class:`~numpy.ndarray`): 3d translation from the previous link
-        rotation (:py:class:`~numpy.ndarray`): 3d euler rotation (xyz) from the previous link
+        rotation (:py:class:`~numpy.ndarray`): 3d rotation axis of the joint (scaled by the joint angle to get its rotation vector)
+
+    As the rotation axis is fixed, the terms of the Rodrigues' formula are precomputed so the rotation of N angles only costs a few element-wise operations.
     """
 
     def __init__(self, translation, rotation, bounds):
         """Create a new link."""
-        self.T = translation_matrix(translation)
-        self.rotation = np.array(rotation).reshape(1, 3)
+        self.translation = np.array(translation, dtype=float)
+        self.T = translation_matrix(self.translation)
+        self.rotation = np.array(rotation, dtype=float).reshape(1, 3)
         self.bounds = bounds
 
-    def transformation_matrix(self, theta):
+        # R(theta) = I + sin(s.theta) K + (1 - cos(s.theta)) K^2, with K the cross product matrix of the unit axis
+        self._scale = np.linalg.norm(self.rotation)
+        x, y, z = self.rotation[0] / self._scale if self._scale > 0 else np.zeros(3)
+        self._K = np.array((
+            (0, -z, y),
+            (z, 0, -x),
+            (-y, x, 0),
+        ))
+        self._K2 = np.dot(self._K, self._K)
+
+    def rotation_matrix(self, theta, out=None):
+        """Compute the rotation matrices of the joint for given angles.
+
+        Args:
+            theta (:py:class:`~numpy.ndarray`): N joint rotation angles (in radians)
+            out (:py:class:`~numpy.ndarray`): optional N*3*3 array where the result is stored
+
+        Returns:
+            :py:class:`~numpy.ndarray`: N*3*3 rotation matrices
+        """
+        theta = np.asarray(theta, dtype=float).reshape(-1, 1, 1) * self._scale
+        if out is None:
+            out = np.empty((theta.shape[0], 3, 3))
+
+        np.multiply(np.sin(theta), self._K, out=out)
+        out += (1 - np.cos(theta)) * self._K2
+        out += np.eye(3)
+        return out
+
+    def transformation_matrix(self, theta, out=None):
         """Compute local transformation matrix for given angle.
 
         Args:
-            theta (float): joint rotation angle (in radians)
+            theta (:py:class:`~numpy.ndarray`): N joint rotation angles (in radians)
+            out (:py:class:`~numpy.ndarray`): optional N*4*4 array where the result is stored
+
+        Returns:
+            :py:class:`~numpy.ndarray`: N*4*4 homogeneous matrices
         """
-        R = np.zeros((theta.shape[0], 4, 4))
-        theta = theta.reshape(1, -1)
+        theta = np.asarray(theta, dtype=float).reshape(-1)
+        if out is None:
+            out = np.empty((theta.shape[0], 4, 4))
 
-        R[:, :3, :3] = Rotation.from_rotvec(np.dot(theta.T, self.rotation)).as_matrix()
-        R[:, 3, 3] = 1
-        return np.matmul(self.T, R)
+        self.rotation_matrix(theta, out=out[:, :3, :3])
+        out[:, :3, 3] = self.translation
+        out[:, 3, :3] = 0
+        out[:, 3, 3] = 1
+        return out
 
 
 class Chain(object):
@@ -55,51 +104,246 @@ class Chain(object):
         """Get bounds for each link."""
         return [link.bounds for link in self.links]
 
-    def forward(self, joints):
+    def forward(self, joints, out=None):
         """
         Compute forward kinematics of the chain given joints configurations.
 
         Args:
             joints (:py:class:`~numpy.ndarray`): N*J array joint rotation angle for each link (in radians)
+            out (:py:class:`~numpy.ndarray`): optional N*4*4 array where the poses are stored (to avoid allocating a new one at each call)
 
         Returns:
-            :py:class:`~numpy.ndarray`: 4x4 homogeneous matrix pose of the end effector
+            :py:class:`~numpy.ndarray`: N*4*4 homogeneous matrix pose of the end effector
 
         .. warning:: this is a vectorized version of the forward!
         """
-        M = np.eye(4)
+        M, _ = self._forward(joints, out=out)
+        return M
+
+    def jacobian(self, joints):
+        """
+        Compute the geometric jacobian of the end effector given joints configurations.
 
-        for link, theta in zip(self.links, joints.T):
-            M = np.matmul(M, link.transformation_matrix(theta))
+        Args:
+            joints (:py:class:`~numpy.ndarray`): N*J array joint rotation angle for each link (in radians)
 
-        return M
+        Returns:
+            :py:class:`~numpy.ndarray`: N*6*J jacobian, the three first rows are the linear velocity and the three last the angular velocity of the end effector
 
-    def inverse(self, poses, q0s, maxiter=10):
+        .. warning:: this is a vectorized version of the jacobian!
+        """
+        _, J = self._forward_jacobian(joints)
+        return J
+
+    def _forward_jacobian(self, joints):
+        M, (origins, axes) = self._forward(joints, with_axes=True)
+        d = M[:, :3, 3:] - origins
+
+        J = np.empty((M.shape[0], 6, len(self.links)))
+        ax, ay, az = axes[:, 0], axes[:, 1], axes[:, 2]
+        dx, dy, dz = d[:, 0], d[:, 1], d[:, 2]
+        np.subtract(ay * dz, az * dy, out=J[:, 0])
+        np.subtract(az * dx, ax * dz, out=J[:, 1])
+        np.subtract(ax * dy, ay * dx, out=J[:, 2])
+        J[:, 3:] = axes
+        return M, J
+
+    def _forward(self, joints, out=None, with_axes=False):
+        # Only the rotation and position are propagated, as M.T.R(theta) is (Rot.R(theta), Pos + Rot.t).
+        # With the Rodrigues' formula, Rot.R(theta) = Rot + sin(s.theta) Rot.K + (1 - cos(s.theta)) Rot.K^2
+        # where Rot.K and Rot.K^2 are plain (3N x 3).(3 x 3) matrix products.
+        joints = np.asarray(joints, dtype=float)
+        N = joints.shape[0]
+
+        Rot = np.tile(np.eye(3), (N, 1, 1))
+        Pos = np.zeros((N, 3))
+        RK, RK2 = np.empty((N, 3, 3)), np.empty((N, 3, 3))
+
+        if with_axes:
+            origins = np.empty((N, 3, len(self.links)))
+            axes = np.empty((N, 3, len(self.links)))
+
+        for i, (link, theta) in enumerate(zip(self.links, joints.T)):
+            Pos += np.dot(Rot.reshape(-1, 3), link.translation).reshape(N, 3)
+
+            if with_axes:
+                # Frame of the joint, before its own rotation
+                origins[:, :, i] = Pos
+                axes[:, :, i] = np.dot(Rot.reshape(-1, 3), link.rotation[0]).reshape(N, 3)
+
+            if link._scale == 0:
+                continue
+
+            theta = (theta * link._scale).reshape(-1, 1, 1)
+            np.dot(Rot.reshape(-1, 3), link._K, out=RK.reshape(-1, 3))
+            np.dot(Rot.reshape(-1, 3), link._K2, out=RK2.reshape(-1, 3))
+            Rot += np.sin(theta) * RK
+            Rot += (1 - np.cos(theta)) * RK2
+
+        if out is None:
+            out = np.empty((N, 4, 4))
+        out[:, :3, :3] = Rot
+        out[:, :3, 3] = Pos
+        out[:, 3, :3] = 0
+        out[:, 3, 3] = 1
+
+        return out, ((origins, axes) if with_axes else None)
+
+    def inverse(self, poses, q0s, maxiter=None, method='auto', time_budget=None):
         """
         Approximate the inverse kinematics of the chain given end pose.
 
         Args:
             poses (:py:class:`~numpy.ndarray`): N*4*4 homogeneous matrix poses for the end effector
             q0s (:py:class:`~numpy.ndarray`): N*J initial joint configuration used to bootstrap the optimization
-            maxiter (int): maximum number of iteration to run on the optimizer
+            maxiter (int): maximum number of iteration to run on the optimizer, by default 10 (or the default of :py:meth:`inverse_multistart` for 'multistart')
+            method (str): 'minimize' (scipy optimization of each pose), 'dls' (all poses at once, see :py:meth:`inverse_dls`), 'multistart' (each pose from many seeds, see :py:meth:`inverse_multistart`), 'auto' uses 'dls' for more than one pose
+            time_budget (float): maximum duration (in seconds) of each pose solve, only used by 'multistart'
 
         .. warning:: this is a vectorized version of the forward!
         """
+        if method not in ('auto', 'minimize', 'dls', 'multistart'):
+            raise ValueError(f'method should be one of {("auto", "minimize", "dls", "multistart")}')
+
+        if method == 'multistart':
+            # Hard targets need more iterations than the default
+            options = {} if maxiter is None else {'maxiter': maxiter}
+            return np.array([
+                self.inverse_multistart(p, seeds=q0, time_budget=time_budget, **options)[0]
+                for p, q0 in zip(poses, q0s)
+            ])
+
+        if maxiter is None:
+            maxiter = 10
+
+        if method == 'dls' or (method == 'auto' and len(poses) > 1):
+            return self.inverse_dls(poses, q0s, maxiter=maxiter)
+
         return np.array([
             self._inverse(p, q0, maxiter)
             for p, q0 in zip(poses, q0s)
         ])
 
+    def inverse_multistart(
+        self, pose, seeds=None, nb_seeds=32, maxiter=100,
+        time_budget=None, tol=1e-6, executor=None, random_seed=None,
+    ):
+        """
+        Approximate the inverse kinematics of a hard target pose by starting from many seeds.
+
+        Args:
+            pose (:py:class:`~numpy.ndarray`): 4x4 homogeneous target pose for the end effector
+            seeds (:py:class:`~numpy.ndarray`): K*J configurations to try first (e.g. the current position or cached solutions)
+            nb_seeds (int): number of extra seeds drawn uniformly within the link bounds
+            maxiter (int): maximum number of iteration run from each seed
+            time_budget (float): maximum duration of the solve (in seconds), the best solution found so far is returned when exceeded
+            tol (float): error under which a solution is considered exact (the solve then stops early)
+            executor (:py:class:`~concurrent.futures.Executor`): optional pool (e.g. a :py:class:`~concurrent.futures.ProcessPoolExecutor`) to split the seeds among
+            random_seed (int): seed of the random generator drawing the seeds
+
+        Returns:
+            (:py:class:`~numpy.ndarray`, float): best joints configuration and its distance to the target (see :py:func:`pose_dist`)
+
+        All seeds are solved at once with :py:meth:`inverse_dls`, by rounds of a few iterations so the time budget can be checked.
+        With an executor, the seeds are split in chunks solved in parallel and only the chunks finished within the time budget are used.
+        """
+        start = time.monotonic()
+        pose = np.asarray(pose, dtype=float)
+        lb, ub = np.array(self.bounds, dtype=float).T
+        rng = np.random.default_rng(random_seed)
+
+        Q = lb + rng.random((nb_seeds, len(lb))) * (ub - lb)
+        if seeds is not None:
+            Q = np.concatenate((np.clip(np.atleast_2d(seeds), lb, ub), Q))
+        poses = np.repeat(pose.reshape(1, 4, 4), len(Q), axis=0)
+
+        if executor is not None:
+            workers = getattr(executor, '_max_workers', None) or os.cpu_count() or 1
+            chunks = np.array_split(np.arange(len(Q)), min(len(Q), workers))
+            futures = {
+                executor.submit(self.inverse_dls, poses[c], Q[c], maxiter=maxiter, tol=tol): c
+                for c in chunks
+            }
+            timeout = None if time_budget is None else max(time_budget - (time.monotonic() - start), 0)
+            done, not_done = wait(futures, timeout=timeout)
+            for f in not_done:
+                f.cancel()
+            for f in done:
+                Q[futures[f]] = f.result()
+
+        else:
+            nb_iter = 0
+            while nb_iter < maxiter:
+                # The last round is shortened so no more than maxiter iterations are run
+                n = min(10, maxiter - nb_iter)
+                Q = self.inverse_dls(poses, Q, maxiter=n, tol=tol)
+                nb_iter += n
+
+                if np.min(pose_dist(self.forward(Q), pose)) < tol:
+                    break
+                if time_budget is not None and time.monotonic() - start > time_budget:
+                    break
+
+        dist = pose_dist(self.forward(Q), pose)
+        best = np.argmin(dist)
+        return Q[best], dist[best]
+
+    def inverse_dls(self, poses, q0s, maxiter=100, damping=0.1, tol=1e-6):
+        """
+        Approximate the inverse kinematics of many poses at once using damped least squares (Levenberg-Marquardt).
+
+        Args:
+            poses (:py:class:`~numpy.ndarray`): N*4*4 homogeneous matrix poses for the end effector
+            q0s (:py:class:`~numpy.ndarray`): N*J initial joint configuration used to bootstrap the optimization
+            maxiter (int): maximum number of iteration
+            damping (float): initial damping factor (automatically adapted for each pose)
+            tol (float): error under which a pose is considered solved
+
+        All poses are iterated simultaneously using stacked jacobians, the joints are kept within the link bounds.
+        As in :py:func:`pose_dist`, 1m of position error is weighted as 0.2 rad of rotation error.
+        """
+        poses = np.asarray(poses, dtype=float)
+        lb, ub = np.array(self.bounds, dtype=float).T
+        weights = np.array([1, 1, 1, 0.2, 0.2, 0.2])
+
+        q = np.clip(np.array(q0s, dtype=float), lb, ub)
+        M, J = self._forward_jacobian(q)
+        e = pose_error(M, poses) * weights
+        err = np.linalg.norm(e, axis=1)
+        lam = np.full(len(q), float(damping))
+
+        for _ in range(maxiter):
+            idx = np.flatnonzero(err > tol)
+            if len(idx) == 0:
+                break
+
+            Jw = J[idx] * weights.reshape(1, 6, 1)
+            A = np.matmul(Jw, np.transpose(Jw, (0, 2, 1))) + (lam[idx] ** 2).reshape(-1, 1, 1) * np.eye(6)
+            dq = np.einsum('nij,ni->nj', Jw, np.linalg.solve(A, e[idx, :, np.newaxis])[:, :, 0])
+
+            q_new = np.clip(q[idx] + dq, lb, ub)
+            M_new, J_new = self._forward_jacobian(q_new)
+            e_new = pose_error(M_new, poses[idx]) * weights
+            err_new = np.linalg.norm(e_new, axis=1)
+
+            better = err_new < err[idx]
+            accepted = idx[better]
+            q[accepted], M[accepted], J[accepted] = q_new[better], M_new[better], J_new[better]
+            e[accepted], err[accepted] = e_new[better], err_new[better]
+
+            lam[idx] = np.clip(np.where(better, lam[idx] * 0.5, lam[idx] * 4), 1e-6, 1e3)
+
+        return q
+
     def _inverse(self, target, q0, maxiter):
         def forward_error(j):
-            M = self.forward(np.array(j).reshape(1, -1))[0]
-            d = pose_dist(M, target)
-
-            return d
+            M, J = self._forward_jacobian(np.array(j).reshape(1, -1))
+            return pose_dist_gradient(M[0], J[0], target)
 
         sol = minimize(
             forward_error,
             x0=q0,
+            jac=True,
             options={
                 'maxiter': maxiter,
             },
@@ -108,6 +352,151 @@ class Chain(object):
         return sol.x
 
 
+class IKCache(object):
+    """Bounded cache of previously solved (pose, joints) pairs used to warm-start the inverse kinematics.
+
+    Args:
+        max_size (int): maximum number of stored solutions, the oldest ones are evicted first
+        resolution (float): size of the voxels (in m) used to index the end effector positions
+        tolerance (float): pose distance (see :py:func:`pose_dist`) under which a new solution replaces a stored one instead of being added
+
+    Solutions are indexed by the voxel of their end effector position.
+    The nearest seed of a target pose is searched among the solutions of its voxel and of the 26 neighbouring ones, using the pose distance (so the orientation is taken into account).
+    The cache can be saved to and loaded from a .npz file to be reused between runs.
+    """
+
+    def __init__(self, max_size=10000, resolution=0.05, tolerance=1e-3):
+        """Create an empty cache."""
+        self.max_size = max_size
+        self.resolution = resolution
+        self.tolerance = tolerance
+
+        self._lock = Lock()
+        self._poses = np.empty((max_size, 4, 4))
+        self._joints = None
+        self._keys = [None] * max_size
+        self._voxels = defaultdict(list)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        """Get the number of stored solutions."""
+        return self._size
+
+    def __repr__(self):
+        """IK cache representation."""
+        return f'<IKCache size={len(self)}/{self.max_size} resolution={self.resolution}>'
+
+    def clear(self):
+        """Remove all stored solutions."""
+        with self._lock:
+            self._keys = [None] * self.max_size
+            self._voxels.clear()
+            self._next = 0
+            self._size = 0
+
+    def add(self, pose, joints):
+        """Store a solution.
+
+        Args:
+            pose (:py:class:`~numpy.ndarray`): 4x4 end effector pose
+            joints (:py:class:`~numpy.ndarray`): joints configuration reaching this pose (in radians)
+        """
+        pose = np.asarray(pose, dtype=float)
+        joints = np.asarray(joints, dtype=float)
+        key = self._key(pose)
+
+        with self._lock:
+            if self._joints is None:
+                self._joints = np.empty((self.max_size, len(joints)))
+
+            slots = self._voxels.get(key, [])
+            if slots:
+                d = pose_dist(self._poses[slots], pose)
+                closest = np.argmin(d)
+                if d[closest] < self.tolerance:
+                    self._joints[slots[closest]] = joints
+                    return
+
+            i = self._next
+            if self._keys[i] is not None:
+                self._evict(i)
+
+            self._poses[i] = pose
+            self._joints[i] = joints
+            self._keys[i] = key
+            self._voxels[key].append(i)
+
+            self._next = (i + 1) % self.max_size
+            self._size = min(self._size + 1, self.max_size)
+
+    def nearest(self, pose):
+        """Find the stored solution whose pose is the nearest from a target pose.
+
+        Args:
+            pose (:py:class:`~numpy.ndarray`): 4x4 target end effector pose
+
+        Returns:
+            (:py:class:`~numpy.ndarray`, float): joints configuration (in radians) and its pose distance to the target, or None if no solution is stored near the target
+        """
+        pose = np.asarray(pose, dtype=float)
+        x, y, z = self._key(pose)
+
+        with self._lock:
+            slots = [
+                i
+                for dx in (-1, 0, 1)
+                for dy in (-1, 0, 1)
+                for dz in (-1, 0, 1)
+                for i in self._voxels.get((x + dx, y + dy, z + dz), ())
+            ]
+            if not slots:
+                return None
+
+            d = pose_dist(self._poses[slots], pose)
+            closest = np.argmin(d)
+            return self._joints[slots[closest]].copy(), d[closest]
+
+    def save(self, filename):
+        """Save the stored solutions (from the oldest to the newest) to a .npz file."""
+        with self._lock:
+            order = (np.arange(self._size) + self._next - self._size) % self.max_size
+            np.savez(
+                filename,
+                poses=self._poses[order],
+                joints=self._joints[order] if self._joints is not None else np.empty((0, 0)),
+                params=np.array([self.max_size, self.resolution, self.tolerance]),
+            )
+
+    @classmethod
+    def load(cls, filename, max_size=None):
+        """Load a cache saved with :py:meth:`save`.
+
+        Args:
+            filename (str): path of the .npz file
+            max_size (int): maximum number of stored solutions (default to the one of the saved cache)
+        """
+        with np.load(filename) as data:
+            saved_size, resolution, tolerance = data['params']
+            cache = cls(
+                max_size=int(saved_size) if max_size is None else max_size,
+                resolution=resolution, tolerance=tolerance,
+            )
+            for pose, joints in zip(data['poses'], data['joints']):
+                cache.add(pose, joints)
+        return cache
+
+    def _key(self, pose):
+        return tuple(np.floor(pose[:3, 3] / self.resolution).astype(int))
+
+    def _evict(self, i):
+        slots = self._voxels[self._keys[i]]
+        slots.remove(i)
+        if not slots:
+            del self._voxels[self._keys[i]]
+        self._keys[i] = None
+
+
 def translation_matrix(translation):
     """Create homogenous matrix given a 3D translation vector."""
     M = np.eye(4)
@@ -115,16 +504,60 @@ def translation_matrix(translation):
     return M
 
 
+def pose_error(M, target):
+    """Compute the error vector between N current poses and N target poses.
+
+    Args:
+        M (:py:class:`~numpy.ndarray`): N*4*4 current poses
+        target (:py:class:`~numpy.ndarray`): N*4*4 target poses
+
+    Returns:
+        :py:class:`~numpy.ndarray`: N*6 errors, position error followed by the rotation error (as a rotation vector expressed in the base frame)
+    """
+    dP = target[:, :3, 3] - M[:, :3, 3]
+    R = np.matmul(target[:, :3, :3], np.transpose(M[:, :3, :3], (0, 2, 1)))
+
+    # Closed-form log map: the vee of (R - R^T) is 2.sin(angle).axis
+    v = np.stack((R[:, 2, 1] - R[:, 1, 2], R[:, 0, 2] - R[:, 2, 0], R[:, 1, 0] - R[:, 0, 1]), axis=1)
+    c = np.clip((np.trace(R, axis1=1, axis2=2) - 1) / 2, -1, 1)
+    angle = np.arccos(c)
+    sin = np.sqrt(1 - c ** 2)
+    scale = np.where(sin > 1e-6, angle / np.maximum(2 * sin, 1e-12), 0.5 + angle ** 2 / 12)
+    dR = v * scale[:, np.newaxis]
+
+    # The axis can not be recovered from R - R^T when the angle gets close to pi
+    near_pi = c < -0.99
+    if np.any(near_pi):
+        dR[near_pi] = Rotation.from_matrix(R[near_pi]).as_rotvec()
+
+    return np.concatenate((dP, dR), axis=1)
+
+
 def position_dist(P, Q):
-    """Compute euclidian distance between two 3D position."""
-    return np.linalg.norm(P - Q)
+    """Compute euclidian distance between 3D positions.
+
+    Args:
+        P (:py:class:`~numpy.ndarray`): 3d position (or N*3 positions)
+        Q (:py:class:`~numpy.ndarray`): 3d position (or N*3 positions)
+
+    Returns:
+        float or :py:class:`~numpy.ndarray`: distance (or N distances, inputs are broadcast against each other)
+    """
+    return np.linalg.norm(np.subtract(P, Q), axis=-1)
 
 
 def rotation_dist(P, Q):
-    """Compute rotation distance between two 3D rotation."""
-    R = np.matmul(P, Q.T)
+    """Compute rotation distance (angle of the relative rotation, in radians) between 3D rotations.
+
+    Args:
+        P (:py:class:`~numpy.ndarray`): 3x3 rotation matrix (or N*3*3 matrices)
+        Q (:py:class:`~numpy.ndarray`): 3x3 rotation matrix (or N*3*3 matrices)
 
-    A = (np.trace(R) - 1) / 2
+    Returns:
+        float or :py:class:`~numpy.ndarray`: distance (or N distances, inputs are broadcast against each other)
+    """
+    # trace(P.Q^T) is the sum of the element-wise product of P and Q
+    A = (np.einsum('...ij,...ij->...', P, Q) - 1) / 2
     A = np.clip(A, -1, 1)
 
     theta = np.arccos(A)
@@ -132,12 +565,21 @@ def rotation_dist(P, Q):
 
 
 def pose_dist(M1, M2, threshold=-1):
-    """Compute distance between two pose.
+    """Compute distance between poses.
+
+    Args:
+        M1 (:py:class:`~numpy.ndarray`): 4x4 pose (or N*4*4 poses)
+        M2 (:py:class:`~numpy.ndarray`): 4x4 pose (or N*4*4 poses)
+        threshold (float): distances under this threshold are returned as 0
+
+    Returns:
+        float or :py:class:`~numpy.ndarray`: distance (or N distances, inputs are broadcast against each other)
 
     The distance is defined as the sum of the position distance and the rotation distance where 1° of error is equal to 1mm error distance.
     """
-    P1, R1 = M1[:3, 3], M1[:3, :3]
-    P2, R2 = M2[:3, 3], M2[:3, :3]
+    M1, M2 = np.asarray(M1), np.asarray(M2)
+    P1, R1 = M1[..., :3, 3], M1[..., :3, :3]
+    P2, R2 = M2[..., :3, 3], M2[..., :3, :3]
 
     PD = position_dist(P1, P2)
     RD = rotation_dist(R1, R2)
@@ -145,4 +587,36 @@ def pose_dist(M1, M2, threshold=-1):
     # meaning 1m pos error ~ 0.2 rad rot error
     E = PD + 0.2 * RD
 
-    return E if E > threshold else 0
+    return np.where(E > threshold, E, 0)[()]
+
+
+def pose_dist_gradient(M, J, target):
+    """Compute the pose distance and its gradient with regard to the joints.
+
+    Args:
+        M (:py:class:`~numpy.ndarray`): 4x4 current end effector pose
+        J (:py:class:`~numpy.ndarray`): 6xJ geometric jacobian at the current configuration
+        target (:py:class:`~numpy.ndarray`): 4x4 target pose
+
+    Returns:
+        (float, :py:class:`~numpy.ndarray`): distance as defined in :py:func:`pose_dist` and its gradient
+    """
+    dP = M[:3, 3] - target[:3, 3]
+    PD = np.linalg.norm(dP)
+
+    R = np.matmul(M[:3, :3], target[:3, :3].T)
+    A = np.clip((np.trace(R) - 1) / 2, -1, 1)
+    RD = np.arccos(A)
+
+    grad = np.zeros(J.shape[1])
+
+    if PD > 0:
+        grad += np.dot(dP / PD, J[:3])
+
+    # The derivative of trace(R) for a rotation around w is w.v, with v the vee of (R.T - R)
+    sin = np.sqrt(1 - A ** 2)
+    if sin > 1e-9:
+        v = np.array((R[1, 2] - R[2, 1], R[2, 0] - R[0, 2], R[0, 1] - R[1, 0]))
+        grad += 0.2 * (-0.5 / sin) * np.dot(v, J[3:])
+
+    return PD + 0.2 * RD, grad
@@ -12,7 +12,10 @@ import numpy as np
 from threading import Timer
 from orbita import Actuator as OrbitaModel
 
-from ..trajectory.interpolation import interpolation_modes
+from .orbita_model import CachedOrbitaModel, slerp
+
+from ..trajectory.interpolation import MinimumJerk, Sampled, goto_trajectory
+from ..trajectory.scheduler import TrajectoryScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -24,9 +27,11 @@ class DynamixelMotor(object):
         root_part (str): name of the part where the motor is attached to (eg 'right_arm.hand')
         name (str): name of the motor (eg. 'shoulder_pitch')
         luos_motor (:py:class:`pyluos.modules.DxlMotor`): pyluos motor
-        config (dict): extra motor config (must include 'offset' and 'orientation' fields)
+        config (dict): extra motor config (must include 'offset' and 'orientation' fields, 'velocity-limit' and 'acceleration-limit' can also be given)
 
     Wrap the pyluos motor object to simplify and make the API homogeneous.
+
+    The velocity and acceleration limits (in degrees per second and per second squared) are used by the 'trapezoidal' goto interpolation.
     """
 
     def __init__(self, root_part, name, luos_motor, config):
@@ -39,6 +44,9 @@ class DynamixelMotor(object):
         self._offset = config['offset']
         self._direct = config['orientation'] == 'direct'
 
+        self.velocity_limit = config.get('velocity-limit')
+        self.acceleration_limit = config.get('acceleration-limit')
+
         self._timer = None
         self._use_static_fix = False
 
@@ -129,19 +137,22 @@ class DynamixelMotor(object):
 
         Args:
             goal_position (float): target position (in degrees)
-            duration (float): duration of the movement (in seconds)
+            duration (float): duration of the movement (in seconds), minimal duration for the 'trapezoidal' interpolation
             starting_point (str): register used to determine the starting point (eg. 'goal_position' can also be used in some specific case)
             wait (bool): whether or not to wait for the end of the motion
-            interpolation_mode (str): interpolation technique used for computing the trajectory ('linear', 'minjerk')
+            interpolation_mode (str): interpolation technique used for computing the trajectory ('linear', 'minjerk', 'trapezoidal')
 
         Returns:
             reachy.trajectory.TrajectoryPlayer: trajectory player that can be used to monitor the trajectory, stop it, etc
-        """
-        if interpolation_mode not in interpolation_modes.keys():
-            available = tuple(interpolation_modes.keys())
-            raise ValueError(f'interpolation_mode should be one of {available}')
 
-        traj_player = interpolation_modes[interpolation_mode](getattr(self, starting_point), goal_position, duration)
+        If the motor is still following a previous goto, the new trajectory replaces it.
+        It then starts from the currently commanded position, velocity and acceleration (starting_point is ignored).
+        """
+        traj_player = goto_trajectory(
+            self, goal_position, duration,
+            initial_position=getattr(self, starting_point),
+            interpolation_mode=interpolation_mode,
+        )
         traj_player.start(self)
 
         if wait:
@@ -202,16 +213,26 @@ class OrbitaActuator(object):
     * quaternion control
     * compliancy mode
     * goto
+
+    The disks angles are solved by :py:attr:`cached_model`, a vectorized and cached wrapper of the Orbita :py:attr:`model` (see :py:class:`~reachy.parts.orbita_model.CachedOrbitaModel`).
     """
 
+    # Maximum time to wait for the disks positions during the setup (in seconds)
+    ready_timeout = 0.25
+
     def __init__(
         self, root_part, name, disks_motor,
         Pc_z, Cp_z, R, R0, hardware_zero
     ):
         """Create a OrbitaActuator given its three disks controllers."""
+        self._root_part = root_part
+        self._name = name
+
         self.disk_bottom, self.disk_middle, self.disk_top = disks_motor
 
         self.model = OrbitaModel(Pc_z=Pc_z, Cp_z=Cp_z, R=R, R0=R0)
+        self.cached_model = CachedOrbitaModel(self.model)
+        self._orientation = None
         self._hardware_zero = hardware_zero
 
         self._compliancy = False
@@ -224,6 +245,11 @@ class OrbitaActuator(object):
                 f'"middle disk": {self.disk_middle.rot_position} '
                 f'"bottom disk": {self.disk_bottom.rot_position}>')
 
+    @property
+    def name(self):
+        """Fullname of the actuator (eg. head.neck)."""
+        return f'{self._root_part.name}.{self._name}'
+
     @property
     def disks(self):
         """Get three disks [top, middle, bottom]."""
@@ -249,38 +275,30 @@ class OrbitaActuator(object):
 
         Args:
             thetas (float, float, float): target position (in degrees) for each disks (top, middle, bottom)
-            duration (float): duration of the movement (in seconds)
+            duration (float): duration of the movement (in seconds), minimal duration for the 'trapezoidal' interpolation
             wait (bool): whether or not to wait for the end of the motion
-            interpolation_mode (str): interpolation technique used for computing the trajectory ('linear', 'minjerk')
+            interpolation_mode (str): interpolation technique used for computing the trajectory ('linear', 'minjerk', 'trapezoidal')
 
         Returns:
-            reachy.trajectory.TrajectoryPlayer: trajectory player that can be used to monitor the trajectory, stop it, etc
+            reachy.trajectory.interpolation.TrajectoryInterpolation: multi-axis trajectory driving the three disks, that can be used to monitor the trajectory, stop it, etc
         """
         if len(thetas) != len(self.disks):
             raise ValueError(f'Invalid thetas {thetas} (length should be {len(self.disks)}')
 
-        if interpolation_mode not in interpolation_modes.keys():
-            available = tuple(interpolation_modes.keys())
-            raise ValueError(f'interpolation_mode should be one of {available}')
-        Traj = interpolation_modes[interpolation_mode]
-
-        trajs = [
-            Traj(
-                initial_position=disk.target_rot_position,
-                goal_position=angle,
-                duration=duration,
-            )
-            for disk, angle in zip(self.disks, thetas)
-        ]
+        # The disks are directly commanded: the orientation reached is not known anymore
+        self._orientation = None
 
-        for disk, traj in zip(self.disks, trajs):
-            traj.start(disk)
+        traj = goto_trajectory(
+            self.disks, thetas, duration,
+            initial_position=[disk.target_rot_position for disk in self.disks],
+            interpolation_mode=interpolation_mode,
+        )
+        traj.start(self.disks)
 
         if wait:
-            for traj in trajs:
-                traj.wait()
+            traj.wait()
 
-        return trajs
+        return traj
 
     def point_at(self, vector, angle, duration, wait):
         """Make orbita point at the given vector.
@@ -294,24 +312,84 @@ class OrbitaActuator(object):
         Returns:
             reachy.trajectory.TrajectoryPlayer: trajectory player that can be used to monitor the trajectory, stop it, etc
         """
-        thetas = self.model.get_angles_from_vector(vector, angle)
+        thetas = self.cached_model.angles_from_vectors(vector, angle)
         # We used a reversed encoder so we need to inverse the angles
         return self.goto(thetas, duration=duration, wait=wait, interpolation_mode='minjerk')
 
-    def orient(self, quat, duration, wait):
+    def orient(self, quat, duration, wait, interpolation_mode='slerp'):
         """Orient orbita given a quaternion.
 
         Args:
             quat (pyquaternion.Quaterion): quaternion goal orientation
             duration (float): move duration (in seconds)
             wait (bool): whether or not to wait for the end of the motion
+            interpolation_mode (str): 'slerp' to follow the shortest rotation between the current and goal orientations, or a disk interpolation mode ('linear', 'minjerk', 'trapezoidal') to interpolate each disk independently
 
         Returns:
-            reachy.trajectory.TrajectoryPlayer: trajectory player that can be used to monitor the trajectory, stop it, etc
+            reachy.trajectory.interpolation.TrajectoryInterpolation: multi-axis trajectory driving the three disks, that can be used to monitor the trajectory, stop it, etc
+
+        With 'slerp', the orientation is interpolated on the geodesic with a minimum jerk timing.
+        The disks angles of all the samples are solved at once before the motion starts, then played at the scheduler rate.
+        It starts from the last orientation commanded with orient (or from where its trajectory currently is, if still moving).
+        If this orientation is not known (e.g. before the first orient, after a disk goto or a stopped orient), the disks are interpolated independently with minimum jerk.
         """
-        thetas = self.model.get_angles_from_quaternion(quat.w, quat.x, quat.y, quat.z)
-        # We used a reversed encoder so we need to inverse the angles
-        return self.goto(thetas, duration=duration, wait=wait, interpolation_mode='minjerk')
+        goal = np.array(quat.elements, dtype=float)
+        start = self.commanded_orientation if interpolation_mode == 'slerp' else None
+
+        # Taken before the trajectory is started: once it is finished, the elapsed time is always past its duration
+        t0 = time.monotonic()
+
+        if start is None:
+            thetas = self.cached_model.angles_from_quaternions(goal)
+            traj = self.goto(
+                thetas, duration=duration, wait=False,
+                interpolation_mode='minjerk' if interpolation_mode == 'slerp' else interpolation_mode,
+            )
+            self._orientation = (goal, goal, None, traj, t0)
+
+        else:
+            freq = TrajectoryScheduler.shared().update_freq
+            nb_samples = max(int(np.round(duration * freq)), 1) + 1
+            timing = MinimumJerk(0.0, 1.0, duration)
+
+            Q = slerp(start, goal, timing.interpolate(np.linspace(0, duration, nb_samples)))
+            traj = Sampled(self.cached_model.angles_from_quaternions(Q), freq=(nb_samples - 1) / duration)
+            traj.start(self.disks, update_freq=freq)
+            self._orientation = (start, goal, timing, traj, t0)
+
+        if wait:
+            traj.wait()
+
+        return traj
+
+    @property
+    def commanded_orientation(self):
+        """Get the orientation currently commanded with :py:meth:`orient` (as a w, x, y, z quaternion).
+
+        It is None if not known, e.g. before the first orient or once the disks were commanded otherwise.
+        """
+        if self._orientation is None:
+            return None
+
+        start, goal, timing, traj, t0 = self._orientation
+        elapsed = time.monotonic() - t0
+
+        if not traj._running.is_set():
+            # Stopped: the orientation reached is not known, the disks start again from their targets
+            return None
+        if elapsed >= traj.duration:
+            # The disks may have been commanded since, without going through orient (e.g. a disk goto or a direct target write)
+            targets = [disk.target_rot_position for disk in self.disks]
+            if not np.allclose(targets, traj.goal_position, atol=1e-3):
+                return None
+            return goal
+        if not traj.is_playing:
+            # Preempted before its end
+            return None
+        if timing is None:
+            # Disks interpolated independently: the orientation is not on the geodesic
+            return None
+        return slerp(start, goal, timing.interpolate(elapsed))[0]
 
     def setup(self):
         """Configure each of the three disks.
@@ -331,7 +409,11 @@ class OrbitaActuator(object):
 
             return zeros[best]
 
-        time.sleep(0.25)
+        # Wait for the first positions sent after the setup (sharing the same deadline)
+        deadline = time.monotonic() + self.ready_timeout
+        for disk in self.disks:
+            if not disk.wait_ready(timeout=max(deadline - time.monotonic(), 0)):
+                logger.warning('No position received from disk', extra={'disk': disk.name})
 
         for d, z in zip(self.disks, self._hardware_zero):
             d.offset = _find_zero(d, z) + 60
@@ -0,0 +1,350 @@
+"""Batched and cached Orbita model module.
+
+Wrap the :py:class:`orbita.Actuator` model to solve the disks angles of arrays of orientations in a single vectorized call.
+
+The model is split in two steps:
+
+* a pure computation of the raw disks angles of an orientation, memoized in a quantized LRU cache
+* the unwrapping of these angles (to avoid 2pi jumps of the disks), which depends on the previously solved orientations
+
+The unwrapping step is applied in order on the solved orientations and updates the state of the wrapped model (last_angles and offset).
+So the batched calls can be mixed with direct calls to the model.
+"""
+
+import numpy as np
+
+from collections import OrderedDict
+from threading import Lock
+from pyquaternion import Quaternion
+
+# Orientation of the frame of each disk, relatively to the platform frame (rotation of 0, +120 and -120 degrees around z0)
+_DISKS_ANGLES = np.deg2rad([0, 120, -120])
+
+
+class CachedOrbitaModel(object):
+    """Vectorized and cached wrapper of an Orbita model.
+
+    Args:
+        model (:py:class:`orbita.Actuator`): model to wrap (its last_angles and offset are kept up to date)
+        cache_size (int): maximum number of orientations kept in the cache (0 to disable the cache)
+        resolution (float): quantization step of the quaternions used as cache keys (1e-4 is about 0.01 degree)
+
+    The angles returned are exactly the ones the model computes, up to the cache quantization.
+    """
+
+    def __init__(self, model, cache_size=4096, resolution=1e-4):
+        """Wrap the model and precompute its disks frames."""
+        self.model = model
+        self.cache_size = cache_size
+        self.resolution = resolution
+
+        self._lock = Lock()
+        self._cache = OrderedDict()
+        self.hits, self.misses = 0, 0
+
+        # The raw angles only depend on the rotated x0 and z0 vectors of each disk frame
+        x0, z0 = np.asarray(model.x0, dtype=float), np.asarray(model.z0, dtype=float)
+        self._x0 = np.array([_rotate(x0, z0, a) for a in _DISKS_ANGLES]).T
+        self._z0 = np.array([_rotate(z0, z0, a) for a in _DISKS_ANGLES]).T
+
+    def clear_cache(self):
+        """Empty the cache and reset its statistics."""
+        with self._lock:
+            self._cache.clear()
+            self.hits, self.misses = 0, 0
+
+    def angles_from_quaternions(self, quaternions):
+        """Compute the disks angles reaching orientations.
+
+        Args:
+            quaternions (:py:class:`~numpy.ndarray`): N*4 quaternions (w, x, y, z), a single quaternion (or a :py:class:`pyquaternion.Quaternion`) is also accepted
+
+        Returns:
+            :py:class:`~numpy.ndarray`: N*3 angles (in degrees) of the top, middle and bottom disks, or 3 angles for a single quaternion
+
+        Equivalent to calling get_angles_from_quaternion of the model on each orientation in order.
+        """
+        single, Q = _as_quaternions(quaternions)
+
+        with self._lock:
+            raw = self._raw_angles(Q)
+
+            # Unwrap 2pi jumps as the model does: it depends on the previously solved angles, so it is applied in order
+            last = [float(a) for a in self.model.last_angles]
+            unwrapped = raw.tolist()
+            for row in unwrapped:
+                for j in range(3):
+                    if abs(row[j] - last[j]) >= 2.96 and last[j] != 0:
+                        row[j] += 2 * np.pi if last[j] > 0 else -2 * np.pi
+                last = row
+            raw = np.array(unwrapped).reshape(-1, 3)
+            self.model.last_angles = np.array(last)
+
+        angles = np.rad2deg(raw) + [0, -120, 120]
+        return angles[0] if single else angles
+
+    def angles_from_vectors(self, vectors, angles=0):
+        """Compute the disks angles pointing the platform toward vectors.
+
+        Args:
+            vectors (:py:class:`~numpy.ndarray`): N*3 vectors (or a single 3d vector)
+            angles (float or :py:class:`~numpy.ndarray`): rotation around each vector (in degrees)
+
+        Returns:
+            :py:class:`~numpy.ndarray`: N*3 angles (in degrees) of the top, middle and bottom disks, or 3 angles for a single vector
+
+        Equivalent to calling get_angles_from_vector of the model on each vector in order.
+        """
+        vectors = np.asarray(vectors, dtype=float)
+        single = vectors.ndim == 1
+        vectors = np.atleast_2d(vectors)
+        angles = np.broadcast_to(np.asarray(angles, dtype=float), (len(vectors), ))
+
+        q1 = self.quaternions_transform(self.model.z0, vectors)
+        with self._lock:
+            raw0 = self._raw_angles(q1)
+            raw = self._raw_angles(_multiply(q1, _z_rotations(self.model.z0, np.deg2rad(angles))))
+
+        # Unwrap as the model does: compare with the angles reached without rotation around the vector
+        raw += np.where((angles[:, np.newaxis] > 0) & (raw < raw0), 2 * np.pi, 0)
+        raw -= np.where((angles[:, np.newaxis] < 0) & (raw > raw0), 2 * np.pi, 0)
+        result = np.rad2deg(raw) + [0, -120, 120]
+
+        # Count the full turns of the disks, also depending on the previously solved angles
+        with self._lock:
+            last = np.array(self.model.last_angles, dtype=float)
+            offset = np.array(self.model.offset)
+            for i in range(len(result)):
+                jump = np.abs(last - result[i]) >= 180
+                offset[jump] += (np.sign(last - result[i]) * 360)[jump].astype(offset.dtype)
+                last = result[i].copy()
+                result[i] += offset
+            self.model.last_angles = last
+            self.model.offset = offset
+
+        return result[0] if single else result
+
+    def quaternions_transform(self, vect_origin, vect_target):
+        """Compute the quaternions rotating vectors onto target vectors.
+
+        Args:
+            vect_origin (:py:class:`~numpy.ndarray`): 3d vector (or N*3 vectors)
+            vect_target (:py:class:`~numpy.ndarray`): 3d vector (or N*3 vectors)
+
+        Returns:
+            :py:class:`~numpy.ndarray`: N*4 quaternions (w, x, y, z), identity where the vectors are already aligned
+
+        Vectorized version of find_quaternion_transform of the model.
+        """
+        vo, vt = np.broadcast_arrays(
+            np.atleast_2d(np.asarray(vect_origin, dtype=float)),
+            np.atleast_2d(np.asarray(vect_target, dtype=float)),
+        )
+        vo, vt = _normalize(vo), _normalize(vt)
+        V = _normalize(np.cross(vo, vt))
+
+        with np.errstate(invalid='ignore'):
+            alpha = np.arccos(np.sum(vo * vt, axis=1))
+        identity = np.isnan(alpha) | (alpha < 1e-6)
+        alpha = np.where(identity, 0, alpha)
+
+        return np.column_stack((np.cos(alpha / 2), np.sin(alpha / 2)[:, np.newaxis] * V))
+
+    def find_quaternion_transform(self, vect_origin, vect_target):
+        """Compute the quaternion rotating a vector onto a target vector (see :py:meth:`quaternions_transform`).
+
+        Returns:
+            :py:class:`pyquaternion.Quaternion`: the rotation quaternion
+        """
+        return Quaternion(self.quaternions_transform(vect_origin, vect_target)[0])
+
+    def quaternion_from_angles(self, angles, maxiter=20, tol=1e-9):
+        """Compute the orientation reached by disks angles (forward model).
+
+        Args:
+            angles (:py:class:`~numpy.ndarray`): angles (in degrees) of the top, middle and bottom disks
+            maxiter (int): maximum number of Gauss-Newton iterations
+            tol (float): tolerance on the disks angles (in radians)
+
+        Returns:
+            :py:class:`~numpy.ndarray`: the quaternion (w, x, y, z, with w >= 0), or None if no orientation reaching these angles was found
+
+        The model only solves the inverse problem, so the orientation is searched (starting from the identity) by Gauss-Newton iterations on its rotation vector.
+        Full turns of the disks are ignored and the state of the model is left untouched.
+        """
+        target = np.deg2rad(np.asarray(angles, dtype=float) - [0, -120, 120])
+
+        q = np.array([1.0, 0, 0, 0])
+        for _ in range(maxiter):
+            residual = _wrap(self._solve(q.reshape(1, 4))[0] - target)
+            if np.max(np.abs(residual)) < tol:
+                return q if q[0] >= 0 else -q
+
+            q = self._forward_step(q, residual)
+            if q is None:
+                return None
+
+        return None
+
+    def _forward_step(self, q, residual, eps=1e-6, max_halvings=10):
+        # Jacobian of the disks angles wrt small rotations of q around x, y and z
+        Q = np.vstack((q, _multiply(np.tile(q, (3, 1)), _from_rotation_vectors(eps * np.eye(3)))))
+        try:
+            raw = self._solve(Q)
+        except ValueError:
+            return None
+        J = _wrap(raw[1:] - raw[0]).T / eps
+
+        # Gauss-Newton step, halved while it leaves the workspace of the model
+        delta = -np.linalg.lstsq(J, residual, rcond=None)[0]
+        for _ in range(max_halvings):
+            step = _normalize(_multiply(q.reshape(1, 4), _from_rotation_vectors(delta))[0])
+            try:
+                self._solve(step.reshape(1, 4))
+                return step
+            except ValueError:
+                delta /= 2
+
+        return None
+
+    def _raw_angles(self, Q):
+        if self.cache_size <= 0:
+            self.misses += len(Q)
+            return self._solve(Q)
+
+        # q and -q are the same rotation
+        Q = Q * np.where(Q[:, :1] < 0, -1, 1)
+        keys = [k.tobytes() for k in np.round(Q / self.resolution).astype(np.int64)]
+
+        raw = np.empty((len(Q), 3))
+        missing = []
+        for i, k in enumerate(keys):
+            cached = self._cache.get(k)
+            if cached is None:
+                missing.append(i)
+            else:
+                raw[i] = cached
+                self._cache.move_to_end(k)
+
+        self.hits += len(Q) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            raw[missing] = self._solve(Q[missing])
+            for i in missing:
+                self._cache[keys[i]] = raw[i].copy()
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return raw
+
+    def _solve(self, Q):
+        # Vectorized version of the model _eq for the three disks frames of each orientation
+        R, Pc, C = self.model.R, self.model.Pc_z, self.model.Cp_z
+
+        M = _rotation_matrices(Q)
+        X = np.matmul(M, self._x0)
+        Z = np.matmul(M, self._z0)
+
+        d1 = R ** 2 * X[:, 2] ** 2 + R ** 2 * Z[:, 2] ** 2 - C[2] ** 2 + 2 * C[2] * Pc[2] - Pc[2] ** 2
+        if np.any(d1 < 0):
+            raise ValueError('math domain error')
+        d1 = np.sqrt(d1)
+
+        x2 = R * Z[:, 2] + C[2] - Pc[2]
+        sol1 = 2 * np.arctan2(R * X[:, 2] - d1, x2)
+        sol2 = 2 * np.arctan2(R * X[:, 2] + d1, x2)
+
+        deg1 = np.rad2deg(sol1)
+        q3 = np.where((deg1 >= 0) & (deg1 <= 180), sol1, sol2)
+
+        cos, sin = np.cos(q3), np.sin(q3)
+        return np.arctan2(
+            Z[:, 1] * cos + X[:, 1] * sin,
+            Z[:, 0] * cos + X[:, 0] * sin,
+        )
+
+
+def slerp(q0, q1, s):
+    """Spherically interpolate between two quaternions.
+
+    Args:
+        q0 (:py:class:`~numpy.ndarray`): starting quaternion (w, x, y, z)
+        q1 (:py:class:`~numpy.ndarray`): end quaternion (w, x, y, z)
+        s (:py:class:`~numpy.ndarray`): N interpolation parameters (0 gives q0, 1 gives q1)
+
+    Returns:
+        :py:class:`~numpy.ndarray`: N*4 unit quaternions on the shortest arc (the geodesic) from q0 to q1
+    """
+    q0 = np.asarray(q0, dtype=float) / np.linalg.norm(q0)
+    q1 = np.asarray(q1, dtype=float) / np.linalg.norm(q1)
+    s = np.asarray(s, dtype=float).reshape(-1, 1)
+
+    dot = np.dot(q0, q1)
+    if dot < 0:
+        q1, dot = -q1, -dot
+
+    if dot > 0.9995:
+        Q = q0 + s * (q1 - q0)
+        return Q / np.linalg.norm(Q, axis=1, keepdims=True)
+
+    theta = np.arccos(dot)
+    return (np.sin((1 - s) * theta) * q0 + np.sin(s * theta) * q1) / np.sin(theta)
+
+
+def _as_quaternions(quaternions):
+    if isinstance(quaternions, Quaternion):
+        quaternions = quaternions.elements
+
+    Q = np.asarray(quaternions, dtype=float)
+    single = Q.ndim == 1
+    Q = np.atleast_2d(Q)
+    return single, Q / np.linalg.norm(Q, axis=1, keepdims=True)
+
+
+def _normalize(v):
+    n = np.linalg.norm(v, axis=-1, keepdims=True)
+    return np.divide(v, n, out=np.zeros_like(v), where=n > 0)
+
+
+def _rotate(v, axis, angle):
+    # Rodrigues' rotation of v around a unit axis
+    axis = axis / np.linalg.norm(axis)
+    return v * np.cos(angle) + np.cross(axis, v) * np.sin(angle) + axis * np.dot(axis, v) * (1 - np.cos(angle))
+
+
+def _z_rotations(z0, angles):
+    z0 = np.asarray(z0, dtype=float)
+    return np.column_stack((np.cos(angles / 2), np.outer(np.sin(angles / 2), z0)))
+
+
+def _from_rotation_vectors(V):
+    # Quaternions of N*3 rotation vectors (axis * angle in radians)
+    V = np.atleast_2d(V)
+    theta = np.linalg.norm(V, axis=1, keepdims=True)
+    axis = np.divide(V, theta, out=np.zeros_like(V), where=theta > 0)
+    return np.column_stack((np.cos(theta / 2), np.sin(theta / 2) * axis))
+
+
+def _wrap(a):
+    return (a + np.pi) % (2 * np.pi) - np.pi
+
+
+def _multiply(q, r):
+    w1, x1, y1, z1 = q.T
+    w2, x2, y2, z2 = r.T
+    return np.column_stack((
+        w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+        w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+        w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+        w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+    ))
+
+
+def _rotation_matrices(Q):
+    w, x, y, z = Q.T
+    return np.stack((
+        np.stack((1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)), axis=-1),
+        np.stack((2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)), axis=-1),
+        np.stack((2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)), axis=-1),
+    ), axis=1)
@@ -1,5 +1,6 @@
 """Part abstraction module."""
 
+import time
 import numpy as np
 
 from .motor import DynamixelMotor, OrbitaActuator
@@ -23,6 +24,8 @@ class ReachyPart(object):
         """Create a new part."""
         self.name = name
         self.motors = []
+        self.orbita_actuators = []
+        self._state_reader = None
 
         if isinstance(io, IO):
             self.io = io
@@ -60,6 +63,7 @@ class ReachyPart(object):
         disks_motor = self.io.find_orbita_disks()
         orb = OrbitaActuator(self, name, disks_motor, **config)
         setattr(self, name, orb)
+        self.orbita_actuators.append(orb)
         return orb
 
     def attach_kinematic_chain(self, dxl_motors):
@@ -68,16 +72,128 @@ class ReachyPart(object):
         Args:
             dxl_motors (dict): dynamixel motors config (as given in attach_dxl_motors), the config should also include 'link-translation' and 'link-rotation' for each motor
         """
-        def compute_bounds(m):
-            pos = np.array(m['angle-limits'])
-            bounds = (pos if m['orientation'] == 'direct' else -pos) - m['offset']
-            bounds = np.deg2rad(bounds)
-            lb = min(bounds)
-            rb = max(bounds)
-
-            return (lb, rb)
-
-        self.kin_chain = Chain([
-            Link(m['link-translation'], m['link-rotation'], compute_bounds(m))
-            for m in dxl_motors.values()
+        self.kin_chain = kinematic_chain(dxl_motors)
+
+    @property
+    def state_motors(self):
+        """Get the name of the motors (and orbita disks) in the order used by :py:meth:`state`."""
+        return self._get_state_reader().names
+
+    def state(self, out=None):
+        """Capture the state of all the motors (and orbita disks) of the part.
+
+        Args:
+            out (:py:class:`~numpy.ndarray`): structured array (of dtype :py:attr:`state_dtype`) where to store the state
+
+        Returns:
+            :py:class:`~numpy.ndarray`: structured array with the capture timestamp and an array per register (see :py:class:`StateReader`)
+        """
+        return self._get_state_reader().read(out)
+
+    @property
+    def state_dtype(self):
+        """Get the dtype of the structured array returned by :py:meth:`state`."""
+        return self._get_state_reader().dtype
+
+    def _get_state_reader(self):
+        if self._state_reader is None:
+            self._state_reader = StateReader(self.motors, self.orbita_actuators)
+        return self._state_reader
+
+
+class StateReader(object):
+    """Read the registers of many motors at once.
+
+    Args:
+        motors (list): :py:class:`~reachy.parts.motor.DynamixelMotor` to read
+        orbita_actuators (list): :py:class:`~reachy.parts.motor.OrbitaActuator` whose disks are also read
+
+    The state is stored in a structured array (see :py:attr:`dtype`) holding the capture timestamp (in seconds since the epoch) and one array per register.
+    Motors follow the order of :py:attr:`names`, a register not received yet is set to nan.
+
+    The raw registers of the dynamixel motors and orbita disks are read directly from the IO, their offset (and orientation) are applied at once to all motors.
+    States can be stored in a preallocated array, e.g. to log them at a high rate::
+
+        log = np.zeros(1000, dtype=reader.dtype)
+        for i in range(len(log)):
+            reader.read(out=log[i])
+    """
+
+    registers = ('present_position', 'goal_position', 'temperature', 'compliant')
+
+    def __init__(self, motors, orbita_actuators=()):
+        """Precompute the conversion of the registers of the motors."""
+        self.motors = list(motors)
+        self.disks = [d for orb in orbita_actuators for d in orb.disks]
+        self._modules = [m._motor for m in self.motors] + [getattr(d, 'luos_disk', d) for d in self.disks]
+
+        self.names = [m.name for m in self.motors] + [
+            f'{orb.name}.{name}'
+            for orb in orbita_actuators
+            for name in ('disk_top', 'disk_middle', 'disk_bottom')
+        ]
+
+        self._signs = np.array([1.0 if m.is_direct() else -1.0 for m in self.motors])
+        self._offsets = np.array([m.offset for m in self.motors], dtype=float)
+
+        n = len(self.names)
+        self.dtype = np.dtype([('timestamp', 'f8')] + [
+            (r, '?' if r == 'compliant' else 'f8', (n, ))
+            for r in self.registers
         ])
+
+    def read(self, out=None):
+        """Capture the current state.
+
+        Args:
+            out (:py:class:`~numpy.ndarray`): structured array (of dtype :py:attr:`dtype`) where to store the state, a new one is allocated by default
+
+        Returns:
+            :py:class:`~numpy.ndarray`: the state
+        """
+        if out is None:
+            out = np.zeros((), dtype=self.dtype)
+
+        n = len(self.motors)
+
+        # A single pass on the raw registers, None (not received yet) becomes nan
+        values = np.array([
+            (m.rot_position, m.target_rot_position, m.temperature, m.compliant)
+            for m in self._modules
+        ], dtype=float).reshape(-1, 4)
+
+        # Offset and orientation of the dynamixel motors
+        values[:n, :2] *= self._signs[:, np.newaxis]
+        values[:n, :2] -= self._offsets[:, np.newaxis]
+
+        # Offset of the orbita disks (read at each capture, as it is found again at each setup of the actuator)
+        values[n:, :2] -= np.array([getattr(d, 'offset', 0) for d in self.disks], dtype=float)[:, np.newaxis]
+
+        out['timestamp'] = time.time()
+        out['present_position'][:] = values[:, 0]
+        out['goal_position'][:] = values[:, 1]
+        out['temperature'][:] = values[:, 2]
+        out['compliant'][:] = values[:, 3] == 1
+
+        return out
+
+
+def kinematic_chain(dxl_motors):
+    """Create the kinematic chain composed of the given motors.
+
+    Args:
+        dxl_motors (dict): dynamixel motors config, including 'link-translation' and 'link-rotation' for each motor (see :py:meth:`ReachyPart.attach_kinematic_chain`)
+    """
+    def compute_bounds(m):
+        pos = np.array(m['angle-limits'])
+        bounds = (pos if m['orientation'] == 'direct' else -pos) - m['offset']
+        bounds = np.deg2rad(bounds)
+        lb = min(bounds)
+        rb = max(bounds)
+
+        return (lb, rb)
+
+    return Chain([
+        Link(m['link-translation'], m['link-rotation'], compute_bounds(m))
+        for m in dxl_motors.values()
+    ])
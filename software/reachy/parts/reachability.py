@@ -0,0 +1,183 @@
+"""Reachability map module.
+
+Precompute which positions an end effector can reach by sampling the joint space of its kinematic chain.
+The result is a voxel grid storing for each voxel:
+
+* the number of sampled configurations reaching it (0 meaning unreachable)
+* the best manipulability (see :py:func:`manipulability`) found among them
+* the configuration with the best manipulability, which makes a good seed for the inverse kinematics
+
+Once built (which takes a while), the map can be saved and then loaded to answer queries in constant time.
+"""
+
+import numpy as np
+
+
+class ReachabilityMap(object):
+    """Voxel grid of the positions reachable by an end effector.
+
+    Args:
+        origin (:py:class:`~numpy.ndarray`): 3d position of the corner of the first voxel (in m)
+        resolution (float): size of the voxels (in m)
+        counts (:py:class:`~numpy.ndarray`): X*Y*Z number of sampled configurations reaching each voxel
+        manipulability (:py:class:`~numpy.ndarray`): X*Y*Z best manipulability reached in each voxel
+        seed_index (:py:class:`~numpy.ndarray`): X*Y*Z index of the seed of each voxel (-1 if the voxel is unreachable)
+        seeds (:py:class:`~numpy.ndarray`): K*J joints configurations (in radians)
+
+    Use :py:meth:`build` to compute the map of a :py:class:`~reachy.parts.kinematic.Chain` and :py:meth:`save` / :py:meth:`load` to store it.
+    Only the position of the end effector is considered, a reachable voxel may not be reachable with every orientation.
+    """
+
+    def __init__(self, origin, resolution, counts, manipulability, seed_index, seeds):
+        """Create the map from its voxel grids."""
+        self.origin = np.asarray(origin, dtype=float)
+        self.resolution = float(resolution)
+        self.counts = counts
+        self.manipulability = manipulability
+        self.seed_index = seed_index
+        self.seeds = seeds
+
+    def __repr__(self):
+        """Reachability map representation."""
+        return f'<ReachabilityMap shape={self.shape} resolution={self.resolution} reachable_voxels={len(self.seeds)}>'
+
+    @property
+    def shape(self):
+        """Get the number of voxels along each axis."""
+        return self.counts.shape
+
+    @classmethod
+    def build(cls, chain, nb_samples=1000000, resolution=0.02, batch_size=10000, random_seed=None):
+        """Compute the reachability map of a kinematic chain.
+
+        Args:
+            chain (:py:class:`~reachy.parts.kinematic.Chain`): kinematic chain to sample
+            nb_samples (int): number of joints configurations to sample (uniformly within the chain bounds)
+            resolution (float): size of the voxels (in m)
+            batch_size (int): number of configurations sent to the forward kinematics at once
+            random_seed (int): seed of the random generator (for reproducible maps)
+        """
+        rng = np.random.default_rng(random_seed)
+        lb, ub = np.array(chain.bounds, dtype=float).T
+
+        # The end effector always lies within the sum of the links lengths from the base
+        reach = sum(np.linalg.norm(link.translation) for link in chain.links)
+        size = int(np.ceil(2 * reach / resolution)) + 1
+        origin = np.full(3, -size * resolution / 2)
+        shape = (size, size, size)
+
+        counts = np.zeros(size ** 3, dtype=np.uint32)
+        best = np.full(size ** 3, -1, dtype=np.float32)
+        seeds = np.zeros((size ** 3, len(chain.links)), dtype=np.float32)
+
+        for start in range(0, nb_samples, batch_size):
+            n = min(batch_size, nb_samples - start)
+            q = lb + rng.random((n, len(lb))) * (ub - lb)
+
+            M, J = chain._forward_jacobian(q)
+            idx = np.ravel_multi_index(
+                np.floor((M[:, :3, 3] - origin) / resolution).astype(int).T,
+                shape,
+            )
+            m = manipulability(J)
+
+            counts += np.bincount(idx, minlength=counts.size).astype(np.uint32)
+
+            # Keep the configuration with the best manipulability of each voxel
+            order = np.lexsort((-m, idx))
+            voxels, first = np.unique(idx[order], return_index=True)
+            winners = order[first]
+            better = m[winners] > best[voxels]
+            best[voxels[better]] = m[winners[better]]
+            seeds[voxels[better]] = q[winners[better]]
+
+        reached = np.flatnonzero(counts)
+        seed_index = np.full(size ** 3, -1, dtype=np.int32)
+        seed_index[reached] = np.arange(len(reached))
+
+        return cls(
+            origin=origin,
+            resolution=resolution,
+            counts=counts.reshape(shape),
+            manipulability=np.maximum(best, 0).reshape(shape),
+            seed_index=seed_index.reshape(shape),
+            seeds=seeds[reached],
+        )
+
+    def save(self, filename):
+        """Save the map to a .npz file."""
+        np.savez_compressed(
+            filename,
+            origin=self.origin,
+            resolution=self.resolution,
+            counts=self.counts,
+            manipulability=self.manipulability,
+            seed_index=self.seed_index,
+            seeds=self.seeds,
+        )
+
+    @classmethod
+    def load(cls, filename):
+        """Load a map saved with :py:meth:`save`."""
+        with np.load(filename) as data:
+            return cls(**{k: data[k] for k in data.files})
+
+    def voxel(self, position):
+        """Get the index of the voxels containing 3d positions.
+
+        Args:
+            position (:py:class:`~numpy.ndarray`): 3d position (or N*3 positions, or 4x4 / N*4*4 poses) in m
+
+        Returns:
+            (:py:class:`~numpy.ndarray`, :py:class:`~numpy.ndarray`): flat voxel indices and whether each position lies inside the grid
+        """
+        position = np.asarray(position, dtype=float)
+        if position.shape[-2:] == (4, 4):
+            position = position[..., :3, 3]
+
+        ijk = np.floor((position - self.origin) / self.resolution).astype(int)
+        inside = np.all((ijk >= 0) & (ijk < self.shape), axis=-1)
+        ijk = np.where(inside[..., np.newaxis], ijk, 0)
+
+        return np.ravel_multi_index(np.moveaxis(ijk, -1, 0), self.shape), inside
+
+    def is_reachable(self, position, min_count=1):
+        """Check whether positions can be reached.
+
+        Args:
+            position (:py:class:`~numpy.ndarray`): 3d position (or N*3 positions, or 4x4 / N*4*4 poses) in m
+            min_count (int): minimum number of sampled configurations in a voxel to consider it reachable
+
+        Returns:
+            bool or :py:class:`~numpy.ndarray`: whether each position is reachable
+        """
+        idx, inside = self.voxel(position)
+        return inside & (self.counts.ravel()[idx] >= min_count)
+
+    def manipulability_at(self, position):
+        """Get the best manipulability found in the voxels of positions (0 if unreachable)."""
+        idx, inside = self.voxel(position)
+        return np.where(inside, self.manipulability.ravel()[idx], 0)
+
+    def seed(self, position):
+        """Get the best seed configuration (in radians) for a position, or None if it is unreachable."""
+        idx, inside = self.voxel(position)
+        if not inside:
+            return None
+
+        i = self.seed_index.ravel()[idx]
+        return self.seeds[i].astype(float) if i >= 0 else None
+
+
+def manipulability(J):
+    """Compute the Yoshikawa translational manipulability index of jacobians.
+
+    Args:
+        J (:py:class:`~numpy.ndarray`): N*6*J geometric jacobians (see :py:meth:`~reachy.parts.kinematic.Chain.jacobian`)
+
+    Returns:
+        :py:class:`~numpy.ndarray`: N manipulability indices, sqrt(det(Jv.Jv^T)), 0 at a singular configuration
+    """
+    Jv = J[:, :3]
+    det = np.linalg.det(np.matmul(Jv, np.transpose(Jv, (0, 2, 1))))
+    return np.sqrt(np.maximum(det, 0))
@@ -7,6 +7,8 @@ import numpy as np
 from operator import attrgetter
 
 from .parts import LeftArm, RightArm, Head
+from .parts.part import StateReader
+from .trajectory.interpolation import goto_trajectory
 
 
 logger = logging.getLogger(__name__)
@@ -58,6 +60,9 @@ class Reachy(object):
             self._parts.append(head)
         self.head = head
 
+        self._motors = sum([p.motors for p in self.parts], [])
+        self._state_reader = StateReader(self._motors, sum([p.orbita_actuators for p in self.parts], []))
+
         logger.info(
             'Connected to reachy',
             extra={
@@ -87,8 +92,35 @@ class Reachy(object):
 
     @property
     def motors(self):
-        """List of all motors in the attached parts."""
-        return sum([p.motors for p in self.parts], [])
+        """List of all motors in the attached parts (gathered once at creation)."""
+        return self._motors
+
+    @property
+    def state_motors(self):
+        """Get the name of the motors (and orbita disks) in the order used by :py:meth:`state`."""
+        return self._state_reader.names
+
+    def state(self, out=None):
+        """Capture the state of all the motors (and orbita disks) of the robot.
+
+        Args:
+            out (:py:class:`~numpy.ndarray`): structured array (of dtype :py:attr:`state_dtype`) where to store the state
+
+        Returns:
+            :py:class:`~numpy.ndarray`: structured array with the capture timestamp and an array per register (see :py:class:`~reachy.parts.part.StateReader`)
+
+        All the registers are read in a single pass, so it can be polled at a high rate (e.g. for logging)::
+
+            states = np.zeros(1000, dtype=reachy.state_dtype)
+            for i in range(len(states)):
+                reachy.state(out=states[i])
+        """
+        return self._state_reader.read(out)
+
+    @property
+    def state_dtype(self):
+        """Get the dtype of the structured array returned by :py:meth:`state`."""
+        return self._state_reader.dtype
 
     def goto(self,
              goal_positions, duration,
@@ -99,25 +131,30 @@ class Reachy(object):
 
         Args:
             goal_positions (dict): desired target position (in the form {'full_motor_name': target_position})
-            duration (float): move duration (in sec.)
+            duration (float): move duration (in sec.), minimal duration for the 'trapezoidal' interpolation
             starting_point (str): register to use to retrieve the starting point (e.g. 'present_postion' or 'goal_position')
             wait (bool): whether or not to wait for the end motion before returning
-            interpolation_mode (str): interpolation used for computing the trajectory (e.g. 'linear' or 'minjerk')
+            interpolation_mode (str): interpolation used for computing the trajectory (e.g. 'linear', 'minjerk' or 'trapezoidal')
 
         Returns:
-            list: list of reachy.trajectory.TrajectoryPlayer (one for each controlled motor)
+            reachy.trajectory.interpolation.TrajectoryInterpolation: multi-axis trajectory driving all the given motors
 
+        All motors are driven by a single multi-axis trajectory, so they are updated in the same control tick.
+        Motors which are still moving are retargeted from their currently commanded position, velocity and acceleration.
         """
-        trajs = []
+        motors = [attrgetter(motor_name)(self) for motor_name in goal_positions.keys()]
 
-        for i, (motor_name, goal_pos) in enumerate(goal_positions.items()):
-            last = wait and (i == len(goal_positions) - 1)
+        traj = goto_trajectory(
+            motors, list(goal_positions.values()), duration,
+            initial_position=[getattr(m, starting_point) for m in motors],
+            interpolation_mode=interpolation_mode,
+        )
+        traj.start(motors)
 
-            motor = attrgetter(motor_name)(self)
-            trajs.append(motor.goto(goal_pos, duration, starting_point,
-                         wait=last, interpolation_mode=interpolation_mode))
+        if wait:
+            traj.wait()
 
-        return trajs
+        return traj
 
     def need_cooldown(self, temperature_limit=50):
         """
@@ -2,3 +2,5 @@
 
 from .recorder import TrajectoryRecorder  # noqa: F401
 from .player import TrajectoryPlayer  # noqa: F401
+from .scheduler import TrajectoryScheduler  # noqa: F401
+from .storage import open_trajectory, save_trajectory  # noqa: F401
@@ -0,0 +1,152 @@
+"""Cartesian trajectory module.
+
+Move an end effector along a straight line: its position is linearly interpolated and its orientation is slerped.
+The joints configuration is computed at each control tick by a few iterations of damped least squares inverse kinematics,
+warm-started from the solution of the previous tick (which is always very close).
+"""
+
+import numpy as np
+
+from threading import Lock
+from scipy.spatial.transform import Rotation
+
+from .interpolation import TrajectoryInterpolation, Linear, MinimumJerk
+
+timing_modes = {
+    'linear': Linear,
+    'minjerk': MinimumJerk,
+}
+
+
+class CartesianTrajectory(TrajectoryInterpolation):
+    """Straight line end effector trajectory followed in joint space.
+
+    Args:
+        chain (:py:class:`~reachy.parts.kinematic.Chain`): kinematic chain of the end effector
+        initial_position (list): starting joints configuration of the whole chain (in degrees)
+        goal_pose (:py:class:`~numpy.ndarray`): 4x4 target pose of the end effector
+        duration (float): duration of the movement (in seconds)
+        interpolation_mode (str): time scaling along the line ('linear' or 'minjerk')
+        maxiter (int): maximum number of inverse kinematics iterations per tick
+
+    The trajectory only drives the joints which can actually move the end effector (fixed links, such as a gripper, are left untouched).
+    Their indices in the chain are given by :py:attr:`joints`, positions are returned for these joints only.
+    Its goal_position is the configuration reaching the goal pose from the initial one, the actual final configuration is the one found by following the line.
+    """
+
+    def __init__(self, chain, initial_position, goal_pose, duration, interpolation_mode='minjerk', maxiter=10):
+        """Create the trajectory and solve its goal configuration."""
+        if interpolation_mode not in timing_modes.keys():
+            raise ValueError(f'interpolation_mode should be one of {tuple(timing_modes.keys())}')
+
+        self.chain = chain
+        self.maxiter = maxiter
+        self.joints = [i for i, link in enumerate(chain.links) if np.any(link.rotation)]
+
+        self._q0 = np.deg2rad(np.asarray(initial_position, dtype=float))
+        self._q = self._q0.copy()
+        self._lock = Lock()
+
+        self.initial_pose = chain.forward(self._q0.reshape(1, -1))[0]
+        self.goal_pose = np.asarray(goal_pose, dtype=float)
+
+        self._timing = timing_modes[interpolation_mode](0.0, 1.0, duration)
+
+        # Slerp: R(s) = R0.exp(s.w) with w the rotation vector from R0 to R1, expanded with the Rodrigues' formula
+        w = Rotation.from_matrix(np.dot(self.initial_pose[:3, :3].T, self.goal_pose[:3, :3])).as_rotvec()
+        self._angle = np.linalg.norm(w)
+        x, y, z = w / self._angle if self._angle > 0 else np.zeros(3)
+        K = np.array(((0, -z, y), (z, 0, -x), (-y, x, 0)))
+        self._R0K = np.dot(self.initial_pose[:3, :3], K)
+        self._R0K2 = np.dot(self._R0K, K)
+
+        # Twist of the end effector along the line for ds/dt = 1 (linear velocity and angular velocity, in the base frame)
+        self._twist = np.concatenate((self.goal_pose[:3, 3] - self.initial_pose[:3, 3], np.dot(self.initial_pose[:3, :3], w)))
+
+        goal = chain.inverse_dls(self.goal_pose.reshape(1, 4, 4), self._q0.reshape(1, -1), maxiter=100)[0]
+        TrajectoryInterpolation.__init__(
+            self,
+            np.rad2deg(self._q0[self.joints]), np.rad2deg(goal[self.joints]),
+            duration,
+        )
+
+    def pose(self, t):
+        """Get the target pose of the end effector at given time.
+
+        Args:
+            t (float or :py:class:`~numpy.ndarray`): time (or array of times)
+
+        Returns:
+            :py:class:`~numpy.ndarray`: 4x4 pose (or T*4*4 poses for an array of times)
+        """
+        s = self._timing.interpolate(np.clip(t, 0, self.duration))
+        s1 = np.atleast_1d(s)
+
+        M = np.tile(np.eye(4), (len(s1), 1, 1))
+        theta = (s1 * self._angle).reshape(-1, 1, 1)
+        M[:, :3, :3] = self.initial_pose[:3, :3] + np.sin(theta) * self._R0K + (1 - np.cos(theta)) * self._R0K2
+        M[:, :3, 3] = self.initial_pose[:3, 3] + np.outer(s1, self.goal_pose[:3, 3] - self.initial_pose[:3, 3])
+
+        return M if np.ndim(s) > 0 else M[0]
+
+    def interpolate(self, t):
+        """Solve the joints configuration reaching the pose at time t.
+
+        Each solve is warm-started from the previously computed configuration.
+        Arrays of times are solved in order, each one starting from the previous one.
+        """
+        poses = self.pose(np.atleast_1d(t))
+        Q = np.empty((len(poses), len(self.joints)))
+
+        with self._lock:
+            for i, pose in enumerate(poses):
+                self._q = self.chain.inverse_dls(pose.reshape(1, 4, 4), self._q.reshape(1, -1), maxiter=self.maxiter)[0]
+                Q[i] = np.rad2deg(self._q[self.joints])
+
+        return Q if np.ndim(t) > 0 else Q[0]
+
+    def velocity(self, t):
+        """Get the joints velocity at time t (see :py:meth:`state`)."""
+        return self._state_array(t, 1)
+
+    def acceleration(self, t):
+        """Get the joints acceleration at time t (see :py:meth:`state`)."""
+        return self._state_array(t, 2)
+
+    def state(self, t):
+        """Get the joints position, velocity and acceleration at time t, without changing the followed trajectory.
+
+        The configuration is solved from the last computed one, but not stored.
+        Velocity and acceleration are obtained from the twist V of the end effector along the line, through the jacobian pseudo-inverse,
+        and the derivatives of the time scaling s(t): dq = J+.V.ds and ddq = J+.V.dds + d(J+.V)/ds.ds^2.
+        """
+        t = float(np.clip(t, 0, self.duration))
+
+        with self._lock:
+            q = self._q.copy()
+        q = self.chain.inverse_dls(self.pose(t).reshape(1, 4, 4), q.reshape(1, -1), maxiter=self.maxiter)[0]
+
+        ds, dds = self._timing.velocity(t), self._timing.acceleration(t)
+        u = self._joints_rate(q)
+        h = 1e-4
+        du = (self._joints_rate(q + h * u) - self._joints_rate(q - h * u)) / (2 * h)
+
+        return tuple(np.rad2deg(x[self.joints]) for x in (q, u * ds, u * dds + du * ds ** 2))
+
+    def _joints_rate(self, q):
+        # Joints velocity moving the end effector along the line at ds/dt = 1
+        J = self.chain.jacobian(q.reshape(1, -1))[0][:, self.joints]
+        u = np.zeros_like(q)
+        u[self.joints] = np.dot(np.linalg.pinv(J), self._twist)
+        return u
+
+    def _state_array(self, t, i):
+        if np.ndim(t) == 0:
+            return self.state(t)[i]
+        return np.array([self.state(ti)[i] for ti in t])
+
+    def sample(self, freq=100):
+        """Compute the whole trajectory at once (starting again from the initial configuration)."""
+        with self._lock:
+            self._q = self._q0.copy()
+        return TrajectoryInterpolation.sample(self, freq)
@@ -1,61 +1,149 @@
 """Trajectory interpolation utility module.
 
-This module defines various interpolation technique (linear, minimum jerk).
+This module defines various interpolation technique (linear, minimum jerk, trapezoidal velocity profile) and a trajectory following precomputed samples.
 They can be used in all goto functions.
 """
-import time
 import numpy as np
 
-from threading import Thread, Event
+from threading import Event
 from scipy.interpolate import interp1d
 
+from .scheduler import TrajectoryScheduler
+from .storage import TrajectoryFile
+
 
 class TrajectoryInterpolation(object):
     """Trajectory interpolation abstraction class.
 
     Args:
-        initial_position (float): starting position (in degrees)
-        goal_position (float): end position (in degrees)
+        initial_position (float or list): starting position (in degrees), one value per axis for multi-axis trajectories
+        goal_position (float or list): end position (in degrees), one value per axis for multi-axis trajectories
         duration (float): duration of the movement (in seconds)
 
     You can defined your own interpolation technique by respecting this abstraction so they can be used in goto functions.
+
+    A trajectory can drive a single motor or several motors at once (multi-axis).
+    In this case, initial and goal positions are given as vectors, and the trajectory is started on a list of motors.
     """
 
     def __init__(self, initial_position, goal_position, duration):
         """Create your interpolation object."""
+        if np.ndim(initial_position) > 0 or np.ndim(goal_position) > 0:
+            initial_position, goal_position = np.broadcast_arrays(
+                np.asarray(initial_position, dtype=float),
+                np.asarray(goal_position, dtype=float),
+            )
+
         self.initial_position = initial_position
         self.goal_position = goal_position
         self.duration = duration
 
-        self._t = None
         self._running = Event()
+        self._finished = Event()
+        self._finished.set()
+
+    @classmethod
+    def from_state(
+        cls,
+        initial_position, goal_position, duration,
+        initial_velocity=0, initial_acceleration=0,
+        max_velocity=None, max_acceleration=None,
+    ):
+        """Create an interpolation starting from a given motion state.
+
+        Args:
+            initial_position (float or list): starting position (in degrees)
+            goal_position (float or list): end position (in degrees)
+            duration (float): duration of the movement (in seconds)
+            initial_velocity (float or list): current velocity (in degrees per second)
+            initial_acceleration (float or list): current acceleration (in degrees per second squared)
+            max_velocity (float or list): velocity limit of each motor (in degrees per second)
+            max_acceleration (float or list): acceleration limit of each motor (in degrees per second squared)
+
+        Used by the goto functions, for instance to retarget a motor which is already moving.
+        Interpolation techniques that can not take the initial velocity and acceleration (or the limits) into account simply ignore them.
+        """
+        return cls(initial_position, goal_position, duration)
 
     def interpolate(self, t):
         """Interpolate the position at given time.
 
         Args:
-            t (float): time where to interpolate
+            t (float or :py:class:`~numpy.ndarray`): time (or array of times) where to interpolate
+
+        Returns:
+            the position for each axis, an array of shape T*axes is returned if an array of T times is given
 
         You are responsible for implementing this method in your own interpolation technique.
         Please refer to the implementation of Linear of MinimumJerk for examples.
         """
         raise NotImplementedError
 
+    def velocity(self, t):
+        """Get the velocity at given time.
+
+        Args:
+            t (float or :py:class:`~numpy.ndarray`): time (or array of times) where to compute the velocity
+
+        Computed by finite differences by default, override it if you know the exact derivative.
+        """
+        dt = 1e-3
+        return (self.interpolate(t + dt) - self.interpolate(t - dt)) / (2 * dt)
+
+    def acceleration(self, t):
+        """Get the acceleration at given time.
+
+        Args:
+            t (float or :py:class:`~numpy.ndarray`): time (or array of times) where to compute the acceleration
+
+        Computed by finite differences by default, override it if you know the exact derivative.
+        """
+        dt = 1e-3
+        return (self.interpolate(t + dt) - 2 * self.interpolate(t) + self.interpolate(t - dt)) / (dt ** 2)
+
+    def state(self, t):
+        """Get the position, velocity and acceleration at given time.
+
+        Args:
+            t (float): time where to compute the state
+
+        Used by the scheduler to query the state commanded by a trajectory while it is followed (e.g. to preempt it smoothly).
+        Trajectories whose interpolate updates an internal state must override it, so querying the state has no side effect.
+        """
+        return self.interpolate(t), self.velocity(t), self.acceleration(t)
+
+    def sample(self, freq=100):
+        """Compute the whole trajectory at once.
+
+        Args:
+            freq (float): sample frequency (in Hz)
+
+        Returns:
+            :py:class:`~numpy.ndarray`: positions sampled every 1/freq seconds from 0 to duration (included)
+        """
+        nb_samples = int(np.round(self.duration * freq)) + 1
+        return self.interpolate(np.linspace(0, self.duration, nb_samples))
+
     def start(self, motor, update_freq=100):
-        """Start the interpolation trajectory thread.
+        """Start following the interpolation trajectory.
 
         Args:
-            motor (motor): motor to apply the trajectory to
-            update_freq (float): Update sample frequency (in Hz)
+            motor (motor or list): motor to apply the trajectory to (or list of motors, one for each axis)
+            update_freq (float): Update sample frequency (in Hz) of the shared trajectory scheduler
+
+        The trajectory is followed by the :py:class:`~reachy.trajectory.scheduler.TrajectoryScheduler` shared by all motors.
         """
-        self._t = Thread(target=lambda: self._follow_traj_loop(motor, update_freq))
+        scheduler = TrajectoryScheduler.shared()
+        scheduler.update_freq = update_freq
+
         self._running.set()
-        self._t.start()
+        self._finished.clear()
+        scheduler.add(motor, self)
 
     @property
     def is_playing(self):
         """Check if the trajectory is currently playing."""
-        return self._t is not None and self._t.is_alive()
+        return not self._finished.is_set()
 
     def stop(self, wait=True):
         """Stop the interpolation trajectory."""
@@ -65,24 +153,11 @@ class TrajectoryInterpolation(object):
 
     def wait(self):
         """Block until the end of the trajectory interpolation."""
-        if self.is_playing:
-            self._t.join()
-
-    def _follow_traj_loop(self, motor, update_freq):
-        t0 = time.time()
+        self._finished.wait()
 
-        while self._running.is_set():
-            t = time.time() - t0
-            if t > self.duration:
-                break
-
-            pos = self.interpolate(t)
-            if hasattr(motor, 'goal_position'):
-                motor.goal_position = pos
-            else:
-                motor.target_rot_position = pos
-
-            time.sleep(1 / update_freq)
+    def _time_axis(self, t):
+        # Reshape t so it broadcasts against the trajectory axes (T -> T*1 for multi-axis)
+        return np.reshape(t, np.shape(t) + (1, ) * np.ndim(self.goal_position))
 
 
 class Linear(TrajectoryInterpolation):
@@ -90,20 +165,31 @@ class Linear(TrajectoryInterpolation):
 
     def interpolate(self, t):
         """Linear interpolation at time t."""
+        t = self._time_axis(t)
         return self.initial_position + (self.goal_position - self.initial_position) * t / self.duration
 
+    def velocity(self, t):
+        """Linear velocity at time t."""
+        return (self.goal_position - self.initial_position) / self.duration + np.zeros_like(self._time_axis(t), dtype=float)
+
+    def acceleration(self, t):
+        """Linear acceleration at time t (always null)."""
+        return np.zeros(np.shape(t) + np.shape(self.goal_position))
+
 
 class MinimumJerk(TrajectoryInterpolation):
     """Minimum Jerk interpolation implementation.
 
     Args:
-        initial_position (float): starting position (in degrees)
-        goal_position (float): end position (in degrees)
+        initial_position (float or list): starting position (in degrees)
+        goal_position (float or list): end position (in degrees)
         duration (float): duration of the movement (in seconds)
-        initial_velocity (float): initial velocity used for interpolation
-        final_velocity (float): final velocity used for interpolation
-        initial_acceleration (float): initial acceleration used for interpolation
-        final_acceleration (float): final acceleration used for interpolation
+        initial_velocity (float or list): initial velocity used for interpolation
+        final_velocity (float or list): final velocity used for interpolation
+        initial_acceleration (float or list): initial acceleration used for interpolation
+        final_acceleration (float or list): final acceleration used for interpolation
+
+    The polynomial coefficients of all axes are computed at once and evaluated in Horner form.
     """
 
     def __init__(
@@ -114,9 +200,9 @@ class MinimumJerk(TrajectoryInterpolation):
         """Create the minjerk interpolation."""
         TrajectoryInterpolation.__init__(self, initial_position, goal_position, duration)
 
-        a0 = initial_position
-        a1 = initial_velocity
-        a2 = initial_acceleration / 2
+        a0 = self.initial_position
+        a1 = np.asarray(initial_velocity, dtype=float)
+        a2 = np.asarray(initial_acceleration, dtype=float) / 2
 
         d1, d2, d3, d4, d5 = [duration ** i for i in range(1, 6)]
 
@@ -125,38 +211,200 @@ class MinimumJerk(TrajectoryInterpolation):
             (3 * d2, 4 * d3, 5 * d4),
             (6 * d1, 12 * d2, 20 * d3)
         ))
-        B = np.array((
-            goal_position - a0 - (a1 * d1) - (a2 * d2),
+        B = np.array(np.broadcast_arrays(
+            self.goal_position - a0 - (a1 * d1) - (a2 * d2),
             final_velocity - a1 - (2 * a2 * d1),
             final_acceleration - (2 * a2)
         ))
-        X = np.linalg.solve(A, B)
+        X = np.linalg.solve(A, B.reshape(3, -1)).reshape(B.shape)
 
-        self._coeffs = [
+        self._coeffs = np.array(np.broadcast_arrays(
             a0,
             a1,
             a2,
             X[0],
             X[1],
             X[2]
-        ]
+        ))
+
+        powers = np.arange(1, 6).reshape((-1, ) + (1, ) * self._coeffs[0].ndim)
+        self._vel_coeffs = self._coeffs[1:] * powers
+        self._acc_coeffs = self._vel_coeffs[1:] * powers[:-1]
 
     def interpolate(self, t):
         """Minjerk interpolation at time t."""
-        return np.sum([
-            c * t ** i
-            for i, c in enumerate(self._coeffs)
-        ], axis=0)
+        return self._horner(self._coeffs, t)
+
+    def velocity(self, t):
+        """Minjerk velocity at time t."""
+        return self._horner(self._vel_coeffs, t)
+
+    def acceleration(self, t):
+        """Minjerk acceleration at time t."""
+        return self._horner(self._acc_coeffs, t)
+
+    @classmethod
+    def from_state(
+        cls,
+        initial_position, goal_position, duration,
+        initial_velocity=0, initial_acceleration=0,
+        max_velocity=None, max_acceleration=None,
+    ):
+        """Create a minjerk interpolation continuing the current velocity and acceleration."""
+        return cls(
+            initial_position, goal_position, duration,
+            initial_velocity=initial_velocity, initial_acceleration=initial_acceleration,
+        )
+
+    def _horner(self, coeffs, t):
+        t = self._time_axis(t)
+
+        res = coeffs[-1]
+        for c in coeffs[-2::-1]:
+            res = res * t + c
+        return res
+
+
+class Trapezoidal(TrajectoryInterpolation):
+    """Time-optimal trapezoidal velocity profile interpolation.
+
+    Args:
+        initial_position (float or list): starting position (in degrees)
+        goal_position (float or list): end position (in degrees)
+        duration (float): minimal duration of the movement (in seconds), use 0 to move as fast as the limits allow
+        max_velocity (float or list): velocity limit of each axis (in degrees per second)
+        max_acceleration (float or list): acceleration limit of each axis (in degrees per second squared)
+
+    Each axis accelerates at its maximum acceleration, cruises and then decelerates.
+    The duration is the longest time needed by an axis to reach its goal (or the given duration if longer).
+    All axes are then synchronised on this duration by lowering their cruise velocity, so they all finish together.
+
+    .. note:: The actual duration of the movement can be checked with the duration attribute.
+    """
+
+    default_max_velocity = 180
+    default_max_acceleration = 360
+
+    def __init__(self, initial_position, goal_position, duration=0, max_velocity=None, max_acceleration=None):
+        """Create the trapezoidal interpolation."""
+        TrajectoryInterpolation.__init__(self, initial_position, goal_position, duration)
+
+        if max_velocity is None:
+            max_velocity = self.default_max_velocity
+        if max_acceleration is None:
+            max_acceleration = self.default_max_acceleration
+
+        v = np.broadcast_to(np.asarray(max_velocity, dtype=float), np.shape(self.goal_position))
+        a = np.broadcast_to(np.asarray(max_acceleration, dtype=float), np.shape(self.goal_position))
+        if np.any(v <= 0) or np.any(a <= 0):
+            raise ValueError('max_velocity and max_acceleration should be strictly positive')
+
+        delta = np.asarray(self.goal_position - self.initial_position, dtype=float)
+        d = np.abs(delta)
+
+        # Minimal time for each axis (triangular profile if the cruise velocity is never reached)
+        min_time = np.where(d >= v ** 2 / a, d / v + v / a, 2 * np.sqrt(d / a))
+        self.duration = max(float(duration), float(np.max(min_time)))
+
+        # Cruise velocity so every axis ends at the same time
+        T = self.duration
+        if T > 0:
+            vc = (a * T - np.sqrt(np.maximum(a ** 2 * T ** 2 - 4 * a * d, 0))) / 2
+        else:
+            vc = np.zeros_like(d)
+
+        self._sign = np.sign(delta)
+        self._dist = d
+        self._acc = a
+        self._cruise_velocity = vc
+        self._acc_time = vc / a
+
+    def interpolate(self, t):
+        """Trapezoidal interpolation at time t."""
+        t, ta, tb, T = self._phases(t)
+        a, vc, d = self._acc, self._cruise_velocity, self._dist
+
+        s = np.where(
+            t < ta, 0.5 * a * t ** 2,
+            np.where(t < tb, 0.5 * a * ta ** 2 + vc * (t - ta), d - 0.5 * a * (T - t) ** 2),
+        )
+        return self.initial_position + self._sign * s
+
+    def velocity(self, t):
+        """Trapezoidal velocity at time t."""
+        t, ta, tb, T = self._phases(t)
+        a, vc = self._acc, self._cruise_velocity
+
+        v = np.where(t < ta, a * t, np.where(t < tb, vc, a * (T - t)))
+        return self._sign * v
+
+    def acceleration(self, t):
+        """Trapezoidal acceleration at time t."""
+        t, ta, tb, T = self._phases(t)
+        a = self._acc
+
+        acc = np.where(t < ta, a, np.where(t < tb, 0, -a))
+        return self._sign * np.where(t >= T, 0, acc)
+
+    @classmethod
+    def from_state(
+        cls,
+        initial_position, goal_position, duration,
+        initial_velocity=0, initial_acceleration=0,
+        max_velocity=None, max_acceleration=None,
+    ):
+        """Create a trapezoidal interpolation respecting the motors limits (the initial velocity and acceleration are ignored)."""
+        return cls(
+            initial_position, goal_position, duration,
+            max_velocity=max_velocity, max_acceleration=max_acceleration,
+        )
+
+    def _phases(self, t):
+        T = self.duration
+        t = np.clip(self._time_axis(t), 0, T)
+        return t, self._acc_time, T - self._acc_time, T
+
+
+class Sampled(TrajectoryInterpolation):
+    """Trajectory following precomputed positions.
+
+    Args:
+        positions (:py:class:`~numpy.ndarray`): T positions (or T*axes positions for multi-axis trajectories) sampled at a constant frequency
+        freq (float): sample frequency (in Hz)
+
+    Used to play trajectories that are expensive to compute (e.g. through an inverse model) and can thus be solved ahead of playback.
+    Positions between two samples are linearly interpolated.
+    """
+
+    def __init__(self, positions, freq):
+        """Create the trajectory from its samples."""
+        positions = np.asarray(positions, dtype=float)
+        if len(positions) < 2:
+            raise ValueError('A sampled trajectory needs at least two samples')
+
+        TrajectoryInterpolation.__init__(self, positions[0], positions[-1], (len(positions) - 1) / freq)
+        self.positions = positions
+        self.freq = freq
+
+    def interpolate(self, t):
+        """Interpolate between the samples surrounding time t."""
+        x = np.clip(np.asarray(t, dtype=float) * self.freq, 0, len(self.positions) - 1)
+        i = np.minimum(x.astype(int), len(self.positions) - 2)
+        a = self._time_axis(x - i)
+        return self.positions[i] * (1 - a) + self.positions[i + 1] * a
 
 
 def cubic_smooth(traj, nb_kp, out_points=-1):
     """Trjaectory cubic smooth interpolation.
 
     Args:
-        traj (dict): trajectory to smooth ({motor_name: list of motor pos})
+        traj (dict): trajectory to smooth ({motor_name: list of motor pos}), a :py:class:`~reachy.trajectory.storage.TrajectoryFile` can also be used
         nb_kp (int): number of keypoints to use for the cubic smoothing
         out_points (int): number of samples in the output trajectory (use -1 to conserve the same number as the input trajectory)
     """
+    if isinstance(traj, TrajectoryFile):
+        traj = traj.trajectories
+
     as_dict = isinstance(traj, dict) or isinstance(traj, np.lib.npyio.NpzFile)
 
     if as_dict:
@@ -188,4 +436,58 @@ def cubic_smooth(traj, nb_kp, out_points=-1):
 interpolation_modes = {
     'linear': Linear,
     'minjerk': MinimumJerk,
+    'trapezoidal': Trapezoidal,
 }
+
+
+def goto_trajectory(motors, goal_position, duration, initial_position, interpolation_mode='linear'):
+    """Create the trajectory used by a goto.
+
+    Args:
+        motors (motor or list): motor (or list of motors) that will follow the trajectory
+        goal_position (float or list): target position (in degrees)
+        duration (float): duration of the movement (in seconds)
+        initial_position (float or list): starting position (in degrees) used for the motors which are not moving
+        interpolation_mode (str): interpolation technique used for computing the trajectory (see interpolation_modes)
+
+    The velocity and acceleration limits of each motor are read from their velocity_limit and acceleration_limit attributes (if set).
+
+    If a motor is already driven by a trajectory, the new one starts from its currently commanded position, velocity and acceleration.
+    Once started, it preempts the previous trajectory on this motor, so reactive behaviors can retarget motors without jerks.
+    """
+    if interpolation_mode not in interpolation_modes.keys():
+        available = tuple(interpolation_modes.keys())
+        raise ValueError(f'interpolation_mode should be one of {available}')
+    Traj = interpolation_modes[interpolation_mode]
+
+    multi = isinstance(motors, (list, tuple))
+    if not multi:
+        motors, initial_position = [motors], [initial_position]
+
+    scheduler = TrajectoryScheduler.shared()
+
+    pos = np.array(initial_position, dtype=float)
+    vel, acc = np.zeros_like(pos), np.zeros_like(pos)
+
+    max_vel = np.array([_motor_limit(m, 'velocity_limit', Trapezoidal.default_max_velocity) for m in motors])
+    max_acc = np.array([_motor_limit(m, 'acceleration_limit', Trapezoidal.default_max_acceleration) for m in motors])
+
+    for i, m in enumerate(motors):
+        state = scheduler.commanded_state(m)
+        if state is not None:
+            pos[i], vel[i], acc[i] = state
+
+    if not multi:
+        pos, vel, acc = pos[0], vel[0], acc[0]
+        max_vel, max_acc = max_vel[0], max_acc[0]
+
+    return Traj.from_state(
+        pos, goal_position, duration,
+        initial_velocity=vel, initial_acceleration=acc,
+        max_velocity=max_vel, max_acceleration=max_acc,
+    )
+
+
+def _motor_limit(motor, name, default):
+    limit = getattr(motor, name, None)
+    return float(default if limit is None else limit)
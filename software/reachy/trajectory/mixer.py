@@ -21,35 +21,11 @@ def norm_sigmoid(n, r):
     """
     y = sigmoid(np.linspace(-r, r, n))
     y = y - y.min()
-    y = y / y.max()
+    if y.max() > 0:
+        y = y / y.max()
     return y
 
 
-def _combine(m1, m2, overlap, r):
-    n1, y = m1.shape
-    n2 = m2.shape[0]
-
-    w = int(np.round((n1 + n2) * overlap))
-    n = n1 + n2 - w
-
-    M1 = np.zeros((n, y))
-    M1[:n1] = m1
-
-    M2 = np.zeros((n, y))
-    M2[-n2:] = m2
-
-    a = n - n2
-    b = n1
-
-    W = np.zeros((n, 1))
-    W[:a] = 1
-    W[a:b, 0] = 1 - norm_sigmoid(b - a, r)
-    W[b:] = 0
-
-    M = ((M1 * W) + (M2 * (1 - W)))
-    return M
-
-
 def traj_as_array(traj):
     """Transform a trajectory dict into a numpy 2D array.
 
@@ -64,22 +40,77 @@ def combine(*trajs, overlap=0.1, r=5):
 
     Args:
         trajs (list): list of trajectories (as dict)
-        overlap (float): overlap recovery percentage for combining trajectories
-        r (int): sigmoid slope factor used to merge two trajectories
+        overlap (float or list): overlap recovery percentage for combining trajectories (or one value per junction)
+        r (int or list): sigmoid slope factor used to merge two trajectories (or one value per junction)
+
+    The trajectories may use different motors.
+    A motor missing from a trajectory holds its last value (or its first known value if it did not appear yet).
+
+    The position of each trajectory in the result is computed up front, so the result is allocated once and each overlap is blended in place.
     """
-    motors = set([tuple(t.keys()) for t in trajs])
-    if len(motors) != 1:
-        raise ValueError('All trajs must use the same motors!')
-    motors = motors.pop()
+    if len(trajs) == 0:
+        raise ValueError('At least one traj must be given!')
+
+    nb_junctions = len(trajs) - 1
+    overlaps = _per_junction(overlap, nb_junctions, 'overlap')
+    slopes = _per_junction(r, nb_junctions, 'r')
+
+    motors = []
+    for t in trajs:
+        motors += [m for m in t.keys() if m not in motors]
+    motor_index = {m: i for i, m in enumerate(motors)}
 
     moves = [traj_as_array(t) for t in trajs]
 
-    m1 = moves[0]
+    # Compute where each move starts in the result and how much it overlaps the previous ones
+    starts, widths = [0], [0]
+    n = moves[0].shape[0]
+    for m2, o in zip(moves[1:], overlaps):
+        n2 = m2.shape[0]
+        w = int(np.clip(np.round((n + n2) * o), 0, min(n, n2)))
+
+        starts.append(n - w)
+        widths.append(w)
+        n += n2 - w
+
+    first_values = {}
+    for t, move in zip(trajs, moves):
+        for i, m in enumerate(t.keys()):
+            first_values.setdefault(m, move[0, i])
+
+    M = np.empty((n, len(motors)))
+
+    for t, move, a, w, k in zip(trajs, moves, starts, widths, [None] + slopes):
+        b = a + w
+        end = a + move.shape[0]
+
+        present = np.array([motor_index[m] for m in t.keys()], dtype=int)
+        missing = np.array([i for m, i in motor_index.items() if m not in t], dtype=int)
 
-    for m2 in moves[1:]:
-        m1 = _combine(m1, m2, overlap, r)
+        if a == 0:
+            hold = np.array([first_values[motors[i]] for i in missing])
+        else:
+            hold = M[b - 1, missing]
+
+        if w > 0:
+            W = (1 - norm_sigmoid(w, k)).reshape(-1, 1)
+            M[a:b, present] = M[a:b, present] * W + move[:w] * (1 - W)
+            M[a:b, missing] = M[a:b, missing] * W + hold * (1 - W)
+
+        M[b:end, present] = move[w:]
+        M[b:end, missing] = hold
 
     return {
-        m: m1[:, i]
+        m: M[:, i]
         for i, m in enumerate(motors)
     }
+
+
+def _per_junction(value, nb_junctions, name):
+    if np.ndim(value) == 0:
+        return [value] * nb_junctions
+
+    value = list(value)
+    if len(value) != nb_junctions:
+        raise ValueError(f'"{name}" must be a single value or one value per junction ({nb_junctions})!')
+    return value
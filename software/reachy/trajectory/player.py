@@ -3,35 +3,131 @@
 import time
 import numpy as np
 
-from threading import Thread
+from threading import Event, Thread
 from operator import attrgetter
 
+from .storage import TrajectoryFile, open_trajectory
+from ..utils.timing import LoopTimer
+
 
 class TrajectoryPlayer(object):
     """Trajectory player abstraction.
 
     Args:
         reachy (:py:class:`~reachy.Reachy`): robot which will play the trajectory
-        trajectories (dict): Trajectory to play (such as {motor_name: list of positions})
-        freq (float): Replay sample frequency (in Hz)
+        trajectories (dict): Trajectory to play (such as {motor_name: list of positions}), a :py:class:`~reachy.trajectory.storage.TrajectoryFile` or the path of a trajectory file can also be used
+        freq (float): Replay sample frequency (in Hz), default to the frequency stored in the trajectory file or 100Hz
+        timestamps (list): time (in seconds) of each sample, if None the samples are assumed to be regularly spaced at freq (or use the timestamps stored in the trajectory file)
+        speed (float): playback speed factor (1 is real time, 0.5 twice slower, etc)
 
     Provides high-level features to:
         * play a pre-defined trajectory
         * wait for the end of the replay
         * add fade in to smooth begining of motion
+        * change the playback speed during the replay
+
+    The trajectory is indexed by the elapsed time: at each tick the positions are linearly interpolated between the surrounding samples.
+    So any stall in the replay loop only skips samples instead of delaying the rest of the motion.
+
+    Trajectory files are memory-mapped: the samples are read from the disk during the replay and never copied in memory.
     """
 
-    def __init__(self, reachy, trajectories, freq=100):
+    def __init__(self, reachy, trajectories, freq=None, timestamps=None, speed=1.0):
         """Create the Trajectory Player."""
-        motor_names, trajectories = zip(*trajectories.items())
+        if isinstance(trajectories, str):
+            trajectories = open_trajectory(trajectories)
+
+        if isinstance(trajectories, TrajectoryFile):
+            motor_names = trajectories.motors
+            self._traj = trajectories.values
+
+            if freq is None:
+                freq = trajectories.freq
+            if timestamps is None:
+                timestamps = trajectories.timestamps
+        else:
+            motor_names, trajectories = zip(*trajectories.items())
+            self._traj = np.array(trajectories).T
+
+        if freq is None:
+            freq = 100
 
         self._reachy = reachy
         self._motors = [attrgetter(name)(reachy) for name in motor_names]
-        self._traj = np.array(trajectories).T
+
+        if timestamps is not None:
+            timestamps = np.asarray(timestamps, dtype=float)
+            if timestamps.shape != (self._traj.shape[0], ):
+                raise ValueError(f'timestamps should contain one time per sample ({self._traj.shape[0]})')
+            if np.any(np.diff(timestamps) <= 0):
+                raise ValueError('timestamps should be strictly increasing')
+            timestamps = timestamps - timestamps[0]
+        self._timestamps = timestamps
 
         self._play_t = None
+        self._playing = Event()
+        self._timer = LoopTimer(freq)
+
+        self.speed = speed
+        self._elapsed = 0
+
+    @property
+    def freq(self):
+        """Get the replay sample frequency (in Hz)."""
+        return self._timer.freq
+
+    @freq.setter
+    def freq(self, freq):
+        self._timer.freq = freq
+
+    @property
+    def speed(self):
+        """Get the playback speed factor (can be changed during the replay)."""
+        return self._speed
+
+    @speed.setter
+    def speed(self, speed):
+        if speed < 0:
+            raise ValueError('speed should be positive')
+        self._speed = speed
+
+    @property
+    def timestamps(self):
+        """Get the time (in seconds) of each sample of the trajectory."""
+        if self._timestamps is not None:
+            return self._timestamps
+        return np.arange(self._traj.shape[0]) / self.freq
+
+    @property
+    def duration(self):
+        """Get the trajectory length (in seconds) when played at normal speed."""
+        return self.timestamps[-1]
+
+    @property
+    def elapsed(self):
+        """Get the current position in the trajectory (in seconds of trajectory time)."""
+        return self._elapsed
+
+    @property
+    def is_playing(self):
+        """Check if the trajectory is currently playing."""
+        return self._play_t is not None and self._play_t.is_alive()
+
+    def interpolate(self, t):
+        """Get the positions at a given trajectory time.
+
+        Args:
+            t (float): trajectory time (in seconds)
 
-        self.freq = freq
+        Returns:
+            :py:class:`~numpy.ndarray`: position for each motor, linearly interpolated between the two surrounding samples
+        """
+        return self._interpolate(self.timestamps, t)
+
+    @property
+    def stats(self):
+        """Get the timing statistics of the last replay (see :py:attr:`~reachy.utils.timing.LoopTimer.stats`)."""
+        return self._timer.stats
 
     def play(self, wait=False, fade_in_duration=0):
         """Play a given trajectory.
@@ -51,20 +147,56 @@ class TrajectoryPlayer(object):
                 interpolation_mode='minjerk',
             )
 
+        self._playing.set()
         self._play_t = Thread(target=self._play_loop)
         self._play_t.start()
 
         if wait:
             self.wait_for_end()
 
+    def stop(self, wait=True):
+        """Stop the trajectory replay."""
+        self._playing.clear()
+        if wait:
+            self.wait_for_end()
+
     def wait_for_end(self):
         """Block until the end of a trajectory replay."""
         if self._play_t is not None and self._play_t.is_alive():
             self._play_t.join()
 
+    def _interpolate(self, timestamps, t):
+        i = np.searchsorted(timestamps, t, side='right') - 1
+        i = min(max(i, 0), len(timestamps) - 2)
+
+        if i < 0:
+            return self._traj[0]
+
+        a = (t - timestamps[i]) / (timestamps[i + 1] - timestamps[i])
+        a = min(max(a, 0), 1)
+
+        return (1 - a) * self._traj[i] + a * self._traj[i + 1]
+
     def _play_loop(self):
-        for pt in self._traj:
+        timestamps = self.timestamps
+        duration = timestamps[-1]
+
+        self._elapsed = 0
+        self._timer.reset_stats()
+        self._timer.start()
+
+        last = time.monotonic()
+
+        while self._playing.is_set():
+            now = time.monotonic()
+            self._elapsed = min(self._elapsed + (now - last) * self.speed, duration)
+            last = now
+
+            pt = self._interpolate(timestamps, self._elapsed)
             for i, m in enumerate(self._motors):
                 m.goal_position = pt[i]
 
-            time.sleep(1 / self.freq)
+            if self._elapsed >= duration:
+                break
+
+            self._timer.sleep()
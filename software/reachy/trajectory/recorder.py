@@ -5,6 +5,9 @@ import numpy as np
 
 from threading import Event, Thread
 
+from .storage import TrajectoryWriter, open_trajectory
+from ..utils.timing import LoopTimer
+
 
 class TrajectoryRecorder(object):
     """Trajectory Recorder utility class.
@@ -13,30 +16,71 @@ class TrajectoryRecorder(object):
         motors (list): list of motors to record (eg. [reachy.right_arm.elbow_pitch, reachy.right_arm.shoulder_pitch])
         position_field (str): register to record as trajectories (default use the 'present_position', 'goal_position' can also be useful in some specific case)
         freq (float): record sample frequency (in Hz)
+        chunk_size (int): minimum number of samples preallocated each time the record buffer needs to grow
+        max_samples (int): if set, only the last max_samples samples are kept (ring buffer) and the memory used is bounded
 
     .. note:: A same recorder can be used to record multiple trajectories.
 
     Facilitates the recording of a full trajectory on multiple motors.
+    Samples are stored in a preallocated buffer, together with the monotonic time at which they were taken.
+
+    For very long records, samples can instead be streamed to a file (see :py:meth:`start`).
+    They are then written by chunks of chunk_size samples, so the record is not limited by the available memory.
     """
 
-    def __init__(self, motors, position_field='present_position', freq=100):
+    # Minimum time between two syncs of a streamed record to the disk (in seconds)
+    sync_interval = 5.0
+
+    def __init__(self, motors, position_field='present_position', freq=100, chunk_size=1000, max_samples=None):
         """Create the recorder."""
         self.motors = motors
 
-        self._data = []
+        self._data = SampleBuffer(len(motors), chunk_size=chunk_size, max_samples=max_samples)
         self._position_field = position_field
 
+        self._chunk_size = chunk_size
+        self._writer = None
+        self._output = None
+
         self._recording = Event()
         self._record_t = None
+        self._timer = LoopTimer(freq)
 
-        self.freq = freq
+    @property
+    def freq(self):
+        """Get the record sample frequency (in Hz)."""
+        return self._timer.freq
 
-    def start(self, turn_compliant=False):
+    @freq.setter
+    def freq(self, freq):
+        self._timer.freq = freq
+
+    @property
+    def stats(self):
+        """Get the timing statistics of the last record (see :py:attr:`~reachy.utils.timing.LoopTimer.stats`)."""
+        return self._timer.stats
+
+    def start(self, turn_compliant=False, output=None):
         """Start the record.
 
         Args:
             turn_compliant (bool): whether or not to turn the motor compliant before starting the record.
+            output (str): if given, stream the samples to this file instead of keeping them in memory (see :py:mod:`~reachy.trajectory.storage`)
+
+        .. note:: When streaming, full chunks are written by a dedicated thread so sampling never waits for the disk.
+                  The file is synced at most every :py:attr:`sync_interval` seconds (and when the record is stopped), so a crash loses at most these last samples.
         """
+        self._output = output
+        if output is not None:
+            self._writer = TrajectoryWriter(
+                output,
+                motors=[m.name for m in self.motors],
+                freq=self.freq,
+                chunk_size=self._chunk_size,
+                background=True,
+                sync_interval=self.sync_interval,
+            )
+
         self._recording.set()
         self._record_t = Thread(target=self._record_loop)
 
@@ -56,27 +100,131 @@ class TrajectoryRecorder(object):
         if self._record_t is not None and self._record_t.is_alive():
             self._record_t.join()
 
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
         if turn_stiff:
             for m in self.motors:
                 m.compliant = False
 
     @property
     def trajectories(self):
-        """Retrieve a copy of the recorded trajectories."""
-        traj = np.array(self._data).T
+        """Retrieve the recorded trajectories.
+
+        .. note:: The trajectories are views on the record buffer, copy them if you need to keep them while recording again.
+                  If the record was streamed to a file, they are views on the memory-mapped file.
+        """
+        if self._output is not None:
+            traj = open_trajectory(self._output).values
+        else:
+            traj = self._data.values
 
         return {
-             self.motors[i].name: t
-             for i, t in enumerate(traj)
+             m.name: traj[:, i]
+             for i, m in enumerate(self.motors)
          }
 
+    @property
+    def timestamps(self):
+        """Retrieve the time (monotonic clock, in seconds) at which each sample was recorded."""
+        if self._output is not None:
+            f = open_trajectory(self._output)
+            return f.timestamps + f.t0
+        return self._data.timestamps
+
     def _record_loop(self):
         self._data.clear()
+        self._timer.reset_stats()
+        self._timer.start()
+
+        append = self._writer.append if self._writer is not None else self._data.append
 
         while self._recording.is_set():
-            self._data.append([
+            append(time.monotonic(), [
                 getattr(m, self._position_field)
                 for m in self.motors
             ])
 
-            time.sleep(1 / self.freq)
+            self._timer.sleep()
+
+
+class SampleBuffer(object):
+    """Preallocated buffer of timestamped samples.
+
+    Args:
+        nb_fields (int): number of values in each sample
+        chunk_size (int): initial capacity and minimum number of samples allocated each time the buffer is full
+        max_samples (int): if set, the buffer is used as a ring and only keeps the last max_samples samples
+
+    Readers get zero-copy views on the buffer.
+    In ring mode, each sample is written twice (at i and i + max_samples) so the last max_samples samples are always contiguous.
+    """
+
+    def __init__(self, nb_fields, chunk_size=1000, max_samples=None):
+        """Create the buffer."""
+        self.chunk_size = chunk_size
+        self.max_samples = max_samples
+
+        capacity = 2 * max_samples if max_samples is not None else chunk_size
+        self._timestamps = np.empty(capacity)
+        self._values = np.empty((capacity, nb_fields))
+        self._count = 0
+
+    def __len__(self):
+        """Get the number of samples currently stored."""
+        if self.max_samples is not None:
+            return min(self._count, self.max_samples)
+        return self._count
+
+    @property
+    def total_samples(self):
+        """Get the number of samples appended since the last clear (including the ones dropped by the ring)."""
+        return self._count
+
+    def clear(self):
+        """Remove all samples (the memory is kept allocated)."""
+        self._count = 0
+
+    def append(self, timestamp, values):
+        """Append a new sample."""
+        if self.max_samples is not None:
+            i = self._count % self.max_samples
+            self._timestamps[i] = self._timestamps[i + self.max_samples] = timestamp
+            self._values[i] = self._values[i + self.max_samples] = values
+        else:
+            i = self._count
+            if i == len(self._timestamps):
+                self._grow()
+            self._timestamps[i] = timestamp
+            self._values[i] = values
+
+        self._count += 1
+
+    @property
+    def timestamps(self):
+        """Get a view on the stored timestamps."""
+        return self._timestamps[self._window()]
+
+    @property
+    def values(self):
+        """Get a view on the stored samples as a nb_samples x nb_fields array."""
+        return self._values[self._window()]
+
+    def _window(self):
+        if self.max_samples is not None and self._count > self.max_samples:
+            start = self._count % self.max_samples
+            return slice(start, start + self.max_samples)
+        return slice(0, self._count)
+
+    def _grow(self):
+        # Grow geometrically so long records only trigger a few copies
+        capacity = len(self._timestamps) + max(self.chunk_size, len(self._timestamps))
+
+        timestamps = np.empty(capacity)
+        timestamps[:self._count] = self._timestamps[:self._count]
+
+        values = np.empty((capacity, self._values.shape[1]))
+        values[:self._count] = self._values[:self._count]
+
+        self._timestamps, self._values = timestamps, values
@@ -0,0 +1,257 @@
+"""Trajectory scheduler module.
+
+A single control loop is responsible for following all active trajectories.
+At each tick, the setpoints of every trajectory are computed and then written together to their motors.
+This keeps all joints phase-aligned and avoids running one thread per moving motor.
+"""
+
+import time
+import logging
+
+from threading import Lock, Thread, current_thread
+
+from ..utils.timing import LoopTimer
+
+logger = logging.getLogger(__name__)
+
+
+class TrajectoryScheduler(object):
+    """Central control loop following every active trajectory.
+
+    Args:
+        update_freq (float): control loop frequency (in Hz)
+
+    The loop thread is automatically started when a trajectory is added and stops as soon as there is no more trajectory to follow.
+    Each motor is driven by a single trajectory at a time: a new trajectory preempts the previous one on its motors.
+    It runs on absolute deadlines, its timing statistics are available via :py:attr:`stats`.
+
+    .. note:: The goto functions all rely on the same scheduler, see :py:meth:`shared`.
+    """
+
+    _shared = None
+    _shared_lock = Lock()
+
+    def __init__(self, update_freq=100):
+        """Create a new scheduler."""
+        self._timer = LoopTimer(update_freq)
+
+        self._lock = Lock()
+        self._tick_lock = Lock()
+        self._trajs = []
+        self._ticking = []
+        self._owners = {}
+        self._t = None
+
+    @classmethod
+    def shared(cls):
+        """Get the scheduler shared by all trajectories."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @property
+    def update_freq(self):
+        """Get the control loop frequency (in Hz)."""
+        return self._timer.freq
+
+    @update_freq.setter
+    def update_freq(self, freq):
+        self._timer.freq = freq
+
+    @property
+    def stats(self):
+        """Get the control loop timing statistics (see :py:attr:`~reachy.utils.timing.LoopTimer.stats`)."""
+        return self._timer.stats
+
+    def reset_stats(self):
+        """Clear the control loop timing statistics."""
+        self._timer.reset_stats()
+
+    @property
+    def is_running(self):
+        """Check whether the control loop is currently running."""
+        with self._lock:
+            return self._t is not None
+
+    @property
+    def active_trajectories(self):
+        """Get the list of trajectories currently followed."""
+        with self._lock:
+            return [traj for _, traj, _, _ in self._ticking + self._trajs]
+
+    def add(self, motor, traj):
+        """Start following a trajectory.
+
+        Args:
+            motor (motor or list): motor to apply the trajectory to (or list of motors for multi-axis trajectories)
+            traj (:py:class:`~reachy.trajectory.interpolation.TrajectoryInterpolation`): trajectory to follow
+
+        A motor is always driven by the last trajectory added for it.
+        If it was driven by another trajectory, this one stops sending it commands (and finishes if it does not drive any motor anymore).
+        """
+        multi = isinstance(motor, (list, tuple))
+        motors = list(motor) if multi else [motor]
+        t0 = time.monotonic()
+
+        with self._lock:
+            for i, m in enumerate(motors):
+                self._owners[m] = (traj, i if multi else None, t0)
+            self._trajs.append((motors, traj, t0, multi))
+
+            if self._t is None:
+                self._t = Thread(target=self._control_loop)
+                self._t.daemon = True
+                self._t.start()
+
+    def release(self, motors):
+        """Stop driving motors, e.g. before commanding them directly.
+
+        Args:
+            motors (list): motors to release
+
+        The trajectories driving them stop sending them commands (and finish if they do not drive any motor anymore).
+        It waits for the end of the current tick, so no command from these trajectories is sent afterwards.
+        """
+        with self._tick_lock, self._lock:
+            for m in motors:
+                self._owners.pop(m, None)
+
+    def commanded_state(self, motor):
+        """Get the state currently commanded to a motor by its trajectory.
+
+        Args:
+            motor (motor): motor to check
+
+        Returns:
+            (float, float, float): commanded position, velocity and acceleration, or None if no trajectory is driving the motor
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            owner = self._owners.get(motor)
+
+        if owner is None:
+            return None
+
+        traj, axis, t0 = owner
+        if not traj.is_playing:
+            return None
+
+        t = min(now - t0, traj.duration)
+        state = traj.state(t)
+
+        if axis is not None:
+            state = tuple(s[axis] for s in state)
+        return state
+
+    def _control_loop(self):
+        try:
+            self._timer.start()
+            while True:
+                with self._tick_lock:
+                    if not self._tick():
+                        break
+                self._timer.sleep()
+        finally:
+            self._shutdown()
+
+    def _tick(self):
+        # Follow all trajectories for one period, returns False (and marks the loop as stopped) once there is nothing left to follow
+        now = time.monotonic()
+
+        with self._lock:
+            if not self._trajs:
+                self._t = None
+                return False
+            # Trajectories added during the tick are kept aside in self._trajs
+            trajs, self._trajs = self._trajs, []
+            self._ticking = trajs
+            owners = dict(self._owners)
+
+        active, finished, setpoints = [], [], []
+
+        for entry in trajs:
+            motors, traj = entry[:2]
+            pos, done = self._sample(entry, now, owners)
+
+            setpoints += pos
+            if done:
+                finished.append((motors, traj))
+            else:
+                active.append(entry)
+
+        for motor, pos in setpoints:
+            # A failing motor must not stop the loop driving all the others
+            try:
+                set_motor_position(motor, pos)
+            except Exception:
+                logger.exception('Failed to send a position command', extra={'motor': getattr(motor, 'name', None)})
+
+        # Only released once their final position is sent, so nothing commanded after a wait is overwritten
+        self._release(active, finished)
+
+        return True
+
+    def _shutdown(self):
+        # The loop stopped unexpectedly: finish all the trajectories it held, so a new loop is started by the next add
+        with self._lock:
+            if self._t is not current_thread():
+                return
+
+            held = self._ticking + self._trajs
+            self._ticking, self._trajs = [], []
+            self._t = None
+
+            for motors, traj, _, _ in held:
+                for m in motors:
+                    if self._owners.get(m, (None, ))[0] is traj:
+                        del self._owners[m]
+
+        for _, traj, _, _ in held:
+            traj._finished.set()
+
+    def _sample(self, entry, now, owners):
+        # Setpoints of the motors still owned by the trajectory and whether it is finished
+        motors, traj, t0, multi = entry
+        t = now - t0
+        owned = [owners.get(m, (None, ))[0] is traj for m in motors]
+
+        if not traj._running.is_set() or not any(owned):
+            return [], True
+
+        try:
+            # The goal is sent as is once the duration is elapsed (e.g. a null duration can not be interpolated)
+            pos = traj.goal_position if t >= traj.duration else traj.interpolate(t)
+        except Exception:
+            logger.exception('Trajectory interpolation failed')
+            return [], True
+
+        setpoints = [
+            (m, p)
+            for m, p, o in zip(motors, pos if multi else [pos], owned)
+            if o
+        ]
+        return setpoints, t >= traj.duration
+
+    def _release(self, active, finished):
+        # Keep the active trajectories (and the ones added meanwhile), free the motors of the finished ones
+        with self._lock:
+            self._trajs = active + self._trajs
+            self._ticking = []
+
+            for motors, traj in finished:
+                for m in motors:
+                    if self._owners.get(m, (None, ))[0] is traj:
+                        del self._owners[m]
+
+        for motors, traj in finished:
+            traj._finished.set()
+
+
+def set_motor_position(motor, pos):
+    """Send a new position command to a motor or an Orbita disk."""
+    if hasattr(motor, 'goal_position'):
+        motor.goal_position = pos
+    else:
+        motor.target_rot_position = pos
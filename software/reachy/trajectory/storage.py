@@ -0,0 +1,304 @@
+"""Trajectory file storage module.
+
+Trajectories are stored in a simple append-only binary format that can be memory-mapped:
+
+* 8 bytes magic string (b'REACHYTR')
+* 4 bytes little-endian header length
+* JSON header (motor names, sample frequency, dtype, etc) padded so the data starts on a 64 bytes boundary
+* samples stored row by row: the time of the sample (relative to the header 't0', if the file has timestamps) followed by the position of each motor
+
+As the number of samples is not stored in the header, a file can be appended to at any time.
+A truncated last sample (e.g. after a crash) is simply ignored when reading the file.
+
+Use :py:func:`save_trajectory` to store a motion (e.g. in float32 for a compact library) and :py:func:`open_trajectory` to memory-map it.
+The returned :py:class:`TrajectoryFile` can be directly given to a :py:class:`~reachy.trajectory.player.TrajectoryPlayer`.
+"""
+
+import os
+import json
+import time
+import struct
+import numpy as np
+
+from queue import Queue
+from threading import Thread
+
+MAGIC = b'REACHYTR'
+VERSION = 1
+ALIGNMENT = 64
+
+
+class TrajectoryWriter(object):
+    """Append-only trajectory file writer.
+
+    Args:
+        filename (str): path of the file to create (overwritten if it already exists)
+        motors (list): name of the recorded motors
+        freq (float): nominal sample frequency (in Hz)
+        chunk_size (int): number of samples buffered in memory before being written to the file
+        dtype (str): numpy dtype used to store the samples
+        timestamps (bool): whether or not to store the time of each sample
+        t0 (float): reference time of the timestamps (default to the current monotonic time)
+        background (bool): whether to write the chunks from a dedicated thread, so appending never waits for the disk
+        sync_interval (float): minimum time between two syncs to the disk (in seconds), 0 to sync each chunk
+
+    Samples are buffered and written by chunks, the file is synced to the disk after a chunk is written (at most every sync_interval seconds) and when it is closed.
+    So if the process crashes, at most one chunk (or sync_interval seconds) of samples is lost.
+    With background, a write error is raised when the writer is closed.
+    """
+
+    def __init__(
+        self, filename, motors, freq, chunk_size=1000, dtype='float64', timestamps=True, t0=None,
+        background=False, sync_interval=0,
+    ):
+        """Create the file and write its header."""
+        self.filename = filename
+        self.motors = list(motors)
+        self.freq = freq
+        self.chunk_size = chunk_size
+        self.dtype = np.dtype(dtype)
+        self.has_timestamps = timestamps
+        self.t0 = time.monotonic() if t0 is None else t0
+        self.sync_interval = sync_interval
+
+        self._chunk = np.empty((chunk_size, len(self.motors) + int(timestamps)), dtype=self.dtype)
+        self._n = 0
+        self._nb_samples = 0
+
+        self._f = open(filename, 'wb')
+        self._f.write(_pack_header({
+            'version': VERSION,
+            'motors': self.motors,
+            'freq': freq,
+            'dtype': self.dtype.str,
+            'timestamps': timestamps,
+            't0': self.t0,
+            'created': time.time(),
+        }))
+        self._sync()
+
+        self._queue = None
+        self._error = None
+        if background:
+            self._queue = Queue()
+            self._write_t = Thread(target=self._write_loop)
+            self._write_t.daemon = True
+            self._write_t.start()
+
+    def __enter__(self):
+        """Use the writer as a context manager."""
+        return self
+
+    def __exit__(self, *exc):
+        """Flush and close the file."""
+        self.close()
+
+    def __len__(self):
+        """Get the number of samples appended so far."""
+        return self._nb_samples
+
+    def append(self, timestamp, values):
+        """Append a new sample.
+
+        Args:
+            timestamp (float): time of the sample (same clock as t0), ignored if the file has no timestamps
+            values (list): position of each motor
+        """
+        row = self._chunk[self._n]
+        if self.has_timestamps:
+            row[0] = timestamp - self.t0
+            row[1:] = values
+        else:
+            row[:] = values
+
+        self._n += 1
+        self._nb_samples += 1
+
+        if self._n == self.chunk_size:
+            self.flush()
+
+    def extend(self, values, timestamps=None):
+        """Append multiple samples at once.
+
+        Args:
+            values (:py:class:`~numpy.ndarray`): nb_samples x nb_motors positions
+            timestamps (:py:class:`~numpy.ndarray`): time of each sample (same clock as t0), ignored if the file has no timestamps
+        """
+        self.flush()
+
+        values = np.asarray(values)
+        if self.has_timestamps:
+            values = np.column_stack((np.asarray(timestamps) - self.t0, values))
+
+        self._push(np.array(values, dtype=self.dtype, order='C'))
+        self._nb_samples += values.shape[0]
+
+    def flush(self):
+        """Write the buffered samples to the disk (or hand them to the writer thread)."""
+        if self._n > 0:
+            chunk = self._chunk[:self._n]
+            if self._queue is not None:
+                # The full chunk now belongs to the writer thread
+                self._chunk = np.empty_like(self._chunk)
+            self._n = 0
+            self._push(chunk)
+
+    def close(self):
+        """Flush the remaining samples, sync and close the file."""
+        if self._f.closed:
+            return
+
+        self.flush()
+        if self._queue is not None:
+            self._queue.put(None)
+            self._write_t.join()
+
+        self._sync()
+        self._f.close()
+
+        if self._error is not None:
+            raise self._error
+
+    def _push(self, data):
+        if self._queue is not None:
+            self._queue.put(data)
+        else:
+            self._write(data)
+
+    def _write_loop(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            # After an error, the following chunks are dropped (the error is raised on close)
+            if self._error is None:
+                try:
+                    self._write(data)
+                except Exception as e:
+                    self._error = e
+
+    def _write(self, data):
+        self._f.write(data.tobytes())
+        self._f.flush()
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self._sync()
+
+    def _sync(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._last_sync = time.monotonic()
+
+
+class TrajectoryFile(object):
+    """Trajectory stored in a file.
+
+    Args:
+        filename (str): path of the trajectory file
+        mmap (bool): whether to memory-map the samples (default) or to load them in memory
+
+    The samples are exposed as views on the memory-mapped file, nothing is copied until you actually read them.
+    """
+
+    def __init__(self, filename, mmap=True):
+        """Open the trajectory file."""
+        self.filename = filename
+
+        with open(filename, 'rb') as f:
+            header, offset = _read_header(f)
+
+        self.header = header
+        self.motors = header['motors']
+        self.freq = header['freq']
+        self.dtype = np.dtype(header['dtype'])
+        self.has_timestamps = header['timestamps']
+        self.t0 = header.get('t0', 0)
+
+        nb_cols = len(self.motors) + int(self.has_timestamps)
+        nb_samples = (os.path.getsize(filename) - offset) // (nb_cols * self.dtype.itemsize)
+
+        if mmap and nb_samples > 0:
+            data = np.memmap(filename, dtype=self.dtype, mode='r', offset=offset, shape=(nb_samples, nb_cols))
+        else:
+            data = np.fromfile(filename, dtype=self.dtype, count=nb_samples * nb_cols, offset=offset).reshape(nb_samples, nb_cols)
+        self._data = data
+
+    def __len__(self):
+        """Get the number of samples."""
+        return self._data.shape[0]
+
+    def __repr__(self):
+        """Trajectory file representation."""
+        return f'<TrajectoryFile "{self.filename}" motors={self.motors} samples={len(self)} freq={self.freq}>'
+
+    @property
+    def timestamps(self):
+        """Get the time of each sample (in seconds, relative to t0) or None if the file has no timestamps."""
+        if not self.has_timestamps:
+            return None
+        return self._data[:, 0]
+
+    @property
+    def values(self):
+        """Get a nb_samples x nb_motors view on the stored positions."""
+        return self._data[:, int(self.has_timestamps):]
+
+    @property
+    def trajectories(self):
+        """Get the trajectories as {motor_name: positions}."""
+        values = self.values
+        return {
+            m: values[:, i]
+            for i, m in enumerate(self.motors)
+        }
+
+
+def open_trajectory(filename, mmap=True):
+    """Open a trajectory file (see :py:class:`TrajectoryFile`)."""
+    return TrajectoryFile(filename, mmap=mmap)
+
+
+def save_trajectory(filename, trajectories, freq=100, timestamps=None, dtype='float32'):
+    """Save a trajectory to a file.
+
+    Args:
+        filename (str): path of the file to create
+        trajectories (dict): trajectory to save ({motor_name: list of positions}), a loaded .npz file can also be used
+        freq (float): sample frequency (in Hz)
+        timestamps (list): time of each sample (in seconds), only stored if given
+        dtype (str): numpy dtype used to store the samples (float32 by default for compact files)
+    """
+    motors, values = zip(*trajectories.items())
+    values = np.array(values).T
+
+    t0 = 0
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype=float)
+        t0 = timestamps[0]
+
+    with TrajectoryWriter(
+        filename, motors=motors, freq=freq,
+        chunk_size=1, dtype=dtype, timestamps=timestamps is not None, t0=t0,
+    ) as writer:
+        writer.extend(values, timestamps)
+
+
+def _pack_header(header):
+    data = json.dumps(header).encode('utf-8')
+
+    size = len(MAGIC) + 4 + len(data)
+    data += b' ' * (-size % ALIGNMENT)
+
+    return MAGIC + struct.pack('<I', len(data)) + data
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f'"{f.name}" is not a trajectory file')
+
+    size, = struct.unpack('<I', f.read(4))
+    header = json.loads(f.read(size).decode('utf-8'))
+
+    if header['version'] > VERSION:
+        raise ValueError(f'Unsupported trajectory file version {header["version"]}')
+
+    return header, len(MAGIC) + 4 + size
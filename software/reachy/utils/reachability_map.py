@@ -0,0 +1,46 @@
+"""Build the reachability map of an arm and write it to the specified file.
+
+The map is computed from the kinematic model only, no robot needs to be connected.
+It can then be loaded with :py:meth:`~reachy.parts.reachability.ReachabilityMap.load`.
+
+"""
+
+import time
+import argparse
+
+from collections import OrderedDict
+
+from reachy.parts.arm import LeftArm, RightArm, hands
+from reachy.parts.part import kinematic_chain
+from reachy.parts.reachability import ReachabilityMap
+
+
+def main():
+    """Sample the arm joint space and save its reachability map."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('side', choices=['left', 'right'], help='arm to compute the map of')
+    parser.add_argument('output_filename', help='output file where to store the map (.npz)')
+    parser.add_argument('--hand', choices=list(hands.keys()), default='force_gripper', help='hand attached to the arm (default: %(default)s)')
+    parser.add_argument('--samples', type=int, default=1000000, help='number of sampled joints configurations (default: %(default)s)')
+    parser.add_argument('--resolution', type=float, default=0.02, help='size of the voxels in m (default: %(default)s)')
+    parser.add_argument('--random_seed', type=int, default=None, help='seed of the random generator')
+    args = parser.parse_args()
+
+    arm_cls = LeftArm if args.side == 'left' else RightArm
+    dxl_motors = OrderedDict(arm_cls.dxl_motors)
+    dxl_motors.update(hands[args.hand][args.side].dxl_motors)
+
+    start = time.time()
+    reachability_map = ReachabilityMap.build(
+        kinematic_chain(dxl_motors),
+        nb_samples=args.samples,
+        resolution=args.resolution,
+        random_seed=args.random_seed,
+    )
+    print(f'Built {reachability_map} in {time.time() - start:.1f}s')
+
+    reachability_map.save(args.output_filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Loop timing utility module.
+
+Provide a loop timer running on absolute monotonic deadlines.
+It also collects statistics to check whether a loop actually runs at its nominal rate.
+"""
+
+import time
+
+from bisect import bisect_right
+from threading import Lock
+
+
+class LoopTimer(object):
+    """Pace a loop on absolute deadlines and monitor its timing.
+
+    Args:
+        freq (float): nominal loop frequency (in Hz)
+        jitter_bins (list): upper bounds (in ms) of the wake-up jitter histogram bins (the last bin counts everything above)
+
+    Call :py:meth:`start` before entering the loop and :py:meth:`sleep` at the end of each tick::
+
+        timer = LoopTimer(freq=100)
+        timer.start()
+
+        while running:
+            do_work()
+            timer.sleep()
+
+    Deadlines are computed as start + k / freq, so the time spent in the loop body does not lower the real rate.
+    If the loop is late by more than a full period, the missed deadlines are skipped instead of firing a burst of ticks.
+    """
+
+    def __init__(self, freq, jitter_bins=(0.1, 0.5, 1, 2, 5, 10, 20, 50)):
+        """Create the loop timer."""
+        self.freq = freq
+        self.jitter_bins = list(jitter_bins)
+
+        self._lock = Lock()
+        self._deadline = None
+        self._tick_start = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Clear all collected statistics."""
+        with self._lock:
+            self._nb_ticks = 0
+            self._elapsed = 0
+            self._missed_deadlines = 0
+            self._worst_tick_time = 0
+            self._max_jitter = 0
+            self._total_jitter = 0
+            self._jitter_hist = [0] * (len(self.jitter_bins) + 1)
+
+    def start(self):
+        """Anchor the deadlines on the current time."""
+        self._tick_start = time.monotonic()
+        self._deadline = self._tick_start + 1 / self.freq
+
+    def sleep(self):
+        """Sleep until the next deadline and record the tick timing."""
+        if self._deadline is None:
+            self.start()
+
+        period = 1 / self.freq
+        now = time.monotonic()
+        tick_time = now - self._tick_start
+
+        missed = 0
+        delay = self._deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            missed = 1 + int(-delay / period)
+            self._deadline += (missed - 1) * period
+
+        wake = time.monotonic()
+        jitter = max(wake - self._deadline, 0)
+
+        with self._lock:
+            self._nb_ticks += 1
+            self._elapsed += wake - self._tick_start
+            self._missed_deadlines += missed
+            self._worst_tick_time = max(self._worst_tick_time, tick_time)
+            self._max_jitter = max(self._max_jitter, jitter)
+            self._total_jitter += jitter
+            self._jitter_hist[bisect_right(self.jitter_bins, jitter * 1000)] += 1
+
+        self._tick_start = wake
+        self._deadline = max(self._deadline + period, wake)
+
+    @property
+    def stats(self):
+        """Get the loop timing statistics.
+
+        Returns:
+            dict: with the following fields:
+                * nb_ticks: number of ticks since last reset
+                * nominal_rate, achieved_rate: nominal and measured loop frequency (in Hz)
+                * missed_deadlines: number of deadlines that were already passed when the tick ended
+                * worst_tick_time: longest time spent in the loop body (in s)
+                * mean_jitter, max_jitter: delay between the deadlines and the actual wake-ups (in s)
+                * jitter_histogram: list of (upper bound in ms, count) with None as the upper bound of the last bin
+        """
+        with self._lock:
+            return {
+                'nb_ticks': self._nb_ticks,
+                'nominal_rate': self.freq,
+                'achieved_rate': self._nb_ticks / self._elapsed if self._elapsed > 0 else 0,
+                'missed_deadlines': self._missed_deadlines,
+                'worst_tick_time': self._worst_tick_time,
+                'mean_jitter': self._total_jitter / self._nb_ticks if self._nb_ticks > 0 else 0,
+                'max_jitter': self._max_jitter,
+                'jitter_histogram': list(zip(self.jitter_bins + [None], self._jitter_hist)),
+            }
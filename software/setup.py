@@ -50,6 +50,7 @@ setup(
             'orbita-config=reachy.utils.orbita_config:main',
             'reachy-setup-motorlimits=reachy.utils.setup_angle_limits:main',
             'orbita-zero=reachy.utils.orbita_zero:main',
+            'reachy-reachability-map=reachy.utils.reachability_map:main',
         ],
     },
 
@@ -1,7 +1,16 @@
+import os
+import time
+import tempfile
 import unittest
 import numpy as np
 
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+
 from reachy import parts
+from reachy.parts.kinematic import IKCache, Link, pose_dist, pose_dist_gradient, position_dist, rotation_dist
+from reachy.trajectory.cartesian import CartesianTrajectory
+from scipy.spatial.transform import Rotation
 
 from mockup import mock_luos_io
 
@@ -147,3 +156,275 @@ class ArmTestCase(unittest.TestCase):
                 P = self.left_arm_with_gripper.forward_kinematics(pos)
                 ik_pos = self.left_arm_with_gripper.inverse_kinematics(P, q0=pos)
                 assert np.linalg.norm(pos - ik_pos) < 1e-3
+
+    def test_link_transformation(self):
+        theta = np.random.rand(10) * 2 * np.pi - np.pi
+
+        for axis in ([1, 0, 0], [0, 1, 0], [0, 0, 1], [0.5, -1, 2], [0, 0, 0]):
+            link = Link([0.1, -0.2, 0.3], axis, (-np.pi, np.pi))
+
+            R = Rotation.from_rotvec(np.outer(theta, axis)).as_matrix()
+            M = link.transformation_matrix(theta)
+
+            assert np.allclose(M[:, :3, :3], R)
+            assert np.allclose(M[:, :3, 3], [0.1, -0.2, 0.3])
+            assert np.allclose(M[:, 3], [0, 0, 0, 1])
+
+    def test_forward_out(self):
+        chain = self.left_arm_with_gripper.kin_chain
+        q = np.random.rand(20, len(chain.links)) - 0.5
+
+        out = np.empty((20, 4, 4))
+        M = chain.forward(q, out=out)
+        assert M is out
+        assert np.allclose(out, chain.forward(q))
+
+        M = np.eye(4)
+        for link, theta in zip(chain.links, q.T):
+            M = np.matmul(M, link.transformation_matrix(theta))
+        assert np.allclose(out, M)
+
+    def test_jacobian(self):
+        for arm in [self.left_arm, self.right_arm_with_gripper]:
+            chain = arm.kin_chain
+            N, J = 5, len(arm.motors)
+            q = np.random.rand(N, J) - 0.5
+
+            Jac = chain.jacobian(q)
+            self.assertEqual(Jac.shape, (N, 6, J))
+
+            eps = 1e-6
+            M = chain.forward(q)
+            for j in range(J):
+                dq = np.zeros(J)
+                dq[j] = eps
+                dM = (chain.forward(q + dq) - M) / eps
+
+                # Linear velocity and angular velocity (from dR.R^T skew matrix)
+                assert np.allclose(Jac[:, :3, j], dM[:, :3, 3], atol=1e-4)
+                W = np.matmul(dM[:, :3, :3], np.transpose(M[:, :3, :3], (0, 2, 1)))
+                assert np.allclose(Jac[:, 3:, j], np.stack((W[:, 2, 1], W[:, 0, 2], W[:, 1, 0]), axis=1), atol=1e-4)
+
+    def test_pose_dist_gradient(self):
+        chain = self.right_arm_with_gripper.kin_chain
+        J = len(self.right_arm_with_gripper.motors)
+
+        target = chain.forward(np.random.rand(1, J) - 0.5)[0]
+        q = np.random.rand(1, J) - 0.5
+
+        M, Jac = chain._forward_jacobian(q)
+        d, grad = pose_dist_gradient(M[0], Jac[0], target)
+        self.assertAlmostEqual(d, pose_dist(M[0], target))
+
+        eps = 1e-6
+        for j in range(J):
+            dq = np.zeros(J)
+            dq[j] = eps
+            fd = (pose_dist(chain.forward(q + dq)[0], target) - d) / eps
+            self.assertAlmostEqual(grad[j], fd, places=4)
+
+    def test_batched_inverse_kinematics(self):
+        arm = self.left_arm_with_gripper
+        lb, ub = np.rad2deg(np.array(arm.kin_chain.bounds)).T
+
+        N = 200
+        J0 = lb + np.random.rand(N, len(arm.motors)) * (ub - lb)
+        M0 = arm.forward_kinematics(J0)
+
+        Q0 = np.clip(J0 + np.random.rand(*J0.shape) * 10 - 5, lb, ub)
+        J1 = arm.inverse_kinematics(M0, Q0, maxiter=50)
+        self.assertEqual(J1.shape, J0.shape)
+        assert np.all(J1 >= lb - 1e-6) and np.all(J1 <= ub + 1e-6)
+
+        M1 = arm.forward_kinematics(J1)
+        err = np.linalg.norm(M0 - M1, axis=(1, 2))
+        assert np.median(err) < 1e-3
+
+    def test_ik_cache(self):
+        chain = self.left_arm_with_gripper.kin_chain
+        lb, ub = np.array(chain.bounds).T
+        Q = lb + np.random.rand(50, len(chain.links)) * (ub - lb)
+        M = chain.forward(Q)
+
+        cache = IKCache(max_size=20)
+        self.assertIsNone(cache.nearest(M[0]))
+
+        for pose, q in zip(M, Q):
+            cache.add(pose, q)
+        self.assertEqual(len(cache), 20)
+
+        # Only the 20 last solutions are kept
+        for pose, q in zip(M[-20:], Q[-20:]):
+            seed, d = cache.nearest(pose)
+            self.assertAlmostEqual(d, 0)
+            assert np.allclose(seed, q)
+        for pose in M[:30]:
+            found = cache.nearest(pose)
+            assert found is None or found[1] > 0
+
+        # A solution for an already stored pose replaces the previous one
+        cache.add(M[-1], Q[-2])
+        self.assertEqual(len(cache), 20)
+        assert np.allclose(cache.nearest(M[-1])[0], Q[-2])
+
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, 'ik_cache.npz')
+            cache.save(filename)
+            loaded = IKCache.load(filename)
+
+        self.assertEqual(len(loaded), len(cache))
+        self.assertEqual(loaded.max_size, cache.max_size)
+        for pose in M[-20:]:
+            assert np.allclose(loaded.nearest(pose)[0], cache.nearest(pose)[0])
+
+    def test_ik_warm_start(self):
+        arm = self.left_arm_with_gripper
+        arm.ik_cache.clear()
+        for m in arm.motors:
+            m._motor.rot_position = m._to_motor_pos(0)
+
+        lb, ub = np.rad2deg(np.array(arm.kin_chain.bounds)).T
+        q = lb + np.random.rand(len(arm.motors)) * (ub - lb)
+        target = arm.forward_kinematics(q)
+
+        arm.inverse_kinematics(target, q0=q)
+        self.assertEqual(len(arm.ik_cache), 1)
+
+        seed = arm._ik_seeds(target.reshape(1, 4, 4))
+        assert np.allclose(np.rad2deg(seed[0]), q)
+
+        ik = arm.inverse_kinematics(target, maxiter=1)
+        assert pose_dist(arm.forward_kinematics(ik), target) < 1e-3
+
+    def test_cartesian_trajectory(self):
+        arm = self.left_arm_with_gripper
+        q0 = np.array([0, 10, 0, -90, 0, 0, 0, 0])
+        target = arm.forward_kinematics(q0 + np.array([20, 10, -15, 30, 10, -20, 10, 0]))
+
+        traj = CartesianTrajectory(arm.kin_chain, q0, target, duration=1.0, interpolation_mode='linear')
+        self.assertEqual(traj.joints, list(range(7)))
+        assert np.allclose(traj.pose(0), arm.forward_kinematics(q0))
+        assert np.allclose(traj.pose(1), target)
+
+        Q = traj.sample(freq=100)
+        self.assertEqual(Q.shape, (101, 7))
+
+        J = np.tile(q0, (101, 1)).astype(float)
+        J[:, traj.joints] = Q
+        M = arm.forward_kinematics(J)
+
+        # The end effector follows a straight line
+        a, b = traj.initial_pose[:3, 3], target[:3, 3]
+        u = (b - a) / np.linalg.norm(b - a)
+        P = M[:, :3, 3] - a
+        assert np.all(np.linalg.norm(P - np.outer(np.dot(P, u), u), axis=1) < 1e-4)
+        assert pose_dist(M[-1], target) < 1e-4
+
+        # The commanded state is computed along the path, without moving the followed configuration
+        traj = CartesianTrajectory(arm.kin_chain, q0, target, duration=1.0, interpolation_mode='minjerk')
+        ts = np.linspace(0, 1, 1001)
+        Q = traj.sample(freq=1000)
+        V = np.gradient(Q, ts, axis=0)
+        A = np.gradient(V, ts, axis=0)
+
+        Q = traj.interpolate(ts[:501])
+        q = traj._q.copy()
+        pos, vel, acc = traj.state(0.5)
+        assert np.allclose(traj._q, q)
+        assert np.allclose(pos, Q[500], atol=1e-2)
+        # Up to the drift of the redundant joints in the null space of the jacobian
+        assert np.allclose(vel, V[500], atol=0.5)
+        assert np.allclose(acc, A[500], atol=2)
+        assert np.allclose(traj.velocity(1.0), 0)
+
+        with self.assertRaises(ValueError):
+            CartesianTrajectory(arm.kin_chain, q0, target, duration=1.0, interpolation_mode='trapezoidal')
+
+    def test_goto_pose(self):
+        arm = self.left_arm_with_gripper
+        q0 = np.array([0, 10, 0, -90, 0, 0, 0, 0])
+        for m, q in zip(arm.motors, q0):
+            m._motor.rot_position = m._to_motor_pos(q)
+            m._motor.compliant = False
+        target = arm.forward_kinematics(q0 + np.array([10, 0, 0, 20, 0, 0, 0, 0]))
+
+        # Streaming preempts the gotos running on the arm
+        gotos = [m.goto(q, duration=10) for m, q in zip(arm.motors[:7], q0)]
+
+        Q = list(arm.stream_pose(target, duration=0.2, freq=50))
+        assert 1 <= len(Q) <= 10
+        J = np.append(Q[-1], 0)
+        assert pose_dist(arm.forward_kinematics(J), target) < 1e-3
+
+        # Shorter than a tick: the target is still sent
+        for m, q in zip(arm.motors, J):
+            m._motor.rot_position = m._to_motor_pos(q)
+        Q = list(arm.stream_pose(target, duration=0.001, freq=50))
+        self.assertEqual(len(Q), 1)
+        assert pose_dist(arm.forward_kinematics(np.append(Q[-1], 0)), target) < 1e-3
+
+        time.sleep(0.05)
+        assert not any(goto.is_playing for goto in gotos)
+        assert np.allclose([m.goal_position for m in arm.motors[:7]], Q[-1])
+
+        traj = arm.goto_pose(target, duration=0.2, wait=True)
+        assert not traj.is_playing
+
+    def test_multistart_inverse_kinematics(self):
+        chain = self.left_arm_with_gripper.kin_chain
+        lb, ub = np.array(chain.bounds).T
+        q0 = np.zeros(len(lb))
+
+        targets = chain.forward(lb + np.random.RandomState(0).rand(5, len(lb)) * (ub - lb))
+        for target in targets:
+            q, d = chain.inverse_multistart(target, seeds=q0, random_seed=0)
+            assert np.all(q >= lb) and np.all(q <= ub)
+            self.assertAlmostEqual(d, pose_dist(chain.forward(q.reshape(1, -1))[0], target))
+            assert d < 1e-3
+
+        q, d = chain.inverse_multistart(targets[0], nb_seeds=0, seeds=q0, maxiter=1000, time_budget=0)
+        assert np.isfinite(d)
+
+        # No more iterations than requested
+        with patch.object(chain, 'inverse_dls', wraps=chain.inverse_dls) as dls:
+            chain.inverse_multistart(targets[0], nb_seeds=0, seeds=q0, maxiter=25, tol=0)
+        self.assertEqual(sum(c.kwargs['maxiter'] for c in dls.call_args_list), 25)
+
+        # The seeds are split among the workers of the executor
+        with ThreadPoolExecutor(2) as executor:
+            with patch.object(executor, 'submit', wraps=executor.submit) as submit:
+                q, d = chain.inverse_multistart(targets[0], seeds=q0, executor=executor, random_seed=0)
+        self.assertEqual(submit.call_count, 2)
+        assert d < 1e-3
+
+        # The multistart defaults are kept through inverse
+        with patch.object(chain, 'inverse_multistart', wraps=chain.inverse_multistart) as multistart:
+            chain.inverse(targets[:1], q0.reshape(1, -1), method='multistart', time_budget=1)
+        assert 'maxiter' not in multistart.call_args.kwargs
+
+        arm = self.left_arm_with_gripper
+        J = arm.inverse_kinematics(arm.forward_kinematics(np.rad2deg(q)), q0=np.zeros(len(lb)), method='multistart')
+        assert pose_dist(arm.forward_kinematics(J), targets[0]) < 1e-3
+
+    def test_batched_pose_dist(self):
+        N = 100
+        M1, M2 = np.tile(np.eye(4), (2, N, 1, 1))
+        M1[:, :3, :3], M2[:, :3, :3] = Rotation.random(N).as_matrix(), Rotation.random(N).as_matrix()
+        M1[:, :3, 3], M2[:, :3, 3] = np.random.rand(N, 3), np.random.rand(N, 3)
+
+        PD = position_dist(M1[:, :3, 3], M2[:, :3, 3])
+        RD = rotation_dist(M1[:, :3, :3], M2[:, :3, :3])
+        D = pose_dist(M1, M2)
+        self.assertEqual(D.shape, (N, ))
+
+        for i in range(N):
+            self.assertAlmostEqual(PD[i], np.linalg.norm(M1[i, :3, 3] - M2[i, :3, 3]))
+            R = np.dot(M1[i, :3, :3], M2[i, :3, :3].T)
+            self.assertAlmostEqual(RD[i], np.arccos(np.clip((np.trace(R) - 1) / 2, -1, 1)))
+            self.assertAlmostEqual(D[i], pose_dist(M1[i], M2[i]))
+
+        # A single pose is broadcast against a stack of poses
+        assert np.allclose(pose_dist(M1, M2[0]), [pose_dist(m, M2[0]) for m in M1])
+
+        self.assertEqual(pose_dist(M1[0], M1[0], threshold=1e-3), 0)
+        assert np.all(pose_dist(M1, M2, threshold=np.median(D))[D <= np.median(D)] == 0)
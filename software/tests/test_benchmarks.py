@@ -0,0 +1,23 @@
+import sys
+import pathlib
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / 'benchmarks'))
+
+import kinematics  # noqa: E402
+
+
+def test_run_benchmarks():
+    results = kinematics.run(['pose_dist'], repeat=2)
+
+    assert list(results['results'].keys()) == ['pose_dist[1]', 'pose_dist[10000]']
+    assert set(results['versions'].keys()) == set(kinematics.DEPENDENCIES)
+    for res in results['results'].values():
+        assert 0 < res['min'] <= res['median']
+
+
+def test_compare_benchmarks():
+    baseline = {'results': {'a': {'median': 1.0}, 'b': {'median': 1.0}, 'c': {'median': 1.0}}}
+    results = {'results': {'a': {'median': 1.1}, 'b': {'median': 1.5}, 'd': {'median': 10.0}}}
+
+    assert kinematics.compare(results, baseline, threshold=0.2) == {'b': 1.5}
+    assert kinematics.compare(results, baseline, threshold=0.05) == {'a': 1.1, 'b': 1.5}
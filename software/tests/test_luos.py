@@ -0,0 +1,134 @@
+import json
+import time
+
+from threading import Timer
+from unittest.mock import MagicMock
+
+from mockup import mock_luos_io
+
+mock_luos_io()
+
+from reachy.io import luos  # noqa: E402
+from reachy.io.luos import LuosUpdateMonitor, OrbitaDisk, SharedLuosIO  # noqa: E402
+
+
+def fake_gates(monkeypatch, tmp_path, gates):
+    opened = []
+
+    def device(port, log_conf):
+        opened.append(port)
+        io = MagicMock()
+        io.modules = [MagicMock(alias=gates[port]), MagicMock(), MagicMock()]
+        return io
+
+    monkeypatch.setattr(luos, 'LuosDevice', device)
+    monkeypatch.setattr(luos, 'glob', lambda template: sorted(gates) if template == '/dev/fakeUSB*' else [])
+    monkeypatch.setattr(SharedLuosIO, 'gate_cache', str(tmp_path / 'gates.json'))
+    return opened
+
+
+def close_fake_gates(gates):
+    for port in gates:
+        SharedLuosIO.opened_io.pop(port, None)
+
+
+def test_concurrent_gate_discovery(monkeypatch, tmp_path):
+    gates = {'/dev/fakeUSB0': 'r_head', '/dev/fakeUSB1': 'r_left_arm', '/dev/fakeUSB2': 'r_right_arm'}
+    opened = fake_gates(monkeypatch, tmp_path, gates)
+
+    try:
+        # All ports are probed at once (each new connection waits 1s)
+        start = time.time()
+        io = SharedLuosIO.with_gate('r_right_arm', '/dev/fakeUSB*')
+        assert io.port == '/dev/fakeUSB2'
+        assert time.time() - start < 1.9
+
+        # The other connections are kept for the next parts
+        time.sleep(0.5)
+        start = time.time()
+        assert SharedLuosIO.with_gate('r_head', '/dev/fakeUSB*').port == '/dev/fakeUSB0'
+        assert time.time() - start < 0.5
+        assert sorted(opened) == sorted(gates)
+
+        with open(SharedLuosIO.gate_cache) as f:
+            assert sorted(json.load(f).values()) == sorted(gates.values())
+
+    finally:
+        close_fake_gates(gates)
+
+
+def test_gate_cache(monkeypatch, tmp_path):
+    gates = {'/dev/fakeUSB0': 'r_head', '/dev/fakeUSB1': 'r_left_arm'}
+    opened = fake_gates(monkeypatch, tmp_path, gates)
+
+    try:
+        with open(SharedLuosIO.gate_cache, 'w') as f:
+            json.dump({luos.serial_device_id('/dev/fakeUSB1'): 'r_left_arm'}, f)
+
+        # Only the cached port is opened
+        assert SharedLuosIO.with_gate('r_left_arm', '/dev/fakeUSB*').port == '/dev/fakeUSB1'
+        assert opened == ['/dev/fakeUSB1']
+
+        # A wrong cache entry is fixed
+        close_fake_gates(gates)
+        opened.clear()
+        gates['/dev/fakeUSB0'], gates['/dev/fakeUSB1'] = gates['/dev/fakeUSB1'], gates['/dev/fakeUSB0']
+
+        assert SharedLuosIO.with_gate('r_left_arm', '/dev/fakeUSB*').port == '/dev/fakeUSB0'
+        assert opened == ['/dev/fakeUSB1', '/dev/fakeUSB0']
+
+        with open(SharedLuosIO.gate_cache) as f:
+            assert json.load(f)[luos.serial_device_id('/dev/fakeUSB0')] == 'r_left_arm'
+
+    finally:
+        close_fake_gates(gates)
+
+
+class FakeDevice(object):
+    def __init__(self):
+        self.states = []
+
+    def _update(self, new_state):
+        self.states.append(new_state)
+
+
+def test_update_monitor():
+    device = FakeDevice()
+    updates = LuosUpdateMonitor(device)
+
+    device._update({'modules': {'dxl_10': {'rot_position': 1.0}}})
+    assert device.states == [{'modules': {'dxl_10': {'rot_position': 1.0}}}]
+    assert updates.wait(['dxl_10'], timeout=0)
+    assert updates.wait(['dxl_10'], registers=['rot_position'], timeout=0)
+    assert not updates.wait(['dxl_10', 'dxl_11'], timeout=0.05)
+    assert not updates.wait(['dxl_10'], registers=['rot_position', 'temperature'], timeout=0.05)
+
+    # Waiting does not record the modules never updated
+    assert ('dxl_11', None) not in updates.counts()
+    assert ('dxl_10', 'temperature') not in updates.counts()
+
+    # Returns as soon as the update is received
+    Timer(0.1, device._update, args=({'modules': {'dxl_11': {'temperature': 20}}}, )).start()
+    start = time.time()
+    assert updates.wait(['dxl_10', 'dxl_11'], timeout=2)
+    assert time.time() - start < 1
+
+    # Only newer updates
+    since = updates.counts()
+    assert not updates.wait(['dxl_10'], since=since, timeout=0.05)
+    device._update({'modules': {'dxl_10': {'rot_position': 2.0}}})
+    assert updates.wait(['dxl_10'], since=since, timeout=0)
+
+
+def test_orbita_disk_ready():
+    device = FakeDevice()
+    disk = OrbitaDisk('disk_top', MagicMock(), updates=LuosUpdateMonitor(device))
+
+    device._update({'modules': {'disk_top': {'rot_position': 1.0, 'temperature': 30}}})
+    disk.setup()
+    assert not disk.wait_ready(timeout=0.05)
+
+    Timer(0.1, device._update, args=({'modules': {'disk_top': {'rot_position': 1.0, 'temperature': 30}}}, )).start()
+    start = time.time()
+    assert disk.wait_ready(timeout=2)
+    assert time.time() - start < 1
@@ -1,7 +1,10 @@
+import time
 import pytest
 import numpy as np
 
+from orbita import Actuator
 from pyquaternion import Quaternion
+from unittest.mock import MagicMock
 
 from mockup import mock_luos_io
 
@@ -10,6 +13,10 @@ mock_luos_io()
 from reachy.utils import rot  # noqa: E402
 from reachy.io.luos import SharedLuosIO  # noqa: E402
 from reachy.parts.motor import OrbitaActuator  # noqa: E402
+from reachy.parts.part import StateReader  # noqa: E402
+from reachy.parts.head import Head, LookAtTracker  # noqa: E402
+from reachy.parts.orbita_model import CachedOrbitaModel, slerp  # noqa: E402
+from reachy.trajectory.interpolation import MinimumJerk, Sampled, goto_trajectory  # noqa: E402
 
 
 def test_orbita_goto():
@@ -34,3 +41,184 @@ def test_orbita_goto():
 
     with pytest.raises(ValueError):
         orb.goto([1, 0], 1, False)
+
+
+def test_cached_orbita_model():
+    config = {k: v for k, v in Head.orbita_config.items() if k != 'hardware_zero'}
+    ref, model = Actuator(**config), Actuator(**config)
+    cached = CachedOrbitaModel(model)
+
+    # Smooth orientation sequence wrapping the disks around
+    Q = np.array([
+        Quaternion(axis=[np.sin(t), np.cos(0.7 * t), 0.3], degrees=35 * np.sin(1.3 * t)).elements
+        for t in np.linspace(0, 6, 200)
+    ])
+
+    expected = np.array([ref.get_angles_from_quaternion(*q) for q in Q])
+    assert np.allclose(cached.angles_from_quaternions(Q), expected)
+    assert np.allclose(model.last_angles, ref.last_angles)
+    assert cached.misses == len(Q)
+
+    # Single orientations (and cache hits) give the same results
+    for q in Q[:20]:
+        assert np.allclose(cached.angles_from_quaternions(Quaternion(q)), ref.get_angles_from_quaternion(*q))
+    assert cached.hits == 20
+
+    # The forward model finds the orientations back (full turns of the disks aside), without changing the model state
+    last_angles = model.last_angles.copy()
+    for q, angles in zip(Q[::20], expected[::20]):
+        assert np.allclose(cached.quaternion_from_angles(angles + [360, 0, -720]), q * np.sign(q[0]))
+    assert np.allclose(model.last_angles, last_angles)
+    assert cached.quaternion_from_angles([-22.5, 141, 167]) is None
+
+    ref.reset_last_angles()
+    model.reset_last_angles()
+
+    t = np.linspace(0, 6, 200)
+    V = np.column_stack((0.4 * np.sin(t), 0.3 * np.cos(t), np.ones_like(t)))
+    A = 40 * np.sin(2 * t)
+
+    expected = np.array([ref.get_angles_from_vector(v, a) for v, a in zip(V, A)])
+    assert np.allclose(cached.angles_from_vectors(V, A), expected)
+    assert np.allclose(model.offset, ref.offset)
+
+    for vt in ([1, 2, 3], [1, 0, 0], [0, 0, 1]):
+        q = cached.find_quaternion_transform([1, 0, 0], vt)
+        assert np.allclose(q.elements, ref.find_quaternion_transform([1, 0, 0], vt).elements)
+
+    Q = cached.quaternions_transform([1, 0, 0], np.random.rand(10, 3))
+    assert Q.shape == (10, 4)
+
+
+def test_orbita_orient_slerp():
+    luos_io = SharedLuosIO.with_gate('gate', '')
+    config = {k: v for k, v in Head.orbita_config.items() if k != 'hardware_zero'}
+    orb = OrbitaActuator('', 'bob', luos_io.find_orbita_disks(), hardware_zero=np.zeros(3), **config)
+    for disk in orb.disks:
+        disk.target_rot_position = 0.0
+
+    q1 = Quaternion(axis=[0, 1, 0], degrees=20)
+    q2 = Quaternion(axis=[1, 0, 1], degrees=-30)
+
+    # The first orientation is unknown, the disks are interpolated independently
+    traj = orb.orient(q1, duration=0.1, wait=True)
+    assert not isinstance(traj, Sampled)
+
+    traj = orb.orient(q2, duration=0.2, wait=False)
+    assert isinstance(traj, Sampled)
+    assert traj.positions.shape == (21, 3)
+    assert np.allclose(traj.positions[0], orb.cached_model.angles_from_quaternions(q1))
+    assert np.allclose(traj.positions[-1], orb.cached_model.angles_from_quaternions(q2))
+
+    # Each sample is on the geodesic, with a minimum jerk timing
+    Q = slerp(q1.elements, q2.elements, MinimumJerk(0.0, 1.0, 0.2).interpolate(np.linspace(0, 0.2, 21)))
+    for q, thetas in zip(Q, traj.positions):
+        assert np.allclose(orb.model.get_angles_from_quaternion(*q), thetas)
+
+    # Retargeting while moving starts from the current orientation, on the geodesic followed so far
+    path = traj.interpolate(np.linspace(0, traj.duration, 201))
+    traj = orb.orient(q1, duration=0.2, wait=True)
+    assert isinstance(traj, Sampled)
+    assert np.min(np.linalg.norm(path - traj.positions[0], axis=1)) < 1.0
+
+    orb.goto([0, 0, 0], duration=0.1, wait=True)
+    assert not isinstance(orb.orient(q2, duration=0.1, wait=True), Sampled)
+
+    # Disks commanded without going through the actuator: the next orientation starts from their targets
+    disks_goto = goto_trajectory(orb.disks, [0, 0, 0], 0.1, initial_position=[d.target_rot_position for d in orb.disks])
+    disks_goto.start(orb.disks)
+    disks_goto.wait()
+
+    traj = orb.orient(q1, duration=0.1, wait=False)
+    assert not isinstance(traj, Sampled)
+    assert np.allclose(traj.interpolate(0), [0, 0, 0])
+    traj.wait()
+
+    # Stopped mid-way: the next orientation starts from where the disks stopped, even after the nominal end
+    traj = orb.orient(q1, duration=0.3, wait=False)
+    time.sleep(0.1)
+    traj.stop()
+    stopped = [disk.target_rot_position for disk in orb.disks]
+    time.sleep(0.3)
+
+    traj = orb.orient(q2, duration=0.2, wait=False)
+    assert not isinstance(traj, Sampled)
+    assert np.allclose(traj.interpolate(0), stopped)
+    traj.wait()
+
+
+def test_look_at_tracker():
+    luos_io = SharedLuosIO.with_gate('gate', '')
+    config = {k: v for k, v in Head.orbita_config.items() if k != 'hardware_zero'}
+    orb = OrbitaActuator('', 'bob', luos_io.find_orbita_disks(), hardware_zero=np.zeros(3), **config)
+
+    # Not oriented yet: tracking starts from the orientation reached by the disks targets
+    q0 = Quaternion(axis=[0, 1, 1], degrees=-20).elements
+    for disk, theta in zip(orb.disks, orb.model.get_angles_from_quaternion(*q0)):
+        disk.target_rot_position = theta
+    assert np.allclose(orb.cached_model.quaternion_from_angles([d.target_rot_position for d in orb.disks]), q0)
+
+    tracker = LookAtTracker(orb, (1, 0.5, 0.2), max_speed=90, smoothing=0)
+    assert np.allclose(tracker.orientation, q0)
+    assert np.allclose(tracker.interpolate(0), [d.target_rot_position for d in orb.disks])
+
+    # The head turns toward the target at the maximum speed
+    q = tracker.orientation
+    tracker.interpolate(0.1)
+    assert np.isclose(2 * np.arccos(abs(np.dot(q, tracker.orientation))), np.deg2rad(9))
+
+    # Older times and state queries (e.g. when preempted) do not move the tracker
+    thetas = tracker.interpolate(0.1)
+    assert np.allclose(tracker.interpolate(0.05), thetas)
+    q, filtered = tracker.orientation, tracker._filtered.copy()
+    assert np.allclose(tracker.state(0.5)[0], thetas)
+    assert np.allclose(tracker.orientation, q) and np.allclose(tracker._filtered, filtered)
+
+    tracker.interpolate(1.0)
+    goal = orb.cached_model.find_quaternion_transform([1, 0, 0], [1, 0.5, 0.2])
+    assert np.allclose(tracker.orientation, goal.elements)
+    assert np.allclose(tracker.interpolate(1.0), orb.cached_model.angles_from_quaternions(goal))
+
+    # New targets are low-pass filtered
+    tracker.smoothing = 0.1
+    tracker.update(1, -0.5, 0.2)
+    tracker.interpolate(1.1)
+    assert -0.5 < tracker._filtered[1] < 0.5
+
+    # Tracking through the scheduler, until stopped
+    tracker = LookAtTracker(orb, (1, 0.2, 0))
+    with pytest.raises(ValueError):
+        tracker.start(orb.disks[:2])
+    tracker.start(orb.disks)
+    time.sleep(0.1)
+    assert tracker.is_playing
+    tracker.stop()
+    assert not tracker.is_playing
+
+
+def test_orbita_state():
+    luos_io = SharedLuosIO.with_gate('gate', '')
+    config = {k: v for k, v in Head.orbita_config.items() if k != 'hardware_zero'}
+    orb = OrbitaActuator(MagicMock(), 'neck', luos_io.find_orbita_disks(), hardware_zero=np.zeros(3), **config)
+    orb._root_part.name = 'head'
+
+    for i, disk in enumerate(orb.disks):
+        disk.luos_disk.rot_position = 10.0 * i
+        disk.luos_disk.target_rot_position = 20.0 * i
+        disk.luos_disk.temperature = 40.0
+        disk.luos_disk.compliant = False
+
+    reader = StateReader([], [orb])
+    state = reader.read()
+    assert reader.names == ['head.neck.disk_top', 'head.neck.disk_middle', 'head.neck.disk_bottom']
+    assert np.allclose(state['present_position'], [d.rot_position for d in orb.disks])
+    assert np.allclose(state['goal_position'], [d.target_rot_position for d in orb.disks])
+    assert np.allclose(state['temperature'], 40)
+    assert not np.any(state['compliant'])
+
+    # A disk which has not reported its position yet
+    orb.disk_middle.luos_disk.rot_position = None
+    state = reader.read()
+    assert np.isnan(state['present_position'][1])
+    assert np.allclose(state['present_position'][[0, 2]], [orb.disk_top.rot_position, orb.disk_bottom.rot_position])
+    assert np.allclose(state['goal_position'], [d.target_rot_position for d in orb.disks])
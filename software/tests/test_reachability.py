@@ -0,0 +1,47 @@
+import os
+import tempfile
+import numpy as np
+
+from collections import OrderedDict
+
+from reachy.parts.arm import LeftArm
+from reachy.parts.hand import LeftForceGripper
+from reachy.parts.part import kinematic_chain
+from reachy.parts.reachability import ReachabilityMap
+
+
+def left_arm_chain():
+    dxl_motors = OrderedDict(LeftArm.dxl_motors)
+    dxl_motors.update(LeftForceGripper.dxl_motors)
+    return kinematic_chain(dxl_motors)
+
+
+def test_reachability_map():
+    chain = left_arm_chain()
+    reachability_map = ReachabilityMap.build(chain, nb_samples=50000, resolution=0.05, batch_size=3000, random_seed=0)
+
+    lb, ub = np.array(chain.bounds).T
+    q = lb + np.random.RandomState(0).rand(1000, len(lb)) * (ub - lb)
+    P = chain.forward(q)[:, :3, 3]
+
+    assert reachability_map.is_reachable(P).mean() > 0.9
+    assert not reachability_map.is_reachable([2.0, 0.0, 0.0])
+    assert not reachability_map.is_reachable(np.eye(4) * 10)
+
+    # The seed of a voxel reaches this very voxel
+    for p in P[:20]:
+        seed = reachability_map.seed(p)
+        if seed is not None:
+            pos = chain.forward(seed.reshape(1, -1))[0, :3, 3]
+            assert reachability_map.voxel(pos)[0] == reachability_map.voxel(p)[0]
+            assert reachability_map.manipulability_at(p) > 0
+
+    with tempfile.TemporaryDirectory() as d:
+        filename = os.path.join(d, 'map.npz')
+        reachability_map.save(filename)
+        loaded = ReachabilityMap.load(filename)
+
+    assert loaded.shape == reachability_map.shape
+    assert np.array_equal(loaded.is_reachable(P), reachability_map.is_reachable(P))
+    p = P[reachability_map.is_reachable(P)][0]
+    assert np.allclose(loaded.seed(p), reachability_map.seed(p))
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 
 from reachy import parts, Reachy
 
@@ -20,3 +21,29 @@ class ReachyTestCase(unittest.TestCase):
         self.assertEqual(len(self.reachy.right_arm.motors), 8)
         self.assertEqual(len(self.reachy.left_arm.hand.motors), 4)
         self.assertEqual(len(self.reachy.motors), 16)
+
+    def test_state(self):
+        for i, m in enumerate(self.reachy.motors):
+            m._motor.rot_position = float(i)
+            m._motor.target_rot_position = 2.0 * i
+            m._motor._compliant = i % 2 == 0
+        self.reachy.motors[0]._motor.target_rot_position = None
+
+        state = self.reachy.state()
+        self.assertEqual(self.reachy.state_motors, [m.name for m in self.reachy.motors])
+        self.assertEqual(state.dtype, self.reachy.state_dtype)
+        self.assertGreater(state['timestamp'], 0)
+
+        np.testing.assert_allclose(state['present_position'], [m.present_position for m in self.reachy.motors])
+        np.testing.assert_allclose(state['goal_position'][1:], [m.goal_position for m in self.reachy.motors[1:]])
+        self.assertTrue(np.isnan(state['goal_position'][0]))
+        np.testing.assert_allclose(state['temperature'], [m.temperature for m in self.reachy.motors])
+        np.testing.assert_array_equal(state['compliant'], [m.compliant for m in self.reachy.motors])
+
+        # Part states, stored in a preallocated log
+        arm = self.reachy.left_arm
+        log = np.zeros(10, dtype=arm.state_dtype)
+        arm.state(out=log[3])
+        self.assertEqual(arm.state_motors, [m.name for m in arm.motors])
+        np.testing.assert_allclose(log[3]['present_position'], [m.present_position for m in arm.motors])
+        self.assertEqual(log[2]['timestamp'], 0)
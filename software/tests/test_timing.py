@@ -0,0 +1,30 @@
+import time
+
+from reachy.utils.timing import LoopTimer
+
+
+def test_loop_timer_rate():
+    timer = LoopTimer(freq=100)
+    timer.start()
+
+    for _ in range(30):
+        time.sleep(0.002)
+        timer.sleep()
+
+    stats = timer.stats
+    assert stats['nb_ticks'] == 30
+    assert 80 < stats['achieved_rate'] < 105
+    assert sum(c for _, c in stats['jitter_histogram']) == 30
+
+
+def test_loop_timer_missed_deadlines():
+    timer = LoopTimer(freq=100)
+    timer.start()
+
+    time.sleep(0.055)
+    timer.sleep()
+    assert timer.stats['missed_deadlines'] >= 5
+    assert timer.stats['worst_tick_time'] >= 0.055
+
+    timer.reset_stats()
+    assert timer.stats['nb_ticks'] == 0
@@ -0,0 +1,404 @@
+import time
+import numpy as np
+
+from types import SimpleNamespace
+
+from reachy.trajectory import TrajectoryPlayer, TrajectoryRecorder, save_trajectory
+from reachy.trajectory.recorder import SampleBuffer
+from reachy.trajectory.storage import TrajectoryWriter, open_trajectory
+from reachy.trajectory.interpolation import Linear, MinimumJerk, Sampled, Trapezoidal, TrajectoryInterpolation, goto_trajectory
+from reachy.trajectory.mixer import combine, norm_sigmoid, traj_as_array
+from reachy.trajectory.scheduler import TrajectoryScheduler
+
+
+class FakeMotor(object):
+    def __init__(self, goal_position=0.0, name='fake'):
+        self.goal_position = goal_position
+        self.present_position = goal_position
+        self.name = name
+
+
+def test_single_scheduler_loop():
+    motors = [FakeMotor() for _ in range(10)]
+    trajs = [Linear(0, 10 * (i + 1), 0.2) for i in range(len(motors))]
+
+    for m, traj in zip(motors, trajs):
+        traj.start(m)
+
+    scheduler = TrajectoryScheduler.shared()
+    assert scheduler.is_running
+    assert len(scheduler.active_trajectories) == len(trajs)
+
+    for traj in trajs:
+        traj.wait()
+        assert not traj.is_playing
+
+    for i, m in enumerate(motors):
+        assert np.isclose(m.goal_position, 10 * (i + 1))
+
+
+def test_stop_trajectory():
+    m = FakeMotor()
+    traj = MinimumJerk(0, 100, 10)
+    traj.start(m)
+    assert traj.is_playing
+
+    traj.stop()
+    assert not traj.is_playing
+    assert m.goal_position < 100
+
+
+def test_multi_axis_interpolation():
+    J = 5
+    p0, p1 = np.random.rand(J) * 100, np.random.rand(J) * 100
+    ts = np.linspace(0, 2, 51)
+
+    for Traj in (Linear, MinimumJerk):
+        multi = Traj(p0, p1, 2)
+        single = [Traj(a, b, 2) for a, b in zip(p0, p1)]
+
+        P = multi.interpolate(ts)
+        assert P.shape == (len(ts), J)
+
+        for j, traj in enumerate(single):
+            assert np.allclose(P[:, j], [traj.interpolate(t) for t in ts])
+            assert np.allclose(multi.interpolate(1.2)[j], traj.interpolate(1.2))
+
+        assert np.allclose(multi.sample(freq=25), P)
+        assert np.allclose(multi.interpolate(2), p1)
+
+
+def test_multi_axis_start():
+    motors = [FakeMotor() for _ in range(3)]
+    traj = MinimumJerk([0, 0, 0], [10, 20, 30], 0.1)
+    traj.start(motors)
+    traj.wait()
+
+    assert np.allclose([m.goal_position for m in motors], [10, 20, 30])
+
+
+def test_zero_duration_goto():
+    m = FakeMotor()
+    traj = goto_trajectory(m, 10, 0, initial_position=0, interpolation_mode='linear')
+    traj.start(m)
+    traj.wait()
+    assert m.goal_position == 10
+
+    motors = [FakeMotor(), FakeMotor()]
+    traj = Linear([0, 0], [10, -10], 0)
+    traj.start(motors)
+    traj.wait()
+    assert np.allclose([m.goal_position for m in motors], [10, -10])
+
+
+class FailingMotor(object):
+    name = 'failing'
+    present_position = 0.0
+
+    @property
+    def goal_position(self):
+        return 0.0
+
+    @goal_position.setter
+    def goal_position(self, pos):
+        raise IOError('bus error')
+
+
+def test_scheduler_write_error():
+    bad, good = FailingMotor(), FakeMotor()
+
+    failing = Linear(0, 10, 0.1)
+    failing.start(bad)
+    traj = Linear(0, 10, 0.1)
+    traj.start(good)
+
+    # The failing motor does not stop the loop driving the others
+    time.sleep(0.5)
+    assert not failing.is_playing and not traj.is_playing
+    assert np.isclose(good.goal_position, 10)
+
+    traj = Linear(10, 0, 0.1)
+    traj.start(good)
+    time.sleep(0.5)
+    assert not traj.is_playing
+    assert np.isclose(good.goal_position, 0)
+
+
+def test_scheduler_stats():
+    scheduler = TrajectoryScheduler.shared()
+    scheduler.reset_stats()
+
+    traj = Linear(0, 10, 0.2)
+    traj.start(FakeMotor())
+    traj.wait()
+
+    stats = scheduler.stats
+    assert stats['nb_ticks'] > 0
+    assert stats['nominal_rate'] == 100
+
+
+def test_player_interpolation():
+    robot = SimpleNamespace(a=FakeMotor(), b=FakeMotor())
+    traj = {'a': [0, 10, 20], 'b': [0, -10, -20]}
+
+    player = TrajectoryPlayer(robot, traj, freq=10)
+    assert player.duration == 0.2
+    assert np.allclose(player.interpolate(0.05), [5, -5])
+    assert np.allclose(player.interpolate(1), [20, -20])
+
+    player = TrajectoryPlayer(robot, traj, timestamps=[3, 4, 6])
+    assert np.allclose(player.interpolate(2), [15, -15])
+
+
+def test_player_speed():
+    robot = SimpleNamespace(a=FakeMotor())
+    player = TrajectoryPlayer(robot, {'a': np.linspace(0, 100, 101)}, freq=100)
+
+    player.speed = 0.5
+    player.play()
+    time.sleep(0.2)
+    assert 0.05 < player.elapsed < 0.15
+
+    player.speed = 4
+    player.wait_for_end()
+    assert robot.a.goal_position == 100
+
+    player.play()
+    player.stop()
+    assert not player.is_playing
+
+
+def test_sample_buffer():
+    buf = SampleBuffer(2, chunk_size=4)
+    for i in range(10):
+        buf.append(i, [i, -i])
+
+    assert len(buf) == 10
+    assert np.allclose(buf.timestamps, np.arange(10))
+    assert np.allclose(buf.values[:, 1], -np.arange(10))
+
+    ring = SampleBuffer(2, max_samples=4)
+    for i in range(11):
+        ring.append(i, [i, -i])
+        assert np.allclose(ring.timestamps, np.arange(max(0, i - 3), i + 1))
+
+    assert len(ring) == 4
+    assert ring.total_samples == 11
+    assert np.shares_memory(ring.values, ring._values)
+
+
+def test_trajectory_writer(tmp_path):
+    filename = str(tmp_path / 'traj.bin')
+
+    writer = TrajectoryWriter(filename, motors=['a', 'b'], freq=100, chunk_size=10, t0=0)
+    for i in range(25):
+        writer.append(i / 100, [i, -i])
+
+    # Only full chunks are on the disk until the writer is closed
+    f = open_trajectory(filename)
+    assert len(f) == 20
+    assert f.motors == ['a', 'b']
+    assert np.allclose(f.trajectories['b'], -np.arange(20))
+
+    writer.close()
+    f = open_trajectory(filename)
+    assert len(f) == 25
+    assert np.allclose(f.timestamps, np.arange(25) / 100)
+
+    # A truncated sample is ignored
+    with open(filename, 'ab') as fd:
+        fd.write(b'1234')
+    assert len(open_trajectory(filename)) == 25
+
+    # Chunks written by a dedicated thread
+    writer = TrajectoryWriter(filename, motors=['a'], freq=100, chunk_size=10, t0=0, background=True, sync_interval=10)
+    for i in range(25):
+        writer.append(i / 100, [i])
+    writer.extend(np.arange(25, 30)[:, None], timestamps=np.arange(25, 30) / 100)
+    writer.close()
+
+    f = open_trajectory(filename)
+    assert len(f) == 30
+    assert np.allclose(f.trajectories['a'], np.arange(30))
+    assert np.allclose(f.timestamps, np.arange(30) / 100)
+
+
+def test_recorder_streaming(tmp_path):
+    filename = str(tmp_path / 'record.bin')
+    motors = [FakeMotor(1, name='a'), FakeMotor(2, name='b')]
+
+    recorder = TrajectoryRecorder(motors, chunk_size=5)
+    recorder.start(output=filename)
+    time.sleep(0.2)
+    recorder.stop()
+
+    traj = recorder.trajectories
+    assert len(traj['a']) > 10
+    assert np.allclose(traj['a'], 1) and np.allclose(traj['b'], 2)
+    assert np.all(np.diff(recorder.timestamps) > 0)
+
+
+def test_player_from_file(tmp_path):
+    filename = str(tmp_path / 'motion.bin')
+    traj = {'a': np.linspace(0, 10, 11), 'b': np.linspace(0, -10, 11)}
+    save_trajectory(filename, traj, freq=50)
+
+    f = open_trajectory(filename)
+    assert f.dtype == np.float32
+    assert isinstance(f.values, np.memmap)
+
+    robot = SimpleNamespace(a=FakeMotor(), b=FakeMotor())
+    player = TrajectoryPlayer(robot, filename)
+    assert player.freq == 50
+    assert np.isclose(player.duration, 0.2)
+    assert np.allclose(player.interpolate(0.03), [1.5, -1.5])
+
+    save_trajectory(filename, traj, timestamps=np.arange(11) * 0.1 + 12)
+    player = TrajectoryPlayer(robot, open_trajectory(filename))
+    assert np.isclose(player.duration, 1.0)
+
+    player.play(wait=True)
+    assert np.allclose([robot.a.goal_position, robot.b.goal_position], [10, -10])
+
+
+def _pairwise_combine(m1, m2, overlap, r):
+    n1, y = m1.shape
+    n2 = m2.shape[0]
+    w = int(np.round((n1 + n2) * overlap))
+    n = n1 + n2 - w
+
+    M1, M2, W = np.zeros((n, y)), np.zeros((n, y)), np.zeros((n, 1))
+    M1[:n1] = m1
+    M2[-n2:] = m2
+
+    a, b = n - n2, n1
+    W[:a] = 1
+    W[a:b, 0] = 1 - norm_sigmoid(b - a, r)
+    return (M1 * W) + (M2 * (1 - W))
+
+
+def test_combine():
+    trajs = [
+        {'a': np.random.rand(n), 'b': np.random.rand(n)}
+        for n in (50, 80, 30, 60)
+    ]
+
+    ref = traj_as_array(trajs[0])
+    for t in trajs[1:]:
+        ref = _pairwise_combine(ref, traj_as_array(t), 0.1, 5)
+
+    res = combine(*trajs, overlap=0.1, r=5)
+    assert np.allclose(traj_as_array(res), ref)
+
+    res = combine(*trajs[:3], overlap=[0.1, 0.2], r=[5, 2])
+    ref = _pairwise_combine(traj_as_array(trajs[0]), traj_as_array(trajs[1]), 0.1, 5)
+    ref = _pairwise_combine(ref, traj_as_array(trajs[2]), 0.2, 2)
+    assert np.allclose(traj_as_array(res), ref)
+
+
+def test_combine_different_motors():
+    t1 = {'a': np.full(20, 1.0)}
+    t2 = {'a': np.full(20, 2.0), 'b': np.full(20, 3.0)}
+    t3 = {'b': np.full(20, 4.0)}
+
+    res = combine(t1, t2, t3, overlap=0)
+    assert list(res.keys()) == ['a', 'b']
+    assert np.allclose(res['a'], [1] * 20 + [2] * 40)
+    assert np.allclose(res['b'], [3] * 40 + [4] * 20)
+
+
+def test_trajectory_derivatives():
+    traj = MinimumJerk([0, 10], [30, -20], 2, initial_velocity=[5, 0], initial_acceleration=[0, 3])
+    ts = np.linspace(0.1, 1.9, 7)
+
+    fd_vel = TrajectoryInterpolation.velocity(traj, ts)
+    fd_acc = TrajectoryInterpolation.acceleration(traj, ts)
+
+    assert np.allclose(traj.velocity(ts), fd_vel, atol=1e-4)
+    assert np.allclose(traj.acceleration(ts), fd_acc, atol=1e-2)
+    assert np.allclose(traj.velocity(0), [5, 0])
+    assert np.allclose(traj.acceleration(0), [0, 3])
+
+    lin = Linear(0, 10, 2)
+    assert np.isclose(lin.velocity(0.5), 5)
+    assert lin.acceleration(ts).shape == ts.shape
+
+
+def test_goto_preemption():
+    m = FakeMotor()
+
+    first = goto_trajectory(m, 100, 1, initial_position=0, interpolation_mode='minjerk')
+    first.start(m)
+    time.sleep(0.3)
+
+    second = goto_trajectory(m, -50, 0.5, initial_position=0, interpolation_mode='minjerk')
+    assert second.initial_position > 0
+    assert second.velocity(0) > 0
+
+    second.start(m)
+    time.sleep(0.05)
+    assert not first.is_playing
+    assert second.is_playing
+
+    second.wait()
+    assert np.isclose(m.goal_position, -50)
+    assert TrajectoryScheduler.shared().commanded_state(m) is None
+
+
+def test_partial_preemption():
+    motors = [FakeMotor(), FakeMotor()]
+
+    multi = Linear([0, 0], [10, 10], 0.5)
+    multi.start(motors)
+
+    single = Linear(0, -10, 0.1)
+    single.start(motors[0])
+    single.wait()
+
+    assert multi.is_playing
+    multi.wait()
+    assert np.isclose(motors[0].goal_position, -10)
+    assert np.isclose(motors[1].goal_position, 10)
+
+
+def test_trapezoidal():
+    traj = Trapezoidal([0, 0, 50], [90, -10, 50], max_velocity=[90, 90, 90], max_acceleration=180)
+    # 90° at 90°/s with 180°/s² -> 0.5s acceleration, 0.5s cruise, 0.5s deceleration
+    assert np.isclose(traj.duration, 1.5)
+
+    ts = np.linspace(0, traj.duration, 301)
+    P, V, A = traj.interpolate(ts), traj.velocity(ts), traj.acceleration(ts)
+
+    assert np.allclose(P[0], [0, 0, 50]) and np.allclose(P[-1], [90, -10, 50])
+    assert np.all(np.abs(V) <= 90 + 1e-9)
+    assert np.all(np.abs(A) <= 180 + 1e-9)
+    assert np.allclose(np.diff(P, axis=0) / np.diff(ts)[:, None], (V[1:] + V[:-1]) / 2, atol=1)
+
+    # Triangular profile and minimal duration
+    assert np.isclose(Trapezoidal(0, 10, max_velocity=100, max_acceleration=10).duration, 2)
+    assert Trapezoidal(0, 10, duration=5, max_velocity=100, max_acceleration=10).duration == 5
+
+
+def test_trapezoidal_goto_limits():
+    m = FakeMotor()
+    m.velocity_limit, m.acceleration_limit = 45, 90
+
+    traj = goto_trajectory(m, 90, 0, initial_position=0, interpolation_mode='trapezoidal')
+    assert np.isclose(traj.duration, 2.5)
+
+
+def test_sampled_trajectory():
+    positions = np.column_stack((np.linspace(0, 10, 11), np.linspace(0, -20, 11)))
+    traj = Sampled(positions, freq=10)
+
+    assert traj.duration == 1.0
+    assert np.allclose(traj.goal_position, [10, -20])
+    assert np.allclose(traj.interpolate(0.25), [2.5, -5])
+    assert np.allclose(traj.interpolate(2.0), [10, -20])
+    assert traj.interpolate(np.linspace(0, 1, 7)).shape == (7, 2)
+    assert np.allclose(traj.velocity(0.5), [10, -20], atol=1e-6)
+
+    motors = [FakeMotor(), FakeMotor()]
+    traj.start(motors)
+    traj.wait()
+    assert np.allclose([m.goal_position for m in motors], [10, -20])
@@ -0,0 +1,12 @@
+from reachy import parts
+from reachy.io import ws
+
+
+def test_orbita_part_on_ws(monkeypatch):
+    monkeypatch.setattr(ws.WsServer, 'run_in_background', lambda self: None)
+    monkeypatch.setattr(ws.WsIO, 'ws', None)
+
+    head = parts.Head(io='ws')
+    assert all(isinstance(disk, ws.WsFakeOrbitaDisk) for disk in head.neck.disks)
+    assert all(disk.wait_ready(timeout=0) for disk in head.neck.disks)
+    assert len(head.state()['present_position']) == 5